@@ -0,0 +1,76 @@
+"""Benchmark scraper inserts and feed reads under different SQLite profiles.
+
+Usage: python -m bench_sqlite [--posts N] [--dir PATH]
+
+Run it with --dir on the production volume: synchronous mostly costs fsyncs,
+which a tmpfs hides.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from src.db import Database, SqliteProfile, encode_feed_cursor
+
+PROFILES = {
+    # What every connection ran with before profiles were configurable
+    "legacy": SqliteProfile(synchronous="FULL", cache_size_kb=2000, mmap_size_mb=0,
+                            temp_store="DEFAULT", busy_timeout_ms=5000,
+                            reader_cache_size_kb=2000),
+    "default": SqliteProfile.from_config(),
+    "unsafe": SqliteProfile(synchronous="OFF", cache_size_kb=131072, mmap_size_mb=1024),
+}
+
+
+def bench_inserts(db: Database, user_id: int, posts: int) -> float:
+    """Posts per second, each written with its media in one transaction like the scraper does."""
+    db.upsert_fb_group(user_id, "g1", "Group", "")
+    start = time.perf_counter()
+    for i in range(posts):
+        post_id = f"p{i}"
+        with db.transaction():
+            db.insert_post(user_id, post_id, f"acct{i % 50}", "post", "caption " * 20,
+                           f"2026-01-01T00:00:{i % 60:02d}.{i:06d}", "https://instagram.com")
+            db.insert_media_many(post_id, [
+                {"media_type": "image", "file_path": f"acct/{post_id}/{m}.jpg", "order": m}
+                for m in range(3)
+            ])
+        if i % 4 == 0:
+            db.insert_fb_post(f"fb{i}", "g1", "Author", "content " * 20,
+                              f"2026-01-01T00:00:{i % 60:02d}.{i:06d}", "https://facebook.com", 0)
+    return posts / (time.perf_counter() - start)
+
+
+def bench_feed_reads(db: Database, user_id: int, page_size: int = 20) -> float:
+    """Feed pages per second, paging through the whole feed with cursors and hydrating each page."""
+    reader = db.reader()
+    pages = 0
+    cursor = None
+    start = time.perf_counter()
+    while page := reader.get_unified_feed(user_id, limit=page_size, cursor=cursor):
+        reader.hydrate_feed(page)
+        cursor = encode_feed_cursor(page[-1])
+        pages += 1
+    return pages / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=2000, help="posts to insert per profile")
+    parser.add_argument("--dir", default=None, help="directory for the scratch databases")
+    args = parser.parse_args()
+
+    print(f"{'profile':<10} {'inserts/s':>12} {'feed pages/s':>14}")
+    for name, profile in PROFILES.items():
+        with tempfile.TemporaryDirectory(dir=args.dir) as tmpdir:
+            db = Database(os.path.join(tmpdir, "bench.db"), profile=profile)
+            db.initialize()
+            user_id = db.insert_user(f"{name}@example.com", "pw")
+            inserts = bench_inserts(db, user_id, args.posts)
+            reads = bench_feed_reads(db, user_id)
+            db.close()
+        print(f"{name:<10} {inserts:>12.0f} {reads:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Apply retention to every user, remove orphaned media files and shrink the database.
+
+Usage: python -m compact [--vacuum]
+
+--vacuum rewrites the whole file once (needs free space for a copy and
+blocks writers meanwhile); databases created before retention existed need
+it before incremental vacuum can shrink them.
+"""
+import os
+import sys
+from src.config import Config
+from src.db import Database
+from src.retention import RetentionPolicy, compact, enforce_user_retention, sweep_orphan_media
+
+
+def main():
+    if len(sys.argv) > 2 or (len(sys.argv) == 2 and sys.argv[1] != "--vacuum"):
+        print("Usage: python -m compact [--vacuum]")
+        sys.exit(1)
+
+    config = Config()
+    db = Database(config.DATABASE_PATH)
+    db.initialize()
+    size_before = os.path.getsize(config.DATABASE_PATH)
+
+    for user_id, settings in db.load_user_settings().items():
+        counts = enforce_user_retention(db, user_id, RetentionPolicy.for_user(settings, config),
+                                        config.MEDIA_PATH, config.RETENTION_BATCH_SIZE)
+        print(f"User {user_id}: {counts}")
+    print(f"Expired sessions removed: {db.delete_expired_sessions()}")
+    print(f"Orphaned media files removed: "
+          f"{sweep_orphan_media(db, config.MEDIA_PATH, config.MEDIA_ORPHAN_GRACE_HOURS)}")
+
+    if len(sys.argv) == 2:
+        db.vacuum()
+    else:
+        print(f"Pages freed: {compact(db)}")
+    db.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+    size_after = os.path.getsize(config.DATABASE_PATH)
+    print(f"Database size: {size_before / 1e6:.1f} MB -> {size_after / 1e6:.1f} MB")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
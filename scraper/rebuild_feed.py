@@ -0,0 +1,23 @@
+"""Rebuild the materialized feed_items table from posts and fb_posts."""
+import sys
+from src.config import Config
+from src.db import Database
+
+
+def main():
+    if len(sys.argv) > 2 or (len(sys.argv) == 2 and not sys.argv[1].isdigit()):
+        print("Usage: python -m rebuild_feed [user_id]")
+        sys.exit(1)
+    user_id = int(sys.argv[1]) if len(sys.argv) == 2 else None
+
+    config = Config()
+    db = Database(config.DATABASE_PATH)
+    db.initialize()
+    count = db.rebuild_feed_items(user_id)
+    scope = f"user {user_id}" if user_id is not None else "all users"
+    print(f"Rebuilt feed_items for {scope}: {count} items")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
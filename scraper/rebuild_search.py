@@ -0,0 +1,21 @@
+"""Rebuild the FTS5 search indexes from posts, fb_posts and newsletter_emails."""
+import sys
+from src.config import Config
+from src.db import Database
+
+
+def main():
+    if len(sys.argv) > 1:
+        print("Usage: python -m rebuild_search")
+        sys.exit(1)
+
+    config = Config()
+    db = Database(config.DATABASE_PATH)
+    db.initialize()
+    for table, count in db.rebuild_search_index().items():
+        print(f"Reindexed {table}: {count} rows")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
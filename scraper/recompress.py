@@ -0,0 +1,31 @@
+"""Compress newsletter bodies and digest HTML stored before compression existed.
+
+Usage: python -m recompress
+"""
+import sys
+from src.config import Config
+from src.db import Database
+from src.retention import compact
+
+
+def main():
+    if len(sys.argv) > 1:
+        print("Usage: python -m recompress")
+        sys.exit(1)
+
+    config = Config()
+    db = Database(config.DATABASE_PATH)
+    db.initialize()
+    result = db.recompress_text_columns()
+    saved = result["bytes_before"] - result["bytes_after"]
+    print(f"Compressed {result['rows']} values: {result['bytes_before'] / 1e6:.1f} MB -> "
+          f"{result['bytes_after'] / 1e6:.1f} MB ({saved / 1e6:.1f} MB saved)")
+    for column, stats in db.compression_stats().items():
+        print(f"  {column}: {stats['compressed']}/{stats['rows']} compressed, "
+              f"{stats['stored_bytes'] / 1e6:.1f} MB stored")
+    print(f"Pages freed: {compact(db)}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
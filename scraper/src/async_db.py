@@ -0,0 +1,98 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src.db import Database, SqliteProfile
+
+
+class AsyncDatabase:
+    """Awaitable front for Database, for code running on an asyncio loop.
+
+    Writes run one at a time, in the order they were submitted, on a
+    dedicated writer thread with its own Database handle. Reads run on a
+    small pool of threads, each with a read-only handle like
+    Database.reader(), so a read never queues behind a write and neither
+    blocks the event loop. A read sees every write that was awaited before it.
+
+    The hot paths have awaitable methods; anything else goes through
+    write(fn, ...) or read(fn, ...), which call fn(db, ...) on the right
+    thread. Database itself is unchanged for sync callers.
+    """
+
+    def __init__(self, db_path: str, readers: int = 2, profile: SqliteProfile | None = None):
+        self.db_path = db_path
+        self.profile = profile or SqliteProfile.from_config()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._handles: list[Database] = []
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="db-reader")
+        # Opens (and initializes) the file first: read-only handles can't create it
+        self._ready = self._writer.submit(self._handle, False)
+
+    def _handle(self, readonly: bool) -> Database:
+        """The calling pool thread's own Database, opened on first use."""
+        db = getattr(self._local, "db", None)
+        if db is None:
+            if readonly:
+                self._ready.result()
+                db = Database(self.db_path, check_same_thread=False,
+                              profile=self.profile.for_reader(), readonly=True)
+            else:
+                db = Database(self.db_path, check_same_thread=False, profile=self.profile)
+                db.initialize()
+            with self._lock:
+                self._handles.append(db)
+            self._local.db = db
+        return db
+
+    async def write(self, fn, *args, **kwargs):
+        """Run fn(db, *args, **kwargs) on the writer thread.
+
+        Use db.transaction() inside fn to commit several writes together.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._writer, lambda: fn(self._handle(False), *args, **kwargs))
+
+    async def read(self, fn, *args, **kwargs):
+        """Run fn(db, *args, **kwargs) on a reader thread, against a read-only handle."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._readers, lambda: fn(self._handle(True), *args, **kwargs))
+
+    async def insert_post(self, user_id: int, id: str, username: str, post_type: str,
+                          caption: str, timestamp: str, permalink: str) -> bool:
+        return await self.write(Database.insert_post, user_id, id, username, post_type,
+                                caption, timestamp, permalink)
+
+    async def filter_new_post_ids(self, user_id: int, ids: list[str]) -> list[str]:
+        return await self.read(Database.filter_new_post_ids, user_id, list(ids))
+
+    async def get_unified_feed(self, user_id: int, limit: int = 20, offset: int = 0,
+                               account: str | None = None, group_id: str | None = None,
+                               type: str | None = None, platform: str | None = None,
+                               cursor: str | None = None) -> list[dict]:
+        return await self.read(Database.get_unified_feed, user_id, limit=limit, offset=offset,
+                               account=account, group_id=group_id, type=type,
+                               platform=platform, cursor=cursor)
+
+    async def append_run_log_lines(self, run_kind: str, run_id: int,
+                                   lines: list[tuple[str | None, str | None, str]]):
+        await self.write(Database.append_run_log_lines, run_kind, run_id, list(lines))
+
+    def close(self):
+        """Finish the statements already queued, then close every handle."""
+        self._writer.shutdown(wait=True)
+        self._readers.shutdown(wait=True)
+        with self._lock:
+            for db in self._handles:
+                db.close()
+            self._handles.clear()
+
+    async def aclose(self):
+        await asyncio.to_thread(self.close)
+
+    async def __aenter__(self) -> "AsyncDatabase":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
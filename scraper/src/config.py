@@ -11,3 +11,42 @@ class Config:
     NEWSLETTER_DIGEST_TIME = os.environ.get("NEWSLETTER_DIGEST_TIME", "07:00")
     NEWSLETTER_DIGEST_MODE = os.environ.get("NEWSLETTER_DIGEST_MODE", "local")
     IG_DIGEST_MODE = os.environ.get("IG_DIGEST_MODE", "local")
+    # Users scraped at once, paused sessions included; keep it above the
+    # platform concurrency below so paused sessions don't hold up the queue
+    SCRAPE_WORKERS = int(os.environ.get("SCRAPE_WORKERS", "8"))
+    # Claims before a job whose worker keeps dying is failed instead of retried
+    JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "3"))
+    # Sessions making requests to a platform at the same moment; sessions paused
+    # between requests hand their slot on, so more than this can be open at once
+    SCRAPE_IG_CONCURRENCY = int(os.environ.get("SCRAPE_IG_CONCURRENCY", "2"))
+    SCRAPE_FB_CONCURRENCY = int(os.environ.get("SCRAPE_FB_CONCURRENCY", "2"))
+    # Longest a session waking from a pause waits for a free slot before it
+    # carries on over the concurrency limit
+    SCRAPE_RESUME_WAIT_SECONDS = float(os.environ.get("SCRAPE_RESUME_WAIT_SECONDS", "10"))
+    SCHEDULE_RESYNC_SECONDS = int(os.environ.get("SCHEDULE_RESYNC_SECONDS", "600"))
+    POLL_FORCE_SECONDS = int(os.environ.get("POLL_FORCE_SECONDS", "60"))
+    USER_LEASE_SECONDS = int(os.environ.get("USER_LEASE_SECONDS", "120"))
+    USER_LEASE_RENEW_SECONDS = int(os.environ.get("USER_LEASE_RENEW_SECONDS", "30"))
+    METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+    METRICS_PORT = int(os.environ.get("METRICS_PORT", "9464"))  # 0 disables the endpoint
+    METRICS_RETENTION_HOURS = int(os.environ.get("METRICS_RETENTION_HOURS", "24"))
+    # How long a cached user settings snapshot is trusted; the web app's
+    # user_config writes are picked up within this many seconds
+    SETTINGS_CACHE_SECONDS = float(os.environ.get("SETTINGS_CACHE_SECONDS", "30"))
+    # SQLite connection profile, shared by every connection (see src/db.py SqliteProfile)
+    SQLITE_SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get("SQLITE_CACHE_SIZE_KB", "32768"))
+    SQLITE_MMAP_SIZE_MB = int(os.environ.get("SQLITE_MMAP_SIZE_MB", "256"))
+    SQLITE_TEMP_STORE = os.environ.get("SQLITE_TEMP_STORE", "MEMORY")
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "15000"))
+    SQLITE_READER_CACHE_SIZE_KB = int(os.environ.get("SQLITE_READER_CACHE_SIZE_KB", "8192"))  # Database.reader()
+    # Retention defaults in days, 0 keeps forever; users override them with
+    # retention_<kind>_days in user_config (see src/retention.py)
+    RETENTION_STORY_DAYS = int(os.environ.get("RETENTION_STORY_DAYS", "0"))
+    RETENTION_RUN_LOG_DAYS = int(os.environ.get("RETENTION_RUN_LOG_DAYS", "0"))
+    RETENTION_MEDIA_DAYS = int(os.environ.get("RETENTION_MEDIA_DAYS", "0"))
+    RETENTION_INTERVAL_SECONDS = int(os.environ.get("RETENTION_INTERVAL_SECONDS", "3600"))
+    RETENTION_BATCH_SIZE = int(os.environ.get("RETENTION_BATCH_SIZE", "500"))
+    RETENTION_VACUUM_PAGES = int(os.environ.get("RETENTION_VACUUM_PAGES", "5000"))
+    # Media files no row points at are removed once they are this old
+    MEDIA_ORPHAN_GRACE_HOURS = int(os.environ.get("MEDIA_ORPHAN_GRACE_HOURS", "24"))
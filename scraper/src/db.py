@@ -1,23 +1,376 @@
+import base64
+import json
 import sqlite3
+import threading
+import zlib
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from pathlib import Path
+
+from src.config import Config
+from src.migrations import SEARCH_INDEXES, migrate
+from src.settings import EXCLUDED_KEYS, SettingsCache, UserSettings
+
+
+@dataclass(frozen=True)
+class SqliteProfile:
+    """Per-connection SQLite settings; Config's SQLITE_* values by default.
+
+    WAL with synchronous=NORMAL only fsyncs at checkpoints, which is safe
+    against corruption and loses at most the last commits on power loss.
+    busy_timeout is how long a writer waits for the web app's (or another
+    replica's) write lock before raising "database is locked".
+    """
+    synchronous: str = "NORMAL"
+    cache_size_kb: int = 32768
+    mmap_size_mb: int = 256
+    temp_store: str = "MEMORY"
+    busy_timeout_ms: int = 15000
+    reader_cache_size_kb: int = 8192
+
+    def __post_init__(self):
+        if self.synchronous.upper() not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+            raise ValueError(f"Invalid SQLite synchronous mode: {self.synchronous!r}")
+        if self.temp_store.upper() not in ("DEFAULT", "FILE", "MEMORY"):
+            raise ValueError(f"Invalid SQLite temp_store: {self.temp_store!r}")
+
+    @classmethod
+    def from_config(cls, config: Config | None = None) -> "SqliteProfile":
+        config = config or Config()
+        return cls(
+            synchronous=config.SQLITE_SYNCHRONOUS,
+            cache_size_kb=config.SQLITE_CACHE_SIZE_KB,
+            mmap_size_mb=config.SQLITE_MMAP_SIZE_MB,
+            temp_store=config.SQLITE_TEMP_STORE,
+            busy_timeout_ms=config.SQLITE_BUSY_TIMEOUT_MS,
+            reader_cache_size_kb=config.SQLITE_READER_CACHE_SIZE_KB,
+        )
+
+    def for_reader(self) -> "SqliteProfile":
+        """The same profile with the read-only connections' cache size."""
+        return replace(self, cache_size_kb=self.reader_cache_size_kb)
+
+    def apply(self, conn: sqlite3.Connection, readonly: bool = False):
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        if readonly:
+            # journal_mode and auto_vacuum live in the file, and the writer set them
+            conn.execute("PRAGMA query_only = ON")
+            conn.execute(f"PRAGMA cache_size = {-int(self.cache_size_kb)}")
+            conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size_mb) * 1024 * 1024}")
+            conn.execute(f"PRAGMA temp_store = {self.temp_store.upper()}")
+            return
+        # Only a new, still empty file can take it (before journal_mode writes
+        # the header); existing files switch over in vacuum()
+        if conn.execute("PRAGMA page_count").fetchone()[0] == 0:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous = {self.synchronous.upper()}")
+        # Negative cache_size is in KiB rather than pages
+        conn.execute(f"PRAGMA cache_size = {-int(self.cache_size_kb)}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size_mb) * 1024 * 1024}")
+        conn.execute(f"PRAGMA temp_store = {self.temp_store.upper()}")
+        conn.execute("PRAGMA foreign_keys=ON")
+
+
+def _encode_token(key: list) -> str:
+    raw = json.dumps(key, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def _decode_token(token: str) -> list:
+    raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    key = json.loads(raw)
+    if not isinstance(key, list):
+        raise ValueError("cursor is not a JSON array")
+    return key
+
+
+def encode_feed_cursor(item: dict) -> str:
+    """Opaque continuation token for the feed page that ends with item.
+
+    URL-safe base64 of the JSON array [timestamp, platform, id]; the web app
+    produces and accepts the same tokens.
+    """
+    return _encode_token([item["timestamp"], item.get("platform", "instagram"), item["id"]])
+
+
+def decode_feed_cursor(token: str) -> tuple[str, str, str]:
+    """Inverse of encode_feed_cursor(); raises ValueError on a malformed token."""
+    try:
+        timestamp, platform, id = _decode_token(token)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid feed cursor: {token!r}") from e
+    if not all(isinstance(v, str) for v in (timestamp, platform, id)):
+        raise ValueError(f"Invalid feed cursor: {token!r}")
+    return timestamp, platform, id
+
+
+def encode_search_cursor(hit: dict) -> str:
+    """Continuation token for the search page that ends with hit: [rank, platform, rowid]."""
+    return _encode_token([hit["rank"], hit["platform"], hit["rowid"]])
+
+
+def decode_search_cursor(token: str) -> tuple[float, str, int]:
+    """Inverse of encode_search_cursor(); raises ValueError on a malformed token."""
+    try:
+        rank, platform, rowid = _decode_token(token)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid search cursor: {token!r}") from e
+    if not (isinstance(rank, (int, float)) and isinstance(platform, str) and isinstance(rowid, int)):
+        raise ValueError(f"Invalid search cursor: {token!r}")
+    return float(rank), platform, rowid
+
+
+def _fts_query(text: str) -> str:
+    """Turn free text into an FTS5 query matching every word, the last one as a prefix.
+
+    Each word is quoted, so FTS5 syntax in user input (quotes, AND, NEAR,
+    column filters) is searched for literally instead of raising.
+    """
+    terms = ['"' + word.replace('"', '""') + '"' for word in text.split()]
+    if terms:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+def _feed_seek(platform: str, cursor: tuple[str, str, str], timestamp_col: str, id_col: str):
+    """WHERE clause and params selecting a single platform's rows after cursor.
+
+    Feeds are ordered by (timestamp, platform, id) descending, so on a
+    timestamp tie the platform alone decides whether its rows come before or
+    after the cursor. Unlike the full row-value comparison this matches the
+    (..., platform, timestamp, id) indexes.
+    """
+    timestamp, cursor_platform, id = cursor
+    if platform == cursor_platform:
+        return f"({timestamp_col}, {id_col}) < (?, ?)", [timestamp, id]
+    if platform < cursor_platform:
+        return f"{timestamp_col} <= ?", [timestamp]
+    return f"{timestamp_col} < ?", [timestamp]
+
+
+# Compressed text columns hold a BLOB of this marker plus a zlib stream; rows
+# written before compression (or too small to gain) stay plain TEXT
+COMPRESSED_MARKER = b"\x00zlib:"
+COMPRESS_MIN_BYTES = 1024
+# Columns stored compressed. newsletter_emails.body_text stays plain: its
+# FTS5 index reads the column directly.
+COMPRESSED_COLUMNS = (("newsletter_emails", "body_html"), ("newsletter_digest_runs", "digest_html"))
+
+
+def compress_text(text: str | None) -> str | bytes | None:
+    """Value to store for text in a compressed column."""
+    if not text:
+        return text
+    raw = text.encode()
+    if len(raw) < COMPRESS_MIN_BYTES:
+        return text
+    packed = COMPRESSED_MARKER + zlib.compress(raw, 6)
+    return packed if len(packed) < len(raw) else text
+
+
+def decompress_text(value: str | bytes | None) -> str | None:
+    """Inverse of compress_text(); plain TEXT values pass through."""
+    if isinstance(value, bytes) and value.startswith(COMPRESSED_MARKER):
+        return zlib.decompress(value[len(COMPRESSED_MARKER):]).decode()
+    return value
+
+
+class LazyRow(dict):
+    """Row dict whose compressed columns are only decompressed when read."""
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        if isinstance(value, bytes):
+            value = decompress_text(value)
+            super().__setitem__(key, value)
+        return value
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def values(self):
+        return [self[key] for key in self]
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+
+class CompactRow:
+    """A row with one slot per column instead of a dict, for the iter_* methods.
+
+    Reads like the dicts the get_* methods return (row["col"], row.get(),
+    keys(), dict(row)) as well as by attribute. __slots__ lists the columns in
+    SELECT order; a slot named _<column> holds that column as stored, and the
+    subclass's <column> property decompresses it on read.
+    """
+    __slots__ = ()
+    COLUMNS: tuple[str, ...] = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.COLUMNS = tuple(slot.lstrip("_") for slot in cls.__slots__)
+
+    def __init__(self, *values):
+        for slot, value in zip(self.__slots__, values):
+            setattr(self, slot, value)
+
+    def __getitem__(self, key: str):
+        if key not in self.COLUMNS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default=None):
+        return getattr(self, key) if key in self.COLUMNS else default
+
+    def keys(self) -> tuple[str, ...]:
+        return self.COLUMNS
+
+    def values(self):
+        return [getattr(self, key) for key in self.COLUMNS]
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self.COLUMNS]
+
+    def __iter__(self):
+        return iter(self.COLUMNS)
+
+    def __len__(self) -> int:
+        return len(self.COLUMNS)
+
+    def __contains__(self, key) -> bool:
+        return key in self.COLUMNS
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (CompactRow, dict)):
+            # items(), not dict(other): copying a LazyRow skips its decompression
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self.items())!r})"
+
+
+class PostRow(CompactRow):
+    __slots__ = ("id", "user_id", "username", "type", "caption", "timestamp", "permalink", "created_at")
+
+
+class MediaRow(CompactRow):
+    __slots__ = ("id", "post_id", "media_type", "file_path", "thumbnail_path", "order")
+
+
+class FbPostRow(CompactRow):
+    __slots__ = ("id", "group_id", "author_name", "content", "timestamp", "permalink",
+                 "comment_count", "created_at")
+
+
+class NewsletterEmailRow(CompactRow):
+    __slots__ = ("id", "user_id", "message_id", "from_address", "from_name", "to_address", "subject",
+                 "body_text", "_body_html", "received_at", "processed", "is_confirmation",
+                 "confirmation_clicked", "digest_date", "summary")
+
+    @property
+    def body_html(self) -> str | None:
+        return decompress_text(self._body_html)
+
+
+def format_run_log_line(line) -> str:
+    """Render a run_log_lines row the way DbLogHandler's formatter would."""
+    if line["ts"] is None:
+        return line["message"]
+    return f"{line['ts']} [{line['level']}] {line['message']}"
 
 
 class Database:
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, check_same_thread: bool = True,
+                 profile: SqliteProfile | None = None, readonly: bool = False):
         self.db_path = db_path
+        self._check_same_thread = check_same_thread
+        self.profile = profile or SqliteProfile.from_config()
+        self.readonly = readonly
         self._conn = None
+        self._reader = None
+        self._tx_depth = 0
 
     @property
     def conn(self) -> sqlite3.Connection:
         if self._conn is None:
-            self._conn = sqlite3.connect(self.db_path)
+            if self.readonly:
+                # mode=ro needs the file to exist already; the writer handle creates it
+                target, uri = f"{Path(self.db_path).absolute().as_uri()}?mode=ro", True
+            else:
+                target, uri = self.db_path, False
+            self._conn = sqlite3.connect(
+                target, uri=uri, check_same_thread=self._check_same_thread,
+                timeout=self.profile.busy_timeout_ms / 1000,
+            )
             self._conn.row_factory = sqlite3.Row
-            self._conn.execute("PRAGMA journal_mode=WAL")
-            self._conn.execute("PRAGMA foreign_keys=ON")
+            self.profile.apply(self._conn, readonly=self.readonly)
         return self._conn
 
+    def reader(self) -> "Database":
+        """Read-only handle on a separate connection, for report-style and feed reads.
+
+        It opens with mode=ro and query_only, and uses the profile's reader
+        cache size. Each SELECT runs in its own WAL snapshot that ends with the
+        statement, so a long digest build never pins old pages or stalls a
+        checkpoint, and it never waits on this handle's write transaction.
+        It does not see this handle's uncommitted writes.
+        """
+        if self.readonly:
+            return self
+        if self._reader is None:
+            self._reader = Database(self.db_path, check_same_thread=self._check_same_thread,
+                                    profile=self.profile.for_reader(), readonly=True)
+        return self._reader
+
     def execute(self, sql: str, params=()) -> sqlite3.Cursor:
         return self.conn.execute(sql, params)
 
+    def _commit(self):
+        """Commit a single write, unless it is part of an open transaction()."""
+        if not self._tx_depth:
+            self.conn.commit()
+
+    @contextmanager
+    def transaction(self):
+        """Unit of work: every write inside the block lands in one commit.
+
+        The outermost block takes the write lock up front (BEGIN IMMEDIATE)
+        and commits on exit or rolls everything back on error. Nested blocks
+        are savepoints, so a failed inner block can be caught without losing
+        the outer one's writes. Keep network I/O out of the block: other
+        writers wait on the lock until it commits.
+        """
+        if self._tx_depth:
+            savepoint = f"sp_{self._tx_depth}"
+            self.conn.execute(f"SAVEPOINT {savepoint}")
+            self._tx_depth += 1
+            try:
+                yield self
+            except BaseException:
+                self.conn.execute(f"ROLLBACK TO {savepoint}")
+                raise
+            finally:
+                self._tx_depth -= 1
+                self.conn.execute(f"RELEASE {savepoint}")
+            return
+        self.conn.execute("BEGIN IMMEDIATE")
+        self._tx_depth = 1
+        try:
+            yield self
+        except BaseException:
+            self._tx_depth = 0
+            self.conn.rollback()
+            raise
+        self._tx_depth = 0
+        self.conn.commit()
+
+    def data_version(self) -> int:
+        """SQLite's data_version for this connection; it moves when any other connection commits."""
+        return self.execute("PRAGMA data_version").fetchone()[0]
+
     def initialize(self):
         self.conn.executescript("""
             CREATE TABLE IF NOT EXISTS users (
@@ -99,6 +452,18 @@ class Database:
                 finished_at DATETIME
             );
 
+            -- Run logs, one row per record; the runs' log columns only hold
+            -- logs written before this table existed
+            CREATE TABLE IF NOT EXISTS run_log_lines (
+                run_kind TEXT NOT NULL CHECK(run_kind IN ('scrape','manual')),
+                run_id INTEGER NOT NULL,
+                seq INTEGER NOT NULL,
+                ts TEXT,
+                level TEXT,
+                message TEXT NOT NULL,
+                PRIMARY KEY (run_kind, run_id, seq)
+            );
+
             CREATE TABLE IF NOT EXISTS fb_groups (
                 user_id INTEGER NOT NULL REFERENCES users(id),
                 group_id TEXT NOT NULL,
@@ -156,7 +521,52 @@ class Database:
                 status TEXT DEFAULT 'pending',
                 error TEXT
             );
+
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL REFERENCES users(id),
+                type TEXT NOT NULL,
+                payload TEXT,
+                status TEXT NOT NULL DEFAULT 'pending'
+                    CHECK(status IN ('pending','running','done','error')),
+                lease_owner TEXT,
+                lease_expires_at DATETIME,
+                attempts INTEGER DEFAULT 0,
+                error TEXT,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                started_at DATETIME,
+                finished_at DATETIME
+            );
+
+            CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, id);
+
+            CREATE TABLE IF NOT EXISTS scheduler_stats (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                worker TEXT NOT NULL,
+                name TEXT NOT NULL,
+                count INTEGER NOT NULL DEFAULT 0,
+                errors INTEGER NOT NULL DEFAULT 0,
+                total_seconds REAL NOT NULL DEFAULT 0,
+                max_seconds REAL NOT NULL DEFAULT 0,
+                value REAL,
+                heartbeat_at DATETIME,
+                recorded_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            );
+
+            CREATE INDEX IF NOT EXISTS idx_scheduler_stats_recorded ON scheduler_stats(recorded_at);
+
+            CREATE TABLE IF NOT EXISTS user_leases (
+                user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+                owner TEXT NOT NULL,
+                expires_at DATETIME NOT NULL
+            );
+
+            CREATE TABLE IF NOT EXISTS scraper_replicas (
+                owner TEXT PRIMARY KEY,
+                expires_at DATETIME NOT NULL
+            );
         """)
+        migrate(self.conn)
 
     # ── Users ──────────────────────────────────────────────────────
 
@@ -165,7 +575,7 @@ class Database:
             "INSERT INTO users (email, password_hash) VALUES (?, ?)",
             (email, password_hash),
         )
-        self.conn.commit()
+        self._commit()
         return cursor.lastrowid
 
     def get_user_by_email(self, email: str) -> dict | None:
@@ -186,7 +596,7 @@ class Database:
 
     def deactivate_user(self, user_id: int):
         self.execute("UPDATE users SET is_active=0 WHERE id=?", (user_id,))
-        self.conn.commit()
+        self._commit()
 
     # ── Sessions ───────────────────────────────────────────────────
 
@@ -195,7 +605,7 @@ class Database:
             "INSERT INTO sessions (token, user_id, expires_at) VALUES (?, ?, ?)",
             (token, user_id, expires_at),
         )
-        self.conn.commit()
+        self._commit()
 
     def get_session(self, token: str) -> dict | None:
         row = self.execute(
@@ -206,11 +616,12 @@ class Database:
 
     def delete_session(self, token: str):
         self.execute("DELETE FROM sessions WHERE token=?", (token,))
-        self.conn.commit()
+        self._commit()
 
-    def delete_expired_sessions(self):
-        self.execute("DELETE FROM sessions WHERE expires_at <= datetime('now')")
-        self.conn.commit()
+    def delete_expired_sessions(self) -> int:
+        cursor = self.execute("DELETE FROM sessions WHERE expires_at <= datetime('now')")
+        self._commit()
+        return cursor.rowcount
 
     # ── User Config ────────────────────────────────────────────────
 
@@ -220,7 +631,8 @@ class Database:
                ON CONFLICT(user_id, key) DO UPDATE SET value=excluded.value""",
             (user_id, key, value),
         )
-        self.conn.commit()
+        self._commit()
+        self.settings_cache.invalidate(user_id)
 
     def get_user_config(self, user_id: int, key: str) -> str | None:
         row = self.execute(
@@ -229,14 +641,58 @@ class Database:
         ).fetchone()
         return row["value"] if row else None
 
+    @property
+    def settings_cache(self) -> SettingsCache:
+        return _settings_cache(self.db_path)
+
+    def load_user_settings(self, user_ids: list[int] | None = None) -> dict[int, UserSettings]:
+        """Load settings for user_ids (default: every active user) in one query.
+
+        Loading all active users replaces the process-wide cache; loading a
+        subset only refreshes those users.
+        """
+        token = self.settings_cache.token()
+        excluded = ",".join("?" * len(EXCLUDED_KEYS))
+        if user_ids is None:
+            rows = self.execute(
+                f"""SELECT u.id AS user_id, uc.key, uc.value FROM users u
+                    JOIN user_config c ON c.user_id = u.id AND c.key = 'ig_cookies'
+                    LEFT JOIN user_config uc ON uc.user_id = u.id AND uc.key NOT IN ({excluded})
+                    WHERE u.is_active = 1""",
+                EXCLUDED_KEYS,
+            ).fetchall()
+        else:
+            if not user_ids:
+                return {}
+            placeholders = ",".join("?" * len(user_ids))
+            rows = self.execute(
+                f"""SELECT user_id, key, value FROM user_config
+                    WHERE user_id IN ({placeholders}) AND key NOT IN ({excluded})""",
+                (*user_ids, *EXCLUDED_KEYS),
+            ).fetchall()
+        values: dict[int, dict[str, str]] = {uid: {} for uid in user_ids or []}
+        for row in rows:
+            user_values = values.setdefault(row["user_id"], {})
+            if row["key"] is not None:
+                user_values[row["key"]] = row["value"]
+        settings = {uid: UserSettings(uid, v) for uid, v in values.items()}
+        if user_ids is None:
+            self.settings_cache.replace(settings, token)
+        else:
+            for s in settings.values():
+                self.settings_cache.put(s, token)
+        return settings
+
+    def get_user_settings(self, user_id: int) -> UserSettings:
+        """Cached settings snapshot for user_id, loaded on a miss."""
+        settings = self.settings_cache.get(user_id)
+        if settings is None:
+            settings = self.load_user_settings([user_id])[user_id]
+        return settings
+
     # ── Instagram Accounts ─────────────────────────────────────────
 
     def upsert_account(self, user_id: int, username: str, profile_pic_path: str | None):
-        # Ensure following column exists (migration for existing DBs)
-        try:
-            self.execute("ALTER TABLE accounts ADD COLUMN following BOOLEAN NOT NULL DEFAULT 1")
-        except Exception:
-            pass
         self.execute(
             """INSERT INTO accounts (user_id, username, profile_pic_path, following)
                VALUES (?, ?, ?, 1)
@@ -245,7 +701,7 @@ class Database:
                  following=1""",
             (user_id, username, profile_pic_path),
         )
-        self.conn.commit()
+        self._commit()
 
     def mark_accounts_unfollowed(self, user_id: int, usernames: list[str]):
         """Mark accounts not in usernames as unfollowed (keeps them in DB for history)."""
@@ -256,7 +712,7 @@ class Database:
             f"UPDATE accounts SET following=0 WHERE user_id=? AND username NOT IN ({placeholders})",
             [user_id] + usernames,
         )
-        self.conn.commit()
+        self._commit()
 
     def get_account(self, user_id: int, username: str) -> dict | None:
         row = self.execute(
@@ -277,27 +733,39 @@ class Database:
             "UPDATE accounts SET last_checked_at=datetime('now') WHERE user_id=? AND username=?",
             (user_id, username),
         )
-        self.conn.commit()
+        self._commit()
 
     # ── Instagram Posts ────────────────────────────────────────────
 
     def insert_post(self, user_id: int, id: str, username: str, post_type: str,
                     caption: str, timestamp: str, permalink: str) -> bool:
-        try:
-            self.execute(
-                """INSERT INTO posts (id, user_id, username, type, caption, timestamp, permalink)
-                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                (id, user_id, username, post_type, caption, timestamp, permalink),
-            )
-            self.conn.commit()
-            return True
-        except sqlite3.IntegrityError:
-            return False
+        # Only a clash on the id means "already stored"; other constraint
+        # failures are real errors and raise
+        cur = self.execute(
+            """INSERT INTO posts (id, user_id, username, type, caption, timestamp, permalink)
+               VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT DO NOTHING""",
+            (id, user_id, username, post_type, caption, timestamp, permalink),
+        )
+        self._commit()
+        return cur.rowcount == 1
 
     def get_post(self, post_id: str) -> dict | None:
         row = self.execute("SELECT * FROM posts WHERE id=?", (post_id,)).fetchone()
         return dict(row) if row else None
 
+    def filter_new_post_ids(self, user_id: int, ids: list[str]) -> list[str]:
+        """The ids (in order, without repeats) that user_id does not have yet, in one PK lookup."""
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return []
+        placeholders = ",".join("?" for _ in ids)
+        known = {
+            row["id"] for row in self.execute(
+                f"SELECT id FROM posts WHERE user_id=? AND id IN ({placeholders})", [user_id, *ids]
+            )
+        }
+        return [post_id for post_id in ids if post_id not in known]
+
     def insert_media(self, post_id: str, media_type: str, file_path: str,
                      thumbnail_path: str | None, order: int = 0):
         self.execute(
@@ -305,7 +773,17 @@ class Database:
                VALUES (?, ?, ?, ?, ?)""",
             (post_id, media_type, file_path, thumbnail_path, order),
         )
-        self.conn.commit()
+        self._commit()
+
+    def insert_media_many(self, post_id: str, items: list[dict]):
+        """Insert a post's media rows (dicts with media_type, file_path, thumbnail_path, order) at once."""
+        self.conn.executemany(
+            """INSERT INTO media (post_id, media_type, file_path, thumbnail_path, "order")
+               VALUES (?, ?, ?, ?, ?)""",
+            [(post_id, m["media_type"], m["file_path"], m.get("thumbnail_path"), m.get("order", 0))
+             for m in items],
+        )
+        self._commit()
 
     def get_media_for_post(self, post_id: str) -> list[dict]:
         rows = self.execute(
@@ -314,25 +792,110 @@ class Database:
         return [dict(r) for r in rows]
 
     def get_feed(self, user_id: int, limit: int = 20, offset: int = 0,
-                 account: str | None = None) -> list[dict]:
+                 account: str | None = None, cursor: str | None = None) -> list[dict]:
+        """Newest posts first; pass encode_feed_cursor(last_item) as cursor to seek to the next page."""
+        where = ["user_id=?"]
+        params: list = [user_id]
         if account:
-            rows = self.execute(
-                "SELECT * FROM posts WHERE user_id=? AND username=? ORDER BY timestamp DESC LIMIT ? OFFSET ?",
-                (user_id, account, limit, offset),
-            ).fetchall()
-        else:
-            rows = self.execute(
-                "SELECT * FROM posts WHERE user_id=? ORDER BY timestamp DESC LIMIT ? OFFSET ?",
-                (user_id, limit, offset),
-            ).fetchall()
+            where.append("username=?")
+            params.append(account)
+        if cursor:
+            clause, seek_params = _feed_seek("instagram", decode_feed_cursor(cursor), "timestamp", "id")
+            where.append(clause)
+            params.extend(seek_params)
+            offset = 0
+        rows = self.execute(
+            f"""SELECT * FROM posts WHERE {" AND ".join(where)}
+                ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?""",
+            (*params, limit, offset),
+        ).fetchall()
         return [dict(r) for r in rows]
 
-    def get_new_posts_since(self, user_id: int, since: str) -> list[dict]:
+    def get_new_posts_since(self, user_id: int, since: str, with_media: bool = False) -> list[dict]:
         rows = self.execute(
             "SELECT * FROM posts WHERE user_id=? AND created_at > ? ORDER BY timestamp DESC",
             (user_id, since),
         ).fetchall()
-        return [dict(r) for r in rows]
+        posts = [dict(r) for r in rows]
+        return self.hydrate_feed(posts) if with_media else posts
+
+    def iter_posts(self, user_id: int, since: str | None = None,
+                   batch_size: int = 500) -> Iterator[PostRow]:
+        """The user's posts (stored after since, if given) in the order they were stored."""
+        where, params = "user_id = ?", (user_id,)
+        if since is not None:
+            where, params = "user_id = ? AND created_at > ?", (user_id, since)
+        return self._iter_keyset(PostRow, "posts", "created_at", where, params, batch_size)
+
+    def get_media_for_posts(self, post_ids: list[str]) -> dict[str, list[dict]]:
+        """Media for many posts in one query, grouped by post id and ordered."""
+        return self._group_by_post(
+            'SELECT * FROM media WHERE post_id IN ({}) ORDER BY post_id, "order"', post_ids
+        )
+
+    def iter_media(self, post_ids: list[str], batch_size: int = 500) -> Iterator[MediaRow]:
+        """Media for post_ids, batch_size posts per query, ordered by post and position."""
+        columns = ", ".join(f'"{column}"' for column in MediaRow.COLUMNS)
+        for start in range(0, len(post_ids), batch_size):
+            chunk = list(post_ids[start:start + batch_size])
+            cursor = self.conn.cursor()
+            cursor.row_factory = None
+            placeholders = ",".join("?" for _ in chunk)
+            rows = cursor.execute(
+                f'SELECT {columns} FROM media WHERE post_id IN ({placeholders}) ORDER BY post_id, "order"',
+                chunk,
+            ).fetchall()
+            for values in rows:
+                yield MediaRow(*values)
+
+    def hydrate_feed(self, items: list[dict]) -> list[dict]:
+        """Attach media to IG items and comments to FB items, in one query per platform.
+
+        Items without a platform (plain posts rows) count as Instagram.
+        """
+        ig = [item for item in items if item.get("platform", "instagram") == "instagram"]
+        fb = [item for item in items if item.get("platform") == "facebook"]
+        media = self.get_media_for_posts([item["id"] for item in ig]) if ig else {}
+        comments = self.get_comments_for_posts([item["id"] for item in fb]) if fb else {}
+        for item in ig:
+            item["media"] = media.get(item["id"], [])
+        for item in fb:
+            item["comments"] = comments.get(item["id"], [])
+        return items
+
+    def _group_by_post(self, sql: str, post_ids: list[str]) -> dict[str, list[dict]]:
+        grouped: dict[str, list[dict]] = {}
+        if not post_ids:
+            return grouped
+        placeholders = ",".join("?" for _ in post_ids)
+        for row in self.execute(sql.format(placeholders), list(post_ids)).fetchall():
+            grouped.setdefault(row["post_id"], []).append(dict(row))
+        return grouped
+
+    def _iter_keyset(self, row_type: type[CompactRow], table: str, key: str, where: str,
+                     params: tuple, batch_size: int) -> Iterator[CompactRow]:
+        """Stream row_type rows of table matching where, in (key, rowid) order.
+
+        Each batch of batch_size rows is one statement that is read to the end
+        before its rows are yielded, so no read snapshot stays open while the
+        caller works on them, and a caller that updates rows it has already
+        seen doesn't disturb the batches still to come.
+        """
+        columns = ", ".join(f'"{column}"' for column in row_type.COLUMNS)
+        seek, seek_params = "", ()
+        while True:
+            cursor = self.conn.cursor()
+            cursor.row_factory = None  # plain tuples; row_type is the only per-row object
+            batch = cursor.execute(
+                f"""SELECT {key}, rowid, {columns} FROM {table}
+                    WHERE {where}{seek} ORDER BY {key}, rowid LIMIT ?""",
+                (*params, *seek_params, batch_size),
+            ).fetchall()
+            for values in batch:
+                yield row_type(*values[2:])
+            if len(batch) < batch_size:
+                return
+            seek, seek_params = f" AND ({key}, rowid) > (?, ?)", batch[-1][:2]
 
     # ── Scrape Runs ────────────────────────────────────────────────
 
@@ -340,7 +903,7 @@ class Database:
         cursor = self.execute(
             "INSERT INTO scrape_runs (user_id) VALUES (?)", (user_id,)
         )
-        self.conn.commit()
+        self._commit()
         return cursor.lastrowid
 
     def finish_scrape_run(self, run_id: int, status: str,
@@ -353,18 +916,18 @@ class Database:
                WHERE id=?""",
             (status, new_posts, new_stories, error, run_id),
         )
-        self.conn.commit()
+        self._commit()
 
     def get_scrape_run(self, run_id: int) -> dict | None:
         row = self.execute("SELECT * FROM scrape_runs WHERE id=?", (run_id,)).fetchone()
-        return dict(row) if row else None
+        if not row:
+            return None
+        run = dict(row)
+        run["log"] = self.get_run_log("scrape", run_id)
+        return run
 
     def append_scrape_run_log(self, run_id: int, line: str):
-        self.execute(
-            "UPDATE scrape_runs SET log = log || ? WHERE id=?",
-            (line + "\n", run_id),
-        )
-        self.conn.commit()
+        self.append_run_log_lines("scrape", run_id, [(None, None, line)])
 
     def get_recent_scrape_runs(self, user_id: int, limit: int = 20) -> list[dict]:
         rows = self.execute(
@@ -382,6 +945,29 @@ class Database:
         ).fetchone()
         return row["finished_at"] if row else None
 
+    def get_scrape_schedules(self, user_id: int | None = None) -> list[dict]:
+        """Cron schedule, stale flag and last successful scrape for active users, in one query."""
+        where = "u.is_active = 1"
+        params = []
+        if user_id is not None:
+            where += " AND u.id = ?"
+            params.append(user_id)
+        rows = self.execute(
+            f"""SELECT u.id AS user_id,
+                       cron.value AS cron_schedule,
+                       stale.value AS ig_cookies_stale,
+                       (SELECT MAX(finished_at) FROM scrape_runs sr
+                        WHERE sr.user_id = u.id AND sr.status='success'
+                        AND sr.finished_at IS NOT NULL) AS last_scrape
+                FROM users u
+                JOIN user_config ck ON ck.user_id = u.id AND ck.key = 'ig_cookies'
+                LEFT JOIN user_config cron ON cron.user_id = u.id AND cron.key = 'cron_schedule'
+                LEFT JOIN user_config stale ON stale.user_id = u.id AND stale.key = 'ig_cookies_stale'
+                WHERE {where}""",
+            params,
+        ).fetchall()
+        return [dict(r) for r in rows]
+
     # ── Manual Runs ────────────────────────────────────────────────
 
     def insert_manual_run(self, user_id: int, since_date: str) -> int:
@@ -389,7 +975,7 @@ class Database:
             "INSERT INTO manual_runs (user_id, since_date) VALUES (?, ?)",
             (user_id, since_date),
         )
-        self.conn.commit()
+        self._commit()
         return cursor.lastrowid
 
     def get_pending_manual_run(self, user_id: int) -> dict | None:
@@ -404,7 +990,7 @@ class Database:
             "UPDATE manual_runs SET status='running', started_at=datetime('now') WHERE id=?",
             (run_id,),
         )
-        self.conn.commit()
+        self._commit()
 
     def finish_manual_run(self, run_id: int, status: str,
                           new_posts: int = 0, new_stories: int = 0,
@@ -416,18 +1002,13 @@ class Database:
                WHERE id=?""",
             (status, new_posts, new_stories, error, run_id),
         )
-        self.conn.commit()
+        self._commit()
 
     def append_manual_run_log(self, run_id: int, line: str):
-        self.execute(
-            "UPDATE manual_runs SET log = log || ? WHERE id=?",
-            (line + "\n", run_id),
-        )
-        self.conn.commit()
+        self.append_run_log_lines("manual", run_id, [(None, None, line)])
 
     def get_manual_run_log(self, run_id: int) -> str:
-        row = self.execute("SELECT log FROM manual_runs WHERE id=?", (run_id,)).fetchone()
-        return row["log"] if row else ""
+        return self.get_run_log("manual", run_id)
 
     def get_recent_manual_runs(self, user_id: int, limit: int = 10) -> list[dict]:
         rows = self.execute(
@@ -443,7 +1024,378 @@ class Database:
                WHERE status='running'
                AND started_at < datetime('now', '-1 hour')"""
         )
-        self.conn.commit()
+        self._commit()
+
+    # ── Run Logs ───────────────────────────────────────────────────
+
+    def append_run_log_lines(self, run_kind: str, run_id: int,
+                             lines: list[tuple[str | None, str | None, str]]):
+        """Append (ts, level, message) records to a run's log in one commit."""
+        self.conn.executemany(
+            """INSERT INTO run_log_lines (run_kind, run_id, seq, ts, level, message)
+               VALUES (?1, ?2, (SELECT COALESCE(MAX(seq), 0) + 1 FROM run_log_lines
+                                WHERE run_kind=?1 AND run_id=?2), ?3, ?4, ?5)""",
+            [(run_kind, run_id, ts, level, message) for ts, level, message in lines],
+        )
+        self._commit()
+
+    def get_run_log_lines(self, run_kind: str, run_id: int, after_seq: int = 0,
+                          limit: int = 1000) -> list[dict]:
+        """Log records with seq > after_seq, oldest first, for tailing a run."""
+        rows = self.execute(
+            """SELECT seq, ts, level, message FROM run_log_lines
+               WHERE run_kind=? AND run_id=? AND seq > ?
+               ORDER BY seq LIMIT ?""",
+            (run_kind, run_id, after_seq, limit),
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    def get_run_log(self, run_kind: str, run_id: int) -> str:
+        """A run's full log as text, including any legacy log column content."""
+        table = {"scrape": "scrape_runs", "manual": "manual_runs"}[run_kind]
+        row = self.execute(f"SELECT log FROM {table} WHERE id=?", (run_id,)).fetchone()
+        if not row:
+            return ""
+        rows = self.execute(
+            "SELECT ts, level, message FROM run_log_lines WHERE run_kind=? AND run_id=? ORDER BY seq",
+            (run_kind, run_id),
+        ).fetchall()
+        return (row["log"] or "") + "".join(format_run_log_line(r) + "\n" for r in rows)
+
+    # ── Jobs ───────────────────────────────────────────────────────
+
+    def enqueue_job(self, user_id: int, job_type: str, payload: dict | None = None) -> int | None:
+        """Queue a job unless an identical one is already pending. Returns the job id."""
+        cursor = self.execute(
+            """INSERT INTO jobs (user_id, type, payload)
+               SELECT ?, ?, ? WHERE NOT EXISTS (
+                   SELECT 1 FROM jobs WHERE status='pending' AND user_id=? AND type=?
+               )""",
+            (user_id, job_type, json.dumps(payload) if payload is not None else None,
+             user_id, job_type),
+        )
+        self._commit()
+        return cursor.lastrowid if cursor.rowcount else None
+
+    def enqueue_pending_config_jobs(self, job_types: list[str]):
+        """Queue jobs for user_config trigger keys still set to 'pending'.
+
+        Covers triggers written before the jobs table existed.
+        """
+        placeholders = ",".join("?" for _ in job_types)
+        self.execute(
+            f"""INSERT INTO jobs (user_id, type)
+                SELECT uc.user_id, uc.key FROM user_config uc
+                WHERE uc.key IN ({placeholders}) AND uc.value='pending'
+                AND NOT EXISTS (
+                    SELECT 1 FROM jobs j
+                    WHERE j.status IN ('pending','running') AND j.user_id=uc.user_id AND j.type=uc.key
+                )
+                ORDER BY uc.user_id, uc.rowid""",
+            job_types,
+        )
+        self._commit()
+
+    def claim_next_job(self, owner: str, lease_seconds: int = 3600) -> dict | None:
+        """Atomically claim the oldest pending job for owner, or None if the queue is empty.
+
+        Only jobs for users owner holds a live user lease on are claimed, the same
+        users it schedules scrapes for, so one user's work never runs on two
+        replicas. Jobs for unleased users wait until a replica takes the lease.
+        """
+        row = self.execute(
+            """UPDATE jobs
+               SET status='running', lease_owner=?, lease_expires_at=datetime('now', ?),
+                   attempts=attempts + 1, started_at=datetime('now')
+               WHERE id = (
+                   SELECT id FROM jobs WHERE status='pending' AND user_id IN (
+                       SELECT user_id FROM user_leases
+                       WHERE owner = ? AND expires_at > datetime('now'))
+                   ORDER BY id LIMIT 1)
+               RETURNING *""",
+            (owner, f"+{int(lease_seconds)} seconds", owner),
+        ).fetchone()
+        self._commit()
+        if not row:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"]) if job["payload"] else {}
+        return job
+
+    def complete_job(self, job_id: int):
+        self.execute(
+            """UPDATE jobs SET status='done', finished_at=datetime('now'),
+                   lease_owner=NULL, lease_expires_at=NULL
+               WHERE id=?""",
+            (job_id,),
+        )
+        self._commit()
+
+    def fail_job(self, job_id: int, error: str):
+        self.execute(
+            """UPDATE jobs SET status='error', error=?, finished_at=datetime('now'),
+                   lease_owner=NULL, lease_expires_at=NULL
+               WHERE id=?""",
+            (error, job_id),
+        )
+        self._commit()
+
+    def reclaim_expired_jobs(self, max_attempts: int = 3) -> int:
+        """Return running jobs whose lease has expired to the pending queue.
+
+        A job that has already been claimed max_attempts times most likely
+        crashed its worker each time; it is failed instead of retried forever.
+        """
+        with self.transaction():
+            self.execute(
+                """UPDATE jobs SET status='error', finished_at=datetime('now'),
+                       error='Gave up after ' || attempts || ' attempts (worker lease expired)',
+                       lease_owner=NULL, lease_expires_at=NULL
+                   WHERE status='running' AND lease_expires_at < datetime('now')
+                     AND attempts >= ?""",
+                (max_attempts,),
+            )
+            cursor = self.execute(
+                """UPDATE jobs SET status='pending', lease_owner=NULL, lease_expires_at=NULL
+                   WHERE status='running' AND lease_expires_at < datetime('now')"""
+            )
+        return cursor.rowcount
+
+    def release_jobs(self, owner: str) -> int:
+        """Return every job still leased by owner to the pending queue."""
+        cursor = self.execute(
+            """UPDATE jobs SET status='pending', lease_owner=NULL, lease_expires_at=NULL
+               WHERE status='running' AND lease_owner=?""",
+            (owner,),
+        )
+        self._commit()
+        return cursor.rowcount
+
+    def get_job(self, job_id: int) -> dict | None:
+        row = self.execute("SELECT * FROM jobs WHERE id=?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def count_pending_jobs(self) -> int:
+        return self.execute("SELECT COUNT(*) FROM jobs WHERE status='pending'").fetchone()[0]
+
+    # ── User Leases ────────────────────────────────────────────────
+
+    def get_active_user_ids(self) -> list[int]:
+        rows = self.execute("SELECT id FROM users WHERE is_active=1 ORDER BY id").fetchall()
+        return [r["id"] for r in rows]
+
+    def acquire_user_lease(self, user_id: int, owner: str, lease_seconds: int) -> bool:
+        """Take or renew the lease on user_id unless another owner holds a live one."""
+        cursor = self.execute(
+            """INSERT INTO user_leases (user_id, owner, expires_at)
+               VALUES (?, ?, datetime('now', ?))
+               ON CONFLICT(user_id) DO UPDATE SET owner=excluded.owner, expires_at=excluded.expires_at
+               WHERE user_leases.owner = excluded.owner OR user_leases.expires_at <= datetime('now')""",
+            (user_id, owner, f"+{int(lease_seconds)} seconds"),
+        )
+        self._commit()
+        return cursor.rowcount == 1
+
+    def renew_user_leases(self, owner: str, lease_seconds: int) -> list[int]:
+        """Extend every live lease held by owner; returns the renewed user ids."""
+        rows = self.execute(
+            """UPDATE user_leases SET expires_at=datetime('now', ?)
+               WHERE owner=? AND expires_at > datetime('now')
+               RETURNING user_id""",
+            (f"+{int(lease_seconds)} seconds", owner),
+        ).fetchall()
+        self._commit()
+        return [r["user_id"] for r in rows]
+
+    def release_user_leases(self, owner: str, user_ids: list[int] | None = None) -> int:
+        """Give up owner's leases on user_ids (default: all of them)."""
+        if user_ids is None:
+            cursor = self.execute("DELETE FROM user_leases WHERE owner=?", (owner,))
+        else:
+            if not user_ids:
+                return 0
+            placeholders = ",".join("?" * len(user_ids))
+            cursor = self.execute(
+                f"DELETE FROM user_leases WHERE owner=? AND user_id IN ({placeholders})",
+                (owner, *user_ids),
+            )
+        self._commit()
+        return cursor.rowcount
+
+    def heartbeat_replica(self, owner: str, lease_seconds: int) -> list[str]:
+        """Mark owner alive for lease_seconds; returns every live replica (owner included)."""
+        self.execute(
+            """INSERT INTO scraper_replicas (owner, expires_at) VALUES (?, datetime('now', ?))
+               ON CONFLICT(owner) DO UPDATE SET expires_at=excluded.expires_at""",
+            (owner, f"+{int(lease_seconds)} seconds"),
+        )
+        self.execute("DELETE FROM scraper_replicas WHERE expires_at <= datetime('now')")
+        self._commit()
+        rows = self.execute("SELECT owner FROM scraper_replicas ORDER BY owner").fetchall()
+        return [r["owner"] for r in rows]
+
+    def remove_replica(self, owner: str):
+        self.execute("DELETE FROM scraper_replicas WHERE owner=?", (owner,))
+        self._commit()
+
+    def get_live_user_leases(self) -> list[dict]:
+        rows = self.execute(
+            "SELECT * FROM user_leases WHERE expires_at > datetime('now') ORDER BY user_id"
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    # ── Scheduler Stats ────────────────────────────────────────────
+
+    def record_scheduler_stats(self, worker: str, rows: list[dict], keep_hours: int = 24):
+        """Append one interval of scheduler metrics and drop rows older than keep_hours."""
+        self.conn.executemany(
+            """INSERT INTO scheduler_stats
+               (worker, name, count, errors, total_seconds, max_seconds, value, heartbeat_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, datetime(?, 'unixepoch'))""",
+            [(worker, r["name"], r["count"], r["errors"], r["total_seconds"],
+              r["max_seconds"], r["value"], r["heartbeat"]) for r in rows],
+        )
+        self.execute(
+            "DELETE FROM scheduler_stats WHERE recorded_at < datetime('now', ?)",
+            (f"-{keep_hours} hours",),
+        )
+        self._commit()
+
+    def get_scheduler_stats(self, hours: int = 24) -> list[dict]:
+        rows = self.execute(
+            """SELECT * FROM scheduler_stats WHERE recorded_at >= datetime('now', ?)
+               ORDER BY recorded_at, id""",
+            (f"-{hours} hours",),
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+    # ── Retention ──────────────────────────────────────────────────
+    # Each method handles one bounded batch and commits it, so a long cleanup
+    # never holds the write lock for more than one batch at a time.
+
+    def delete_old_stories(self, user_id: int, older_than_days: int,
+                           limit: int = 500) -> tuple[int, list[str]]:
+        """Delete up to limit of the user's stories scraped more than older_than_days ago.
+
+        Returns how many were deleted and the media files left without a post
+        (stories other users still have keep theirs) for the caller to remove.
+        """
+        with self.transaction():
+            ids = [r["id"] for r in self.execute(
+                """SELECT id FROM posts
+                   WHERE user_id=? AND created_at < datetime('now', ?) AND type='story'
+                   LIMIT ?""",
+                (user_id, f"-{int(older_than_days)} days", limit),
+            ).fetchall()]
+            if not ids:
+                return 0, []
+            placeholders = ",".join("?" * len(ids))
+            self.execute(f"DELETE FROM posts WHERE user_id=? AND id IN ({placeholders})", (user_id, *ids))
+            return len(ids), self._delete_orphan_media(ids)
+
+    def _delete_orphan_media(self, post_ids: list[str]) -> list[str]:
+        placeholders = ",".join("?" * len(post_ids))
+        rows = self.execute(
+            f"""SELECT id, file_path, thumbnail_path FROM media m
+                WHERE post_id IN ({placeholders})
+                  AND NOT EXISTS (SELECT 1 FROM posts p WHERE p.id = m.post_id)""",
+            post_ids,
+        ).fetchall()
+        if not rows:
+            return []
+        self.execute(
+            f"DELETE FROM media WHERE id IN ({','.join('?' * len(rows))})",
+            [r["id"] for r in rows],
+        )
+        return [path for r in rows for path in (r["file_path"], r["thumbnail_path"]) if path]
+
+    def trim_old_media(self, user_id: int, older_than_days: int,
+                       limit: int = 500) -> tuple[int, list[str]]:
+        """Point up to limit media rows of the user's older posts at their thumbnails.
+
+        Only media with a thumbnail is trimmed, and only for posts no other
+        user has, whose retention may differ. Returns how many rows were
+        trimmed and the full-size files to remove from disk.
+        """
+        with self.transaction():
+            rows = self.execute(
+                """SELECT m.id, m.file_path FROM posts p JOIN media m ON m.post_id = p.id
+                   WHERE p.user_id=? AND p.created_at < datetime('now', ?)
+                     AND m.thumbnail_path IS NOT NULL AND m.file_path != m.thumbnail_path
+                     AND NOT EXISTS (SELECT 1 FROM posts o WHERE o.id = p.id AND o.user_id != p.user_id)
+                   LIMIT ?""",
+                (user_id, f"-{int(older_than_days)} days", limit),
+            ).fetchall()
+            if not rows:
+                return 0, []
+            # A video's thumbnail is a still, so the trimmed row is an image
+            self.execute(
+                f"""UPDATE media SET file_path = thumbnail_path, media_type = 'image'
+                    WHERE id IN ({','.join('?' * len(rows))})""",
+                [r["id"] for r in rows],
+            )
+            return len(rows), [r["file_path"] for r in rows if r["file_path"]]
+
+    def clear_old_run_logs(self, user_id: int, older_than_days: int, limit: int = 500) -> int:
+        """Drop the logs of up to limit scrape and manual runs, and the HTML of
+        digest runs, older than older_than_days; returns how many runs were cleared.
+
+        The run rows themselves stay: they are small, and scheduling reads the
+        last successful scrape from them.
+        """
+        age = f"-{int(older_than_days)} days"
+        cleared = 0
+        with self.transaction():
+            for kind, table in (("scrape", "scrape_runs"), ("manual", "manual_runs")):
+                ids = [r["id"] for r in self.execute(
+                    f"""SELECT id FROM {table} r
+                        WHERE user_id=? AND started_at < datetime('now', ?)
+                          AND (log != '' OR EXISTS (SELECT 1 FROM run_log_lines l
+                                                    WHERE l.run_kind=? AND l.run_id=r.id))
+                        LIMIT ?""",
+                    (user_id, age, kind, limit),
+                ).fetchall()]
+                if not ids:
+                    continue
+                placeholders = ",".join("?" * len(ids))
+                self.execute(f"DELETE FROM run_log_lines WHERE run_kind=? AND run_id IN ({placeholders})",
+                             (kind, *ids))
+                self.execute(f"UPDATE {table} SET log='' WHERE id IN ({placeholders})", ids)
+                cleared += len(ids)
+            cleared += self.execute(
+                """UPDATE newsletter_digest_runs SET digest_html=NULL
+                   WHERE id IN (SELECT id FROM newsletter_digest_runs
+                                WHERE user_id=? AND started_at < datetime('now', ?)
+                                  AND digest_html IS NOT NULL
+                                LIMIT ?)""",
+                (user_id, age, limit),
+            ).rowcount
+        return cleared
+
+    def auto_vacuum_mode(self) -> str:
+        return ("none", "full", "incremental")[self.execute("PRAGMA auto_vacuum").fetchone()[0]]
+
+    def incremental_vacuum(self, max_pages: int = 0) -> int:
+        """Return up to max_pages free pages (0 for all) to the filesystem; returns pages freed.
+
+        Only has an effect once auto_vacuum is incremental; see vacuum().
+        """
+        before = self.execute("PRAGMA freelist_count").fetchone()[0]
+        # execute() steps the pragma once, which frees a single page;
+        # executescript() runs it to completion
+        self.conn.executescript(f"PRAGMA incremental_vacuum({int(max_pages)});")
+        return before - self.execute("PRAGMA freelist_count").fetchone()[0]
+
+    def vacuum(self):
+        """Rewrite the whole file with auto_vacuum incremental, then rebuild the search indexes.
+
+        Needs an exclusive lock and free disk space for a full copy, so this
+        is a one-off (python -m compact), not something the scheduler runs.
+        VACUUM may renumber the rowids the FTS5 indexes point at.
+        """
+        self.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        self.execute("VACUUM")
+        self.rebuild_search_index()
 
     # ── Facebook Groups ────────────────────────────────────────────
 
@@ -454,7 +1406,7 @@ class Database:
                ON CONFLICT(user_id, group_id) DO UPDATE SET name=excluded.name, url=excluded.url""",
             (user_id, group_id, name, url),
         )
-        self.conn.commit()
+        self._commit()
 
     def get_fb_group(self, user_id: int, group_id: str) -> dict | None:
         row = self.execute(
@@ -487,30 +1439,27 @@ class Database:
                 (group_id,),
             )
             self.execute("DELETE FROM fb_posts WHERE group_id=?", (group_id,))
-        self.conn.commit()
+        self._commit()
 
     def update_fb_group_last_checked(self, user_id: int, group_id: str):
         self.execute(
             "UPDATE fb_groups SET last_checked_at=datetime('now') WHERE user_id=? AND group_id=?",
             (user_id, group_id),
         )
-        self.conn.commit()
+        self._commit()
 
     # ── Facebook Posts & Comments ──────────────────────────────────
 
     def insert_fb_post(self, id: str, group_id: str, author_name: str,
                        content: str, timestamp: str, permalink: str,
                        comment_count: int = 0) -> bool:
-        try:
-            self.execute(
-                """INSERT INTO fb_posts (id, group_id, author_name, content, timestamp, permalink, comment_count)
-                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                (id, group_id, author_name, content, timestamp, permalink, comment_count),
-            )
-            self.conn.commit()
-            return True
-        except sqlite3.IntegrityError:
-            return False
+        cur = self.execute(
+            """INSERT INTO fb_posts (id, group_id, author_name, content, timestamp, permalink, comment_count)
+               VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT DO NOTHING""",
+            (id, group_id, author_name, content, timestamp, permalink, comment_count),
+        )
+        self._commit()
+        return cur.rowcount == 1
 
     def get_fb_post(self, post_id: str) -> dict | None:
         row = self.execute("SELECT * FROM fb_posts WHERE id=?", (post_id,)).fetchone()
@@ -523,7 +1472,17 @@ class Database:
                VALUES (?, ?, ?, ?, ?)""",
             (post_id, author_name, content, timestamp, order),
         )
-        self.conn.commit()
+        self._commit()
+
+    def insert_fb_comments(self, post_id: str, comments: list[dict]):
+        """Insert a post's comments (dicts with author_name, content, timestamp, order) at once."""
+        self.conn.executemany(
+            """INSERT INTO fb_comments (post_id, author_name, content, timestamp, "order")
+               VALUES (?, ?, ?, ?, ?)""",
+            [(post_id, c["author_name"], c["content"], c["timestamp"], c.get("order", 0))
+             for c in comments],
+        )
+        self._commit()
 
     def get_comments_for_post(self, post_id: str) -> list[dict]:
         rows = self.execute(
@@ -531,6 +1490,12 @@ class Database:
         ).fetchall()
         return [dict(r) for r in rows]
 
+    def get_comments_for_posts(self, post_ids: list[str]) -> dict[str, list[dict]]:
+        """Comments for many FB posts in one query, grouped by post id and ordered."""
+        return self._group_by_post(
+            'SELECT * FROM fb_comments WHERE post_id IN ({}) ORDER BY post_id, "order"', post_ids
+        )
+
     def get_new_fb_posts_since(self, user_id: int, since: str) -> list[dict]:
         rows = self.execute(
             """SELECT fp.* FROM fb_posts fp
@@ -541,74 +1506,202 @@ class Database:
         ).fetchall()
         return [dict(r) for r in rows]
 
+    def iter_fb_posts(self, user_id: int, since: str | None = None,
+                      batch_size: int = 500) -> Iterator[FbPostRow]:
+        """Posts in the user's FB groups (stored after since, if given).
+
+        Group by group, and in the order they were stored within each group.
+        """
+        group_ids = [row["group_id"] for row in self.execute(
+            "SELECT group_id FROM fb_groups WHERE user_id=? ORDER BY group_id", (user_id,)
+        ).fetchall()]
+        for group_id in group_ids:
+            where, params = "group_id = ?", (group_id,)
+            if since is not None:
+                where, params = "group_id = ? AND created_at > ?", (group_id, since)
+            yield from self._iter_keyset(FbPostRow, "fb_posts", "created_at", where, params, batch_size)
+
     # ── Unified Feed ───────────────────────────────────────────────
 
     def get_unified_feed(self, user_id: int, limit: int = 20, offset: int = 0,
                          account: str | None = None, group_id: str | None = None,
-                         type: str | None = None, platform: str | None = None) -> list[dict]:
-        parts = []
-        params = []
-
+                         type: str | None = None, platform: str | None = None,
+                         cursor: str | None = None) -> list[dict]:
+        """IG and FB posts merged newest first, read from feed_items.
+
+        account narrows only the IG rows and group_id only the FB rows; the
+        other platform's rows stay unless platform excludes them. Pass
+        encode_feed_cursor(last_item) as cursor to seek straight to the next
+        page; offset is only honoured without a cursor.
+        """
+        where = ["user_id = ?"]
+        params: list = [user_id]
+        sources = []
         if platform != "facebook":
-            ig_where = ["user_id = ?"]
-            params.append(user_id)
-            if account:
-                ig_where.append("username = ?")
-                params.append(account)
-            if type:
-                ig_where.append("type = ?")
-                params.append(type)
-            ig_clause = " WHERE " + " AND ".join(ig_where)
-            parts.append(
-                f"""SELECT id, username AS source_name, type, caption AS content,
-                       timestamp, permalink, 'instagram' AS platform,
-                       NULL AS comment_count
-                FROM posts{ig_clause}"""
-            )
-
+            sources.append(("instagram", account))
         if platform != "instagram":
-            fb_where = ["fg.user_id = ?"]
-            params.append(user_id)
-            if group_id:
-                fb_where.append("fp.group_id = ?")
-                params.append(group_id)
-            if type:
-                fb_where.append("'fb_post' = ?")
-                params.append(type)
-            fb_clause = " WHERE " + " AND ".join(fb_where)
-            parts.append(
-                f"""SELECT fp.id, fg.name AS source_name, 'fb_post' AS type,
-                       fp.content, fp.timestamp, fp.permalink,
-                       'facebook' AS platform, fp.comment_count
-                FROM fb_posts fp JOIN fb_groups fg ON fp.group_id = fg.group_id{fb_clause}"""
-            )
+            sources.append(("facebook", group_id))
+        # Both platforms unfiltered need no platform clause at all
+        if len(sources) == 1 or account or group_id:
+            clauses = []
+            for source_platform, source_id in sources:
+                if source_id:
+                    clauses.append("(platform = ? AND source_id = ?)")
+                    params.extend([source_platform, source_id])
+                else:
+                    clauses.append("platform = ?")
+                    params.append(source_platform)
+            where.append(clauses[0] if len(clauses) == 1 else f"({' OR '.join(clauses)})")
+        if type:
+            where.append("type = ?")
+            params.append(type)
+        if cursor:
+            seek = decode_feed_cursor(cursor)
+            if len(sources) == 1:
+                clause, seek_params = _feed_seek(sources[0][0], seek, "timestamp", "item_id")
+            else:
+                clause, seek_params = "(timestamp, platform, item_id) < (?, ?, ?)", list(seek)
+            where.append(clause)
+            params.extend(seek_params)
+            offset = 0
 
-        if not parts:
-            return []
+        rows = self.execute(
+            f"""SELECT item_id AS id, source_name, type, content, timestamp, permalink,
+                       platform, comment_count
+                FROM feed_items WHERE {" AND ".join(where)}
+                ORDER BY timestamp DESC, platform DESC, item_id DESC LIMIT ? OFFSET ?""",
+            (*params, limit, offset),
+        ).fetchall()
+        return [dict(r) for r in rows]
 
-        sql = " UNION ALL ".join(parts) + " ORDER BY timestamp DESC LIMIT ? OFFSET ?"
-        params.extend([limit, offset])
-        rows = self.execute(sql, params).fetchall()
+    def rebuild_feed_items(self, user_id: int | None = None) -> int:
+        """Recreate feed_items from posts and fb_posts (all users, or one); returns the row count.
+
+        The triggers keep the table current; this repairs it after writes that
+        bypassed them, e.g. a restore from an old backup.
+        """
+        user_filter = "" if user_id is None else " WHERE user_id = ?"
+        group_filter = "" if user_id is None else " WHERE fg.user_id = ?"
+        params = () if user_id is None else (user_id,)
+        with self.transaction():
+            self.execute(f"DELETE FROM feed_items{user_filter}", params)
+            self.execute(
+                f"""INSERT INTO feed_items
+                        (user_id, platform, item_id, source_id, source_name, type, timestamp,
+                         content, permalink, comment_count)
+                    SELECT user_id, 'instagram', id, username, username, type, timestamp,
+                           caption, permalink, NULL
+                    FROM posts{user_filter}""",
+                params,
+            )
+            self.execute(
+                f"""INSERT INTO feed_items
+                        (user_id, platform, item_id, source_id, source_name, type, timestamp,
+                         content, permalink, comment_count)
+                    SELECT fg.user_id, 'facebook', fp.id, fp.group_id, fg.name, 'fb_post',
+                           fp.timestamp, fp.content, fp.permalink, fp.comment_count
+                    FROM fb_posts fp JOIN fb_groups fg ON fp.group_id = fg.group_id{group_filter}""",
+                params,
+            )
+            return self.execute(f"SELECT COUNT(*) FROM feed_items{user_filter}", params).fetchone()[0]
+
+    # ── Search ─────────────────────────────────────────────────────
+
+    def search(self, user_id: int, query: str, platform: str | None = None,
+               cursor: str | None = None, limit: int = 20) -> list[dict]:
+        """Full-text search over the user's IG captions, FB group posts and newsletters.
+
+        Hits come best match first (bm25) with a snippet of the matching text,
+        the matched words wrapped in <mark></mark>; the rest of the snippet is
+        unescaped. platform is 'instagram', 'facebook' or 'newsletter'. Pass
+        encode_search_cursor(last_hit) as cursor for the next page; ranks
+        depend on the whole index, so writes between pages can shift hits
+        across the boundary.
+        """
+        match = _fts_query(query)
+        if not match:
+            return []
+        # CROSS JOIN pins each arm to start from the MATCH; left to itself the
+        # planner may walk all of a user's posts and probe the index per row
+        arms = {
+            "instagram": (
+                """SELECT 'instagram' AS platform, p.rowid AS rowid, p.id AS id, p.type AS type,
+                          p.username AS source_name, NULL AS title,
+                          snippet(posts_fts, -1, '<mark>', '</mark>', '…', 16) AS snippet,
+                          p.timestamp AS timestamp, bm25(posts_fts) AS rank
+                   FROM posts_fts CROSS JOIN posts p ON p.rowid = posts_fts.rowid
+                   WHERE posts_fts MATCH ? AND p.user_id = ?""",
+                [match, user_id],
+            ),
+            "facebook": (
+                """SELECT 'facebook' AS platform, fp.rowid AS rowid, fp.id AS id, 'fb_post' AS type,
+                          fg.name AS source_name, NULL AS title,
+                          snippet(fb_posts_fts, -1, '<mark>', '</mark>', '…', 16) AS snippet,
+                          fp.timestamp AS timestamp, bm25(fb_posts_fts) AS rank
+                   FROM fb_posts_fts
+                   CROSS JOIN fb_posts fp ON fp.rowid = fb_posts_fts.rowid
+                   CROSS JOIN fb_groups fg ON fg.user_id = ? AND fg.group_id = fp.group_id
+                   WHERE fb_posts_fts MATCH ?""",
+                [user_id, match],
+            ),
+            "newsletter": (
+                """SELECT 'newsletter' AS platform, ne.id AS rowid, ne.id AS id, 'newsletter' AS type,
+                          COALESCE(NULLIF(ne.from_name, ''), ne.from_address) AS source_name,
+                          ne.subject AS title,
+                          snippet(newsletter_fts, -1, '<mark>', '</mark>', '…', 16) AS snippet,
+                          ne.received_at AS timestamp, bm25(newsletter_fts) AS rank
+                   FROM newsletter_fts CROSS JOIN newsletter_emails ne ON ne.id = newsletter_fts.rowid
+                   WHERE newsletter_fts MATCH ? AND ne.user_id = ? AND ne.is_confirmation = 0""",
+                [match, user_id],
+            ),
+        }
+        if platform:
+            if platform not in arms:
+                raise ValueError(f"Unknown search platform: {platform!r}")
+            arms = {platform: arms[platform]}
+
+        where, params = "", []
+        for sql, arm_params in arms.values():
+            params.extend(arm_params)
+        if cursor:
+            where = "WHERE (rank, platform, rowid) > (?, ?, ?)"
+            params.extend(decode_search_cursor(cursor))
+        union = " UNION ALL ".join(sql for sql, _ in arms.values())
+        rows = self.execute(
+            f"""SELECT * FROM ({union}) {where}
+                ORDER BY rank, platform, rowid LIMIT ?""",
+            (*params, limit),
+        ).fetchall()
         return [dict(r) for r in rows]
 
+    def rebuild_search_index(self) -> dict[str, int]:
+        """Rebuild every FTS5 index from its source table; returns rows indexed per table.
+
+        The triggers keep the indexes current. Rebuild after writes that
+        bypassed them, and after a VACUUM: posts and fb_posts have no INTEGER
+        PRIMARY KEY, so VACUUM may renumber the rowids the indexes point at.
+        """
+        counts = {}
+        with self.transaction():
+            for table, fts, _ in SEARCH_INDEXES:
+                self.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+                counts[table] = self.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        return counts
+
     # ── Newsletter ─────────────────────────────────────────────────
 
     def insert_newsletter_email(self, user_id: int, message_id: str,
                                 from_address: str, to_address: str,
                                 subject: str, body_text: str,
                                 body_html: str, from_name: str = "") -> int:
-        # Ensure from_name column exists (migration for existing DBs)
-        try:
-            self.execute("ALTER TABLE newsletter_emails ADD COLUMN from_name TEXT DEFAULT ''")
-        except Exception:
-            pass
         cursor = self.execute(
             """INSERT INTO newsletter_emails
                (user_id, message_id, from_address, from_name, to_address, subject, body_text, body_html)
                VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-            (user_id, message_id, from_address, from_name, to_address, subject, body_text, body_html),
+            (user_id, message_id, from_address, from_name, to_address, subject, body_text,
+             compress_text(body_html)),
         )
-        self.conn.commit()
+        self._commit()
         return cursor.lastrowid
 
     def get_unclassified_emails(self, user_id: int) -> list[dict]:
@@ -618,7 +1711,7 @@ class Database:
                ORDER BY received_at ASC""",
             (user_id,),
         ).fetchall()
-        return [dict(r) for r in rows]
+        return [LazyRow(r) for r in rows]
 
     def get_unprocessed_confirmations(self, user_id: int) -> list[dict]:
         rows = self.execute(
@@ -627,28 +1720,28 @@ class Database:
                ORDER BY received_at ASC""",
             (user_id,),
         ).fetchall()
-        return [dict(r) for r in rows]
+        return [LazyRow(r) for r in rows]
 
     def mark_email_as_confirmation(self, email_id: int):
         self.execute(
             "UPDATE newsletter_emails SET is_confirmation=1, processed=1 WHERE id=?",
             (email_id,),
         )
-        self.conn.commit()
+        self._commit()
 
     def mark_email_processed(self, email_id: int):
         self.execute(
             "UPDATE newsletter_emails SET processed=1 WHERE id=?",
             (email_id,),
         )
-        self.conn.commit()
+        self._commit()
 
     def mark_confirmation_clicked(self, email_id: int):
         self.execute(
             "UPDATE newsletter_emails SET confirmation_clicked=1 WHERE id=?",
             (email_id,),
         )
-        self.conn.commit()
+        self._commit()
 
     def get_undigested_emails(self, user_id: int) -> list[dict]:
         rows = self.execute(
@@ -657,7 +1750,15 @@ class Database:
                ORDER BY received_at ASC""",
             (user_id,),
         ).fetchall()
-        return [dict(r) for r in rows]
+        return [LazyRow(r) for r in rows]
+
+    def iter_undigested_emails(self, user_id: int, batch_size: int = 100) -> Iterator[NewsletterEmailRow]:
+        """get_undigested_emails() as a stream, batch_size emails in memory at a time."""
+        return self._iter_keyset(
+            NewsletterEmailRow, "newsletter_emails", "received_at",
+            "user_id = ? AND processed = 1 AND is_confirmation = 0 AND digest_date IS NULL",
+            (user_id,), batch_size,
+        )
 
     def mark_emails_digested(self, email_ids: list[int], digest_date: str):
         if not email_ids:
@@ -667,14 +1768,14 @@ class Database:
             f"UPDATE newsletter_emails SET digest_date=? WHERE id IN ({placeholders})",
             [digest_date] + email_ids,
         )
-        self.conn.commit()
+        self._commit()
 
     def insert_newsletter_digest_run(self, user_id: int, digest_date: str) -> int:
         cursor = self.execute(
             "INSERT INTO newsletter_digest_runs (user_id, digest_date) VALUES (?, ?)",
             (user_id, digest_date),
         )
-        self.conn.commit()
+        self._commit()
         return cursor.lastrowid
 
     def finish_newsletter_digest_run(self, run_id: int, status: str,
@@ -682,56 +1783,44 @@ class Database:
                                      error: str | None = None,
                                      subject: str | None = None,
                                      schedule_name: str | None = None):
-        # Ensure new columns exist (idempotent migrations)
-        for col in ("subject TEXT", "schedule_name TEXT"):
-            try:
-                self.execute(f"ALTER TABLE newsletter_digest_runs ADD COLUMN {col}")
-            except Exception:
-                pass
         self.execute(
             """UPDATE newsletter_digest_runs
                SET finished_at=datetime('now'), status=?, email_count=?, error=?, subject=?, schedule_name=?
                WHERE id=?""",
             (status, email_count, error, subject, schedule_name, run_id),
         )
-        self.conn.commit()
+        self._commit()
 
     def get_unsummarized_emails(self, user_id: int) -> list[dict]:
-        # Ensure summary column exists
-        try:
-            self.execute("ALTER TABLE newsletter_emails ADD COLUMN summary TEXT")
-        except Exception:
-            pass
         rows = self.execute(
             """SELECT * FROM newsletter_emails
                WHERE user_id=? AND processed=1 AND is_confirmation=0 AND summary IS NULL
                ORDER BY received_at ASC""",
             (user_id,),
         ).fetchall()
-        return [dict(r) for r in rows]
+        return [LazyRow(r) for r in rows]
+
+    def iter_unsummarized_emails(self, user_id: int, batch_size: int = 100) -> Iterator[NewsletterEmailRow]:
+        """get_unsummarized_emails() as a stream, batch_size emails in memory at a time."""
+        return self._iter_keyset(
+            NewsletterEmailRow, "newsletter_emails", "received_at",
+            "user_id = ? AND processed = 1 AND is_confirmation = 0 AND summary IS NULL",
+            (user_id,), batch_size,
+        )
 
     def save_email_summary(self, email_id: int, summary: str):
-        try:
-            self.execute("ALTER TABLE newsletter_emails ADD COLUMN summary TEXT")
-        except Exception:
-            pass
         self.execute(
             "UPDATE newsletter_emails SET summary=? WHERE id=?",
             (summary, email_id),
         )
-        self.conn.commit()
+        self._commit()
 
     def save_digest_html(self, run_id: int, html: str):
-        # Ensure column exists (idempotent migration)
-        try:
-            self.execute("ALTER TABLE newsletter_digest_runs ADD COLUMN digest_html TEXT")
-        except Exception:
-            pass  # Column already exists
         self.execute(
             "UPDATE newsletter_digest_runs SET digest_html=? WHERE id=?",
-            (html, run_id),
+            (compress_text(html), run_id),
         )
-        self.conn.commit()
+        self._commit()
 
     def get_digest_runs(self, user_id: int, limit: int = 20) -> list[dict]:
         rows = self.execute(
@@ -742,7 +1831,7 @@ class Database:
                ORDER BY started_at DESC LIMIT ?""",
             (user_id, limit),
         ).fetchall()
-        return [dict(r) for r in rows]
+        return [LazyRow(r) for r in rows]
 
     def get_recent_digest_html(self, user_id: int, limit: int = 3) -> list[dict]:
         """Get recent successful digest runs with their HTML content."""
@@ -752,7 +1841,7 @@ class Database:
                ORDER BY digest_date DESC LIMIT ?""",
             (user_id, limit),
         ).fetchall()
-        return [dict(r) for r in rows]
+        return [LazyRow(r) for r in rows]
 
     def get_last_newsletter_digest_date(self, user_id: int) -> str | None:
         row = self.execute(
@@ -763,7 +1852,122 @@ class Database:
         ).fetchone()
         return row["digest_date"] if row else None
 
+    # ── Compression ────────────────────────────────────────────────
+
+    def compression_stats(self) -> dict[str, dict[str, int]]:
+        """Per compressed column: rows with a value, how many are compressed, and bytes stored."""
+        stats = {}
+        for table, column in COMPRESSED_COLUMNS:
+            row = self.execute(
+                f"""SELECT COUNT({column}) AS rows,
+                           COALESCE(SUM(typeof({column}) = 'blob'), 0) AS compressed,
+                           COALESCE(SUM(length(CAST({column} AS BLOB))), 0) AS stored_bytes
+                    FROM {table}"""
+            ).fetchone()
+            stats[f"{table}.{column}"] = dict(row)
+        return stats
+
+    def recompress_text_columns(self, batch_size: int = 200) -> dict[str, int]:
+        """Compress plain rows in every compressed column, one committed batch at a time.
+
+        Returns bytes_before and bytes_after for the rows it rewrote, plus the
+        number of rows rewritten.
+        """
+        totals = {"rows": 0, "bytes_before": 0, "bytes_after": 0}
+        for table, column in COMPRESSED_COLUMNS:
+            last_id = 0
+            while True:
+                rows = self.execute(
+                    f"""SELECT id, {column} AS value FROM {table}
+                        WHERE id > ? AND typeof({column}) = 'text' AND length({column}) >= ?
+                        ORDER BY id LIMIT ?""",
+                    # length() counts characters; a shorter text can't reach the byte threshold
+                    (last_id, COMPRESS_MIN_BYTES // 4, batch_size),
+                ).fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1]["id"]
+                updates = []
+                for row in rows:
+                    packed = compress_text(row["value"])
+                    if isinstance(packed, bytes):
+                        updates.append((packed, row["id"]))
+                        totals["bytes_before"] += len(row["value"].encode())
+                        totals["bytes_after"] += len(packed)
+                with self.transaction():
+                    self.conn.executemany(f"UPDATE {table} SET {column}=? WHERE id=?", updates)
+                totals["rows"] += len(updates)
+        return totals
+
     def close(self):
+        self._tx_depth = 0
+        if self._reader:
+            self._reader.close()
         if self._conn:
             self._conn.close()
             self._conn = None
+
+
+class ConnectionManager:
+    """Hands out one long-lived Database per thread for a database file.
+
+    The schema is created once, on first use, instead of on every handle.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._initialized = False
+        self._handles: list[Database] = []
+
+    def get(self) -> Database:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            # Only ever used from this thread; close_all() may close it from another
+            db = Database(self.db_path, check_same_thread=False)
+            with self._lock:
+                if not self._initialized:
+                    db.initialize()
+                    self._initialized = True
+                self._handles.append(db)
+            self._local.db = db
+        return db
+
+    def close_all(self):
+        with self._lock:
+            for db in self._handles:
+                db.close()
+
+
+_managers: dict[str, ConnectionManager] = {}
+_managers_lock = threading.Lock()
+_settings_caches: dict[str, SettingsCache] = {}
+
+
+def _settings_cache(db_path: str) -> SettingsCache:
+    with _managers_lock:
+        cache = _settings_caches.get(db_path)
+        if cache is None:
+            cache = _settings_caches[db_path] = SettingsCache(Config.SETTINGS_CACHE_SECONDS)
+    return cache
+
+
+def get_database(db_path: str) -> Database:
+    """Return the calling thread's long-lived Database for db_path.
+
+    Callers should not close it; a closed handle simply reconnects on next use.
+    """
+    with _managers_lock:
+        manager = _managers.get(db_path)
+        if manager is None:
+            manager = _managers[db_path] = ConnectionManager(db_path)
+    return manager.get()
+
+
+def close_databases():
+    """Close every handle handed out by get_database() (on process shutdown)."""
+    with _managers_lock:
+        managers = list(_managers.values())
+    for manager in managers:
+        manager.close_all()
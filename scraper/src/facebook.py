@@ -1,11 +1,12 @@
 import logging
 import re
-import time
 import random
 from datetime import datetime, timezone
 from curl_cffi import requests
 from bs4 import BeautifulSoup
 
+from src.pacing import pace
+
 logger = logging.getLogger(__name__)
 
 MBASIC_BASE = "https://mbasic.facebook.com"
@@ -31,12 +32,12 @@ class FacebookClient:
             if resp.status_code == 429:
                 wait = 60 * (attempt + 1) + random.uniform(0, 30)
                 logger.warning(f"Rate limited (attempt {attempt + 1}/3), waiting {wait:.0f}s...")
-                time.sleep(wait)
+                pace(wait)
                 continue
             if resp.status_code >= 500:
                 wait = 10 * (attempt + 1) + random.uniform(0, 10)
                 logger.warning(f"Server error {resp.status_code} (attempt {attempt + 1}/3), retrying in {wait:.0f}s...")
-                time.sleep(wait)
+                pace(wait)
                 continue
             resp.raise_for_status()
             return resp.text
@@ -194,4 +195,4 @@ class FacebookClient:
 
     @staticmethod
     def random_delay(min_s: float = 5.0, max_s: float = 10.0):
-        time.sleep(random.uniform(min_s, max_s))
+        pace(random.uniform(min_s, max_s))
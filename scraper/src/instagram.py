@@ -1,11 +1,12 @@
 import json
 import logging
-import time
 import random
 from datetime import datetime, timezone
 from curl_cffi import requests
 from curl_cffi.requests.exceptions import HTTPError
 
+from src.pacing import pace
+
 logger = logging.getLogger(__name__)
 
 BASE = "https://www.instagram.com"
@@ -35,7 +36,7 @@ class InstagramClient:
         self._username = None
 
     def _get(self, path: str, params: dict | None = None, referer: str | None = None) -> dict:
-        time.sleep(random.uniform(0.3, 1.0))
+        pace(random.uniform(0.3, 1.0))
         headers = {}
         if referer:
             headers["Referer"] = referer
@@ -44,12 +45,12 @@ class InstagramClient:
             if resp.status_code == 429:
                 wait = int(resp.headers.get("Retry-After", 60 * (attempt + 1)))
                 logger.warning(f"Rate limited (attempt {attempt + 1}/4), waiting {wait}s...")
-                time.sleep(wait)
+                pace(wait)
                 continue
             if resp.status_code >= 500:
                 wait = 5 * (attempt + 1) + random.uniform(0, 5)
                 logger.warning(f"Server error {resp.status_code} on {path} (attempt {attempt + 1}/4), retrying in {wait:.0f}s...")
-                time.sleep(wait)
+                pace(wait)
                 continue
             if resp.status_code in (400, 401, 403):
                 raise SessionExpiredError(f"HTTP {resp.status_code} on {path}")
@@ -81,9 +82,9 @@ class InstagramClient:
     def browse_pause(self):
         """Simulate human browsing — occasional long pauses like reading content."""
         if random.random() < 0.1:
-            time.sleep(random.uniform(15.0, 45.0))
+            pace(random.uniform(15.0, 45.0))
         else:
-            time.sleep(random.uniform(3.0, 12.0))
+            pace(random.uniform(3.0, 12.0))
 
     def validate_session(self) -> bool | None:
         """Returns True if valid, False if invalid/stale, None if rate limited.
@@ -299,4 +300,4 @@ class InstagramClient:
 
     @staticmethod
     def random_delay(min_s: float = 1.0, max_s: float = 3.0):
-        time.sleep(random.uniform(min_s, max_s))
+        pace(random.uniform(min_s, max_s))
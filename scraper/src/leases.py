@@ -0,0 +1,70 @@
+import logging
+import math
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class UserLeases:
+    """Shards active users across scraper replicas sharing one database.
+
+    Each replica holds time-limited leases on the users it owns and only
+    schedules, backfills and sends digests for those. rebalance() renews our
+    leases, takes over free or expired ones up to a fair share of the active
+    users, and hands back any surplus so a newly started replica can pick it
+    up. Users with work in flight are never handed back.
+    """
+
+    def __init__(self, owner: str, lease_seconds: int = 120):
+        self.owner = owner
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        self._owned: set[int] = set()
+
+    def owns(self, user_id: int) -> bool:
+        with self._lock:
+            return user_id in self._owned
+
+    def owned(self) -> set[int]:
+        with self._lock:
+            return set(self._owned)
+
+    def rebalance(self, db, busy: set[int] = frozenset()) -> bool:
+        """Renew, take over and release leases; returns True if the owned set changed."""
+        replicas = db.heartbeat_replica(self.owner, self.lease_seconds)
+        mine = set(db.renew_user_leases(self.owner, self.lease_seconds))
+        users = db.get_active_user_ids()
+        leased = {lease["user_id"] for lease in db.get_live_user_leases()}
+        target = math.ceil(len(users) / max(1, len(replicas)))
+
+        # Drop deactivated users; beyond our fair share, hand back idle users
+        release = mine - set(users)
+        extra = len(mine - release) - target
+        if extra > 0:
+            idle = sorted(mine - release - set(busy), reverse=True)
+            release |= set(idle[:extra])
+        if release:
+            db.release_user_leases(self.owner, sorted(release))
+            mine -= release
+
+        for user_id in users:
+            if len(mine) >= target:
+                break
+            if user_id in leased:
+                continue
+            if db.acquire_user_lease(user_id, self.owner, self.lease_seconds):
+                mine.add(user_id)
+
+        with self._lock:
+            changed = mine != self._owned
+            self._owned = mine
+        if changed:
+            logger.info(f"Now owning {len(mine)} of {len(users)} users ({len(replicas)} replicas)")
+        return changed
+
+    def release_all(self, db):
+        """Hand every lease back on shutdown so other replicas take over right away."""
+        db.release_user_leases(self.owner)
+        db.remove_replica(self.owner)
+        with self._lock:
+            self._owned = set()
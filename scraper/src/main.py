@@ -1,19 +1,30 @@
+import asyncio
 import logging
+import logging.handlers
+import os
 import signal
+import socket
 import sys
+import threading
 import time
+from contextlib import nullcontext
 from datetime import datetime, timezone
 
-from croniter import croniter
-
 from src.config import Config
-from src.db import Database
+from src.db import Database, close_databases, get_database
 from src.cookies import CookieManager
 from src.instagram import InstagramClient, SessionExpiredError
 from src.downloader import MediaDownloader
 from src.scrape import Scraper
 from src.digest import DigestBuilder
-from src.newsletter import classify_emails, click_confirmations, summarize_new_emails, build_and_send_digest, get_schedules
+from src.newsletter import classify_emails, click_confirmations, summarize_new_emails, build_and_send_digest
+from src.settings import DEFAULT_CRON_SCHEDULE
+from src.scheduler import NEVER_RUN, ChangeGate, CronHeap, Scheduler, next_run_time
+from src.workers import ScrapeWorkerPool
+from src.leases import UserLeases
+from src.pacing import add_pause_hook, remove_pause_hook
+from src.metrics import MetricsServer, metrics
+from src.retention import RetentionPolicy, compact, enforce_user_retention, sweep_orphan_media
 
 logging.basicConfig(
     level=logging.INFO,
@@ -22,44 +33,146 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-class DbLogHandler(logging.Handler):
-    """Logging handler that appends log lines to a database log column."""
+class DbLogHandler(logging.handlers.BufferingHandler):
+    """Logging handler that writes a run's log records to the database in batches.
+
+    Records are handed to write_fn as (ts, level, message) tuples when the
+    buffer fills, when the oldest buffered record is flush_seconds old, on
+    WARNING and above, and on close(). Only records emitted by the thread that
+    created the handler are kept, so concurrent runs on the worker pool each
+    get their own log. The age check also runs before every pace() sleep on
+    that thread, so a line logged right before a long pause isn't held back
+    for the whole pause.
+    """
+    def __init__(self, write_fn, capacity: int = 50, flush_seconds: float = 2.0):
+        super().__init__(capacity)
+        self._write_fn = write_fn
+        self._flush_seconds = flush_seconds
+        self._thread_id = threading.get_ident()
+        self.setFormatter(logging.Formatter("%(message)s"))
+        add_pause_hook(self._before_pause, self._thread_id)
+
+    def emit(self, record):
+        if record.thread != self._thread_id:
+            return
+        super().emit(record)
+
+    def _before_pause(self, seconds: float):
+        """Flush if the oldest buffered record would turn flush_seconds old during the pause."""
+        with self.lock:
+            due = bool(self.buffer) and time.time() + seconds - self.buffer[0].created >= self._flush_seconds
+        if due:
+            self.flush()
+
+    def shouldFlush(self, record) -> bool:
+        return (len(self.buffer) >= self.capacity
+                or record.levelno >= logging.WARNING
+                or record.created - self.buffer[0].created >= self._flush_seconds)
+
+    def flush(self):
+        with self.lock:
+            if not self.buffer:
+                return
+            lines = [(self.formatter.formatTime(r), r.levelname, self.format(r)) for r in self.buffer]
+            self.buffer.clear()
+            try:
+                self._write_fn(lines)
+            except Exception:
+                pass
+
+    def close(self):
+        remove_pause_hook(self._before_pause, self._thread_id)
+        super().close()
+
+
+class CookieTestLogHandler(logging.Handler):
+    """Passes the creating thread's log records to log_fn as formatted messages.
+
+    Other workers log to the same module loggers concurrently; their records
+    are dropped so they never end up in this user's cookie test log.
+    """
     def __init__(self, log_fn):
         super().__init__()
         self._log_fn = log_fn
-        self.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
+        self._thread_id = threading.get_ident()
+        self.setFormatter(logging.Formatter("%(message)s"))
 
     def emit(self, record):
+        if record.thread != self._thread_id:
+            return
         try:
             self._log_fn(self.format(record))
         except Exception:
             pass
 
 
+# Set by main(); when None (tests, one-off calls) work runs inline.
+_pool: ScrapeWorkerPool | None = None
+
+
+def _submit(user_id: int, fn, *args):
+    """Run fn(*args) on the worker pool, or inline when there is no pool."""
+    if _pool is None:
+        fn(*args)
+    else:
+        _pool.submit(user_id, fn, *args)
+
+
+def _platform_slot(platform: str):
+    """Hold a per-platform concurrency slot for the duration of a with-block."""
+    return _pool.platform_slot(platform) if _pool is not None else nullcontext()
+
+
+# Users keyed on next cron due time; check_due_scrapes only touches the due ones
+_cron_heap = CronHeap()
+_last_heap_resync: float | None = None
+
+
 def is_scrape_due(cron_expr: str, last_scrape_time: str | None) -> bool:
     """Check if a scrape is due based on cron expression and last scrape time."""
-    if last_scrape_time is None:
-        return True  # Never scraped, always due
-    last = datetime.fromisoformat(last_scrape_time)
-    if last.tzinfo is None:
-        last = last.replace(tzinfo=timezone.utc)
-    now = datetime.now(timezone.utc)
-    cron = croniter(cron_expr, last)
-    next_run = cron.get_next(datetime)
-    return now >= next_run
+    return datetime.now(timezone.utc) >= next_run_time(cron_expr, last_scrape_time)
+
+
+def _scrape_due_time(schedule: dict) -> datetime | None:
+    """Next due time for a get_scrape_schedules() row, or None if it shouldn't be scheduled."""
+    if schedule["ig_cookies_stale"] == "true":
+        return None  # waiting for a cookie refresh, which enqueues a reschedule job
+    cron_schedule = schedule["cron_schedule"] or DEFAULT_CRON_SCHEDULE
+    try:
+        return next_run_time(cron_schedule, schedule["last_scrape"])
+    except Exception as e:
+        logger.warning(f"Invalid cron schedule {cron_schedule!r} for user {schedule['user_id']}: {e}")
+        return None
+
+
+def _resync_cron_heap(db: Database):
+    """Rebuild the cron heap from the database (new/deactivated users, missed edits)."""
+    schedules = db.get_scrape_schedules()
+    _cron_heap.resync({
+        s["user_id"]: _scrape_due_time(s) for s in schedules if _leases.owns(s["user_id"])
+    })
+
+
+def _reschedule_user(db: Database, user_id: int, finished: bool = False):
+    """Recompute one user's next due time, e.g. after a run or a cron_schedule change."""
+    schedules = db.get_scrape_schedules(user_id)
+    due = _scrape_due_time(schedules[0]) if schedules and _leases.owns(user_id) else None
+    if finished:
+        _cron_heap.finish(user_id, due)
+    else:
+        _cron_heap.set(user_id, due)
 
 
 def run_user_scrape(user_id: int):
     """Run a full scrape for a specific user."""
     logger.info(f"Starting scrape for user {user_id}...")
     config = Config()
-    db = Database(config.DATABASE_PATH)
-    db.initialize()
+    db = get_database(config.DATABASE_PATH)
 
     run_id = db.insert_scrape_run(user_id)
 
     # Attach DB log handler to capture all logs for this run
-    db_handler = DbLogHandler(lambda line: db.append_scrape_run_log(run_id, line))
+    db_handler = DbLogHandler(lambda lines: db.append_run_log_lines("scrape", run_id, lines))
     root_logger = logging.getLogger()
     root_logger.addHandler(db_handler)
 
@@ -82,14 +195,15 @@ def run_user_scrape(user_id: int):
         downloader = MediaDownloader(config.MEDIA_PATH)
         scraper = Scraper(db=db, ig_client=ig, downloader=downloader, user_id=user_id)
 
-        total_posts, total_stories = scraper.scrape_all()
-        db.finish_scrape_run(run_id, "success", total_posts, total_stories)
-        logger.info(f"Scrape complete for user {user_id}: {total_posts} posts, {total_stories} stories")
+        with _platform_slot("instagram"):
+            total_posts, total_stories = scraper.scrape_all()
+            db.finish_scrape_run(run_id, "success", total_posts, total_stories)
+            logger.info(f"Scrape complete for user {user_id}: {total_posts} posts, {total_stories} stories")
 
-        # Check for pending DMs
-        pending_dms = ig.get_pending_dm_count()
-        if pending_dms > 0:
-            logger.info(f"Pending DMs for user {user_id}: {pending_dms}")
+            # Check for pending DMs
+            pending_dms = ig.get_pending_dm_count()
+            if pending_dms > 0:
+                logger.info(f"Pending DMs for user {user_id}: {pending_dms}")
 
         # --- Facebook scraping ---
         new_fb_posts = 0
@@ -97,30 +211,30 @@ def run_user_scrape(user_id: int):
         if fb_cookies:
             from src.facebook import FacebookClient
             fb = FacebookClient(fb_cookies)
-            fb_session_ok = fb.validate_session()
-            if fb_session_ok is None:
-                logger.warning(f"FB rate limited during validation for user {user_id}, skipping FB this run.")
-            elif not fb_session_ok:
-                logger.warning(f"FB cookies are stale for user {user_id}!")
-                cookie_mgr.mark_fb_stale(user_id)
-            else:
-                scraper.fb = fb
-                new_fb_posts = scraper.scrape_all_fb_groups()
-                logger.info(f"FB scrape complete for user {user_id}: {new_fb_posts} new posts")
+            with _platform_slot("facebook"):
+                fb_session_ok = fb.validate_session()
+                if fb_session_ok is None:
+                    logger.warning(f"FB rate limited during validation for user {user_id}, skipping FB this run.")
+                elif not fb_session_ok:
+                    logger.warning(f"FB cookies are stale for user {user_id}!")
+                    cookie_mgr.mark_fb_stale(user_id)
+                else:
+                    scraper.fb = fb
+                    new_fb_posts = scraper.scrape_all_fb_groups()
+                    logger.info(f"FB scrape complete for user {user_id}: {new_fb_posts} new posts")
         else:
             logger.info(f"No FB cookies for user {user_id}, skipping Facebook scraping.")
 
         # Send per-user digest email (skipped when IG digest is handled by Oneshot)
         total_new = total_posts + total_stories + new_fb_posts
-        email_recipient = db.get_user_config(user_id, "email_recipient")
+        email_recipient = db.get_user_settings(user_id).email_recipient
         if config.IG_DIGEST_MODE == "oneshot":
             logger.info(f"IG_DIGEST_MODE=oneshot, skipping inline digest email for user {user_id}")
         elif email_recipient and (total_new > 0 or pending_dms > 0):
-            run_info = db.get_scrape_run(run_id)
-            new_posts = db.get_new_posts_since(user_id, run_info["started_at"])
-            for post in new_posts:
-                post["media"] = db.get_media_for_post(post["id"])
-            new_fb = db.get_new_fb_posts_since(user_id, run_info["started_at"])
+            reader = db.reader()
+            run_info = reader.get_scrape_run(run_id)
+            new_posts = reader.get_new_posts_since(user_id, run_info["started_at"], with_media=True)
+            new_fb = reader.get_new_fb_posts_since(user_id, run_info["started_at"])
             html, attachments = digest.build_html(new_posts, new_fb, pending_dms=pending_dms)
             digest.send(email_recipient, html, total_new, attachments=attachments, pending_dms=pending_dms)
             logger.info(f"Digest email sent for user {user_id}.")
@@ -129,7 +243,7 @@ def run_user_scrape(user_id: int):
         logger.warning(f"Session expired during scrape for user {user_id} — cookies need refresh")
         cookie_mgr.mark_stale(user_id)
         db.finish_scrape_run(run_id, "error", error="Session expired — update cookies")
-        email_recipient = db.get_user_config(user_id, "email_recipient")
+        email_recipient = db.get_user_settings(user_id).email_recipient
         if email_recipient:
             try:
                 digest.send_stale_cookies_alert(email_recipient)
@@ -140,58 +254,56 @@ def run_user_scrape(user_id: int):
         db.finish_scrape_run(run_id, "error", error=str(e))
     finally:
         root_logger.removeHandler(db_handler)
-        db.close()
+        db_handler.close()
 
 
 def check_due_scrapes():
-    """Check all active users and run scrapes for those whose cron schedule is due."""
+    """Start scrapes for users whose next cron run is due."""
+    global _last_heap_resync
     config = Config()
-    db = Database(config.DATABASE_PATH)
-    db.initialize()
+    now = time.monotonic()
+    if _last_heap_resync is None or now - _last_heap_resync >= config.SCHEDULE_RESYNC_SECONDS:
+        db = get_database(config.DATABASE_PATH)
+        _resync_cron_heap(db)
+        _last_heap_resync = now
+
+    for user_id, due_at in _cron_heap.pop_due(datetime.now(timezone.utc)):
+        if due_at == NEVER_RUN:
+            logger.info(f"Scrape due for user {user_id} (never scraped)")
+        else:
+            logger.info(f"Scrape due for user {user_id} (due at {due_at:%Y-%m-%d %H:%M} UTC)")
+        _submit(user_id, _run_scheduled_scrape, user_id, due_at)
+
 
+def _run_scheduled_scrape(user_id: int, due_at: datetime | None = None):
+    """Run a cron-triggered scrape, then put the user back on the heap."""
+    if due_at is not None and due_at != NEVER_RUN:
+        metrics.observe_cron_lag((datetime.now(timezone.utc) - due_at).total_seconds())
     try:
-        users = db.get_all_active_users()
-        for user in users:
-            user_id = user["id"]
-            cron_schedule = db.get_user_config(user_id, "cron_schedule") or "0 8 * * *"
-            last_scrape = db.get_last_scrape_time(user_id)
-
-            if is_scrape_due(cron_schedule, last_scrape):
-                if db.get_user_config(user_id, "ig_cookies_stale") == "true":
-                    logger.debug(f"Skipping scrape for user {user_id}: IG cookies are stale, waiting for refresh")
-                    continue
-                logger.info(f"Scrape due for user {user_id} (cron={cron_schedule}, last={last_scrape})")
-                db.close()
-                run_user_scrape(user_id)
-                # Re-open db for next user
-                db._conn = None
-                db.initialize()
+        run_user_scrape(user_id)
     finally:
-        db.close()
+        config = Config()
+        db = get_database(config.DATABASE_PATH)
+        try:
+            _reschedule_user(db, user_id, finished=True)
+        except Exception as e:
+            logger.error(f"Failed to reschedule user {user_id}: {e}")
+            _cron_heap.finish(user_id, None)  # next resync picks the user up again
 
 
-def check_user_cookie_tests():
-    """Check all active users for pending IG or FB cookie tests."""
-    config = Config()
-    db = Database(config.DATABASE_PATH)
-    db.initialize()
+def handle_reschedule(job: dict, config: Config, db: Database):
+    """Job handler: recompute a user's next scrape after cron_schedule or cookies change."""
+    _reschedule_user(db, job["user_id"])
+
+
+def handle_cookie_test(job: dict, config: Config, db: Database):
+    """Job handler: run an Instagram cookie test."""
+    _run_ig_cookie_test(job["user_id"], config, db)
 
-    try:
-        users = db.get_all_active_users()
-        for user in users:
-            user_id = user["id"]
-
-            # IG cookie test
-            status = db.get_user_config(user_id, "cookie_test")
-            if status == "pending":
-                _run_ig_cookie_test(user_id, config, db)
-
-            # FB cookie test
-            fb_status = db.get_user_config(user_id, "fb_cookie_test")
-            if fb_status == "pending":
-                _run_fb_cookie_test(user_id, config, db)
-    finally:
-        db.close()
+
+def handle_fb_cookie_test(job: dict, config: Config, db: Database):
+    """Job handler: run a Facebook cookie test."""
+    _run_fb_cookie_test(job["user_id"], config, db)
 
 
 def _run_ig_cookie_test(user_id: int, config: Config, db: Database):
@@ -233,19 +345,8 @@ def _run_ig_cookie_test(user_id: int, config: Config, db: Database):
     log("(This may take a few minutes if rate-limited)")
 
     # Capture instagram module logs (rate limit warnings etc.)
-    class CookieTestLogHandler(logging.Handler):
-        def __init__(self):
-            super().__init__()
-            self.setFormatter(logging.Formatter("%(message)s"))
-
-        def emit(self, record):
-            try:
-                log(self.format(record))
-            except Exception:
-                pass
-
     ig_logger = logging.getLogger("src.instagram")
-    handler = CookieTestLogHandler()
+    handler = CookieTestLogHandler(log)
     ig_logger.addHandler(handler)
     try:
         session_ok = ig.validate_session()
@@ -318,65 +419,70 @@ def _run_fb_cookie_test(user_id: int, config: Config, db: Database):
         db.set_user_config(user_id, "fb_cookie_test", "error:FB cookies are stale or invalid")
 
 
+_manual_runs_gate = ChangeGate(Config.POLL_FORCE_SECONDS)
+
+
 def check_user_manual_runs():
-    """Check all active users for pending manual runs."""
+    """Check all active users for pending manual runs and queue them on the worker pool."""
     config = Config()
-    db = Database(config.DATABASE_PATH)
-    db.initialize()
+    db = get_database(config.DATABASE_PATH)
+    if not _manual_runs_gate.should_run(db):
+        return
 
-    try:
-        users = db.get_all_active_users()
-        for user in users:
-            user_id = user["id"]
-            run = db.get_pending_manual_run(user_id)
-            if not run:
-                continue
+    for user_id in sorted(_leases.owned()):
+        run = db.get_pending_manual_run(user_id)
+        if not run:
+            continue
 
-            run_id = run["id"]
-            since_date = run["since_date"]
-            logger.info(f"Starting manual run #{run_id} for user {user_id} (since {since_date})...")
-            db.start_manual_run(run_id)
+        logger.info(f"Starting manual run #{run['id']} for user {user_id} (since {run['since_date']})...")
+        db.start_manual_run(run["id"])
+        _submit(user_id, _run_manual_run, user_id, run["id"], run["since_date"])
 
-            # Attach DB log handler for this run
-            db_handler = DbLogHandler(lambda line, rid=run_id: db.append_manual_run_log(rid, line))
-            root_logger = logging.getLogger()
-            root_logger.addHandler(db_handler)
 
-            try:
-                cookie_mgr = CookieManager(db, config.ENCRYPTION_KEY)
-                cookies = cookie_mgr.get_cookies(user_id)
+def _run_manual_run(user_id: int, run_id: int, since_date: str):
+    """Run a backfill scrape for a manual run that has been marked running."""
+    config = Config()
+    db = get_database(config.DATABASE_PATH)
 
-                if not cookies:
-                    logger.warning(f"No cookies for manual run #{run_id}, user {user_id}.")
-                    db.finish_manual_run(run_id, "error", error="No cookies configured")
-                    continue
+    # Attach DB log handler for this run
+    db_handler = DbLogHandler(lambda lines: db.append_run_log_lines("manual", run_id, lines))
+    root_logger = logging.getLogger()
+    root_logger.addHandler(db_handler)
 
-                ig = InstagramClient(cookies)
-                downloader = MediaDownloader(config.MEDIA_PATH)
-                scraper = Scraper(db=db, ig_client=ig, downloader=downloader, user_id=user_id)
-
-                total_posts, total_stories = scraper.scrape_all_backfill(since_date)
-                db.finish_manual_run(run_id, "success", total_posts, total_stories)
-                logger.info(f"Manual run #{run_id} complete for user {user_id}: {total_posts} posts, {total_stories} stories")
-            except SessionExpiredError:
-                logger.warning(f"Session expired during manual run #{run_id} for user {user_id}")
-                cookie_mgr.mark_stale(user_id)
-                db.finish_manual_run(run_id, "error", error="Session expired — update cookies")
-            except Exception as e:
-                logger.error(f"Manual run #{run_id} failed for user {user_id}: {e}")
-                db.finish_manual_run(run_id, "error", error=str(e))
-            finally:
-                root_logger.removeHandler(db_handler)
+    try:
+        cookie_mgr = CookieManager(db, config.ENCRYPTION_KEY)
+        cookies = cookie_mgr.get_cookies(user_id)
+
+        if not cookies:
+            logger.warning(f"No cookies for manual run #{run_id}, user {user_id}.")
+            db.finish_manual_run(run_id, "error", error="No cookies configured")
+            return
+
+        ig = InstagramClient(cookies)
+        downloader = MediaDownloader(config.MEDIA_PATH)
+        scraper = Scraper(db=db, ig_client=ig, downloader=downloader, user_id=user_id)
+
+        with _platform_slot("instagram"):
+            total_posts, total_stories = scraper.scrape_all_backfill(since_date)
+        db.finish_manual_run(run_id, "success", total_posts, total_stories)
+        logger.info(f"Manual run #{run_id} complete for user {user_id}: {total_posts} posts, {total_stories} stories")
+    except SessionExpiredError:
+        logger.warning(f"Session expired during manual run #{run_id} for user {user_id}")
+        cookie_mgr.mark_stale(user_id)
+        db.finish_manual_run(run_id, "error", error="Session expired — update cookies")
+    except Exception as e:
+        logger.error(f"Manual run #{run_id} failed for user {user_id}: {e}")
+        db.finish_manual_run(run_id, "error", error=str(e))
     finally:
-        db.close()
+        root_logger.removeHandler(db_handler)
+        db_handler.close()
 
 
 def _run_sync_following(user_id: int):
     """Sync the accounts table from the user's current IG following list."""
     logger.info(f"Starting sync_following for user {user_id}...")
     config = Config()
-    db = Database(config.DATABASE_PATH)
-    db.initialize()
+    db = get_database(config.DATABASE_PATH)
 
     try:
         cookie_mgr = CookieManager(db, config.ENCRYPTION_KEY)
@@ -387,84 +493,54 @@ def _run_sync_following(user_id: int):
         ig = InstagramClient(cookies)
         downloader = MediaDownloader(config.MEDIA_PATH)
         scraper = Scraper(db=db, ig_client=ig, downloader=downloader, user_id=user_id)
-        scraper.sync_following()
+        with _platform_slot("instagram"):
+            scraper.sync_following()
         logger.info(f"sync_following complete for user {user_id}")
     except SessionExpiredError:
         logger.warning(f"Session expired during sync_following for user {user_id}")
         cookie_mgr.mark_stale(user_id)
     except Exception as e:
         logger.error(f"sync_following failed for user {user_id}: {e}")
-    finally:
-        db.close()
 
 
-def check_user_triggers():
-    """Check all active users for pending triggered scrapes (IG, FB, or full)."""
-    config = Config()
-    db = Database(config.DATABASE_PATH)
-    db.initialize()
-
+def _run_triggered(db: Database, user_id: int, key: str, label: str, fn):
+    """Run fn(user_id), mirroring progress into the user_config status key the web UI polls."""
+    logger.info(f"{label} trigger for user {user_id}...")
+    db.set_user_config(user_id, key, "running")
     try:
-        users = db.get_all_active_users()
-        for user in users:
-            user_id = user["id"]
-
-            # Full scrape trigger
-            trigger = db.get_user_config(user_id, "trigger_scrape")
-            if trigger == "pending":
-                logger.info(f"Manual scrape trigger for user {user_id}...")
-                db.set_user_config(user_id, "trigger_scrape", "running")
-                db.close()
-                run_user_scrape(user_id)
-                db._conn = None
-                db.initialize()
-                db.set_user_config(user_id, "trigger_scrape", "done")
-
-            # IG-only trigger
-            ig_trigger = db.get_user_config(user_id, "trigger_ig_scrape")
-            if ig_trigger == "pending":
-                logger.info(f"Manual IG scrape trigger for user {user_id}...")
-                db.set_user_config(user_id, "trigger_ig_scrape", "running")
-                db.close()
-                _run_ig_only_scrape(user_id)
-                db._conn = None
-                db.initialize()
-                db.set_user_config(user_id, "trigger_ig_scrape", "done")
-
-            # Sync following trigger
-            sync_trigger = db.get_user_config(user_id, "trigger_sync_following")
-            if sync_trigger == "pending":
-                logger.info(f"Sync following trigger for user {user_id}...")
-                db.set_user_config(user_id, "trigger_sync_following", "running")
-                db.close()
-                _run_sync_following(user_id)
-                db._conn = None
-                db.initialize()
-                db.set_user_config(user_id, "trigger_sync_following", "done")
-
-            # FB-only trigger
-            fb_trigger = db.get_user_config(user_id, "trigger_fb_scrape")
-            if fb_trigger == "pending":
-                logger.info(f"Manual FB scrape trigger for user {user_id}...")
-                db.set_user_config(user_id, "trigger_fb_scrape", "running")
-                db.close()
-                _run_fb_only_scrape(user_id)
-                db._conn = None
-                db.initialize()
-                db.set_user_config(user_id, "trigger_fb_scrape", "done")
+        fn(user_id)
     finally:
-        db.close()
+        db.set_user_config(user_id, key, "done")
+
+
+def handle_trigger_scrape(job: dict, config: Config, db: Database):
+    """Job handler: full scrape (IG + FB) requested from the web UI."""
+    _run_triggered(db, job["user_id"], "trigger_scrape", "Manual scrape", run_user_scrape)
+
+
+def handle_trigger_ig_scrape(job: dict, config: Config, db: Database):
+    """Job handler: IG-only scrape requested from the web UI."""
+    _run_triggered(db, job["user_id"], "trigger_ig_scrape", "Manual IG scrape", _run_ig_only_scrape)
+
+
+def handle_trigger_sync_following(job: dict, config: Config, db: Database):
+    """Job handler: sync the followed accounts list."""
+    _run_triggered(db, job["user_id"], "trigger_sync_following", "Sync following", _run_sync_following)
+
+
+def handle_trigger_fb_scrape(job: dict, config: Config, db: Database):
+    """Job handler: FB-only scrape requested from the web UI."""
+    _run_triggered(db, job["user_id"], "trigger_fb_scrape", "Manual FB scrape", _run_fb_only_scrape)
 
 
 def _run_ig_only_scrape(user_id: int):
     """Run only the Instagram scrape portion for a specific user."""
     logger.info(f"Starting IG-only scrape for user {user_id}...")
     config = Config()
-    db = Database(config.DATABASE_PATH)
-    db.initialize()
+    db = get_database(config.DATABASE_PATH)
 
     run_id = db.insert_scrape_run(user_id)
-    db_handler = DbLogHandler(lambda line: db.append_scrape_run_log(run_id, line))
+    db_handler = DbLogHandler(lambda lines: db.append_run_log_lines("scrape", run_id, lines))
     root_logger = logging.getLogger()
     root_logger.addHandler(db_handler)
 
@@ -486,24 +562,24 @@ def _run_ig_only_scrape(user_id: int):
         downloader = MediaDownloader(config.MEDIA_PATH)
         scraper = Scraper(db=db, ig_client=ig, downloader=downloader, user_id=user_id)
 
-        total_posts, total_stories = scraper.scrape_all()
-        db.finish_scrape_run(run_id, "success", total_posts, total_stories)
-        logger.info(f"IG scrape complete for user {user_id}: {total_posts} posts, {total_stories} stories")
+        with _platform_slot("instagram"):
+            total_posts, total_stories = scraper.scrape_all()
+            db.finish_scrape_run(run_id, "success", total_posts, total_stories)
+            logger.info(f"IG scrape complete for user {user_id}: {total_posts} posts, {total_stories} stories")
 
-        # Check for pending DMs
-        pending_dms = ig.get_pending_dm_count()
-        if pending_dms > 0:
-            logger.info(f"Pending DMs for user {user_id}: {pending_dms}")
+            # Check for pending DMs
+            pending_dms = ig.get_pending_dm_count()
+            if pending_dms > 0:
+                logger.info(f"Pending DMs for user {user_id}: {pending_dms}")
 
         total_new = total_posts + total_stories
-        email_recipient = db.get_user_config(user_id, "email_recipient")
+        email_recipient = db.get_user_settings(user_id).email_recipient
         if config.IG_DIGEST_MODE == "oneshot":
             logger.info(f"IG_DIGEST_MODE=oneshot, skipping inline IG-only digest email for user {user_id}")
         elif email_recipient and (total_new > 0 or pending_dms > 0):
-            run_info = db.get_scrape_run(run_id)
-            new_posts = db.get_new_posts_since(user_id, run_info["started_at"])
-            for post in new_posts:
-                post["media"] = db.get_media_for_post(post["id"])
+            reader = db.reader()
+            run_info = reader.get_scrape_run(run_id)
+            new_posts = reader.get_new_posts_since(user_id, run_info["started_at"], with_media=True)
             html, attachments = digest.build_html(new_posts, pending_dms=pending_dms)
             digest.send(email_recipient, html, total_new, attachments=attachments, pending_dms=pending_dms)
             logger.info(f"Digest email sent for user {user_id}.")
@@ -516,18 +592,17 @@ def _run_ig_only_scrape(user_id: int):
         db.finish_scrape_run(run_id, "error", error=str(e))
     finally:
         root_logger.removeHandler(db_handler)
-        db.close()
+        db_handler.close()
 
 
 def _run_fb_only_scrape(user_id: int):
     """Run only the Facebook scrape portion for a specific user."""
     logger.info(f"Starting FB-only scrape for user {user_id}...")
     config = Config()
-    db = Database(config.DATABASE_PATH)
-    db.initialize()
+    db = get_database(config.DATABASE_PATH)
 
     run_id = db.insert_scrape_run(user_id)
-    db_handler = DbLogHandler(lambda line: db.append_scrape_run_log(run_id, line))
+    db_handler = DbLogHandler(lambda lines: db.append_run_log_lines("scrape", run_id, lines))
     root_logger = logging.getLogger()
     root_logger.addHandler(db_handler)
 
@@ -542,19 +617,20 @@ def _run_fb_only_scrape(user_id: int):
 
         from src.facebook import FacebookClient
         fb = FacebookClient(fb_cookies)
-        fb_session_ok = fb.validate_session()
-        if fb_session_ok is None:
-            logger.warning(f"FB rate limited during validation for user {user_id}, skipping.")
-            db.finish_scrape_run(run_id, "error", error="FB rate limited during validation")
-            return
-        if not fb_session_ok:
-            logger.warning(f"FB cookies are stale for user {user_id}!")
-            cookie_mgr.mark_fb_stale(user_id)
-            db.finish_scrape_run(run_id, "error", error="FB cookies are stale")
-            return
+        with _platform_slot("facebook"):
+            fb_session_ok = fb.validate_session()
+            if fb_session_ok is None:
+                logger.warning(f"FB rate limited during validation for user {user_id}, skipping.")
+                db.finish_scrape_run(run_id, "error", error="FB rate limited during validation")
+                return
+            if not fb_session_ok:
+                logger.warning(f"FB cookies are stale for user {user_id}!")
+                cookie_mgr.mark_fb_stale(user_id)
+                db.finish_scrape_run(run_id, "error", error="FB cookies are stale")
+                return
 
-        scraper = Scraper(db=db, ig_client=None, downloader=None, user_id=user_id, fb_client=fb)
-        new_fb_posts = scraper.scrape_all_fb_groups()
+            scraper = Scraper(db=db, ig_client=None, downloader=None, user_id=user_id, fb_client=fb)
+            new_fb_posts = scraper.scrape_all_fb_groups()
         db.finish_scrape_run(run_id, "success", 0, 0)
         logger.info(f"FB scrape complete for user {user_id}: {new_fb_posts} new posts")
     except Exception as e:
@@ -562,49 +638,103 @@ def _run_fb_only_scrape(user_id: int):
         db.finish_scrape_run(run_id, "error", error=str(e))
     finally:
         root_logger.removeHandler(db_handler)
-        db.close()
+        db_handler.close()
+
+
+def handle_fb_group_resolve(job: dict, config: Config, db: Database):
+    """Job handler: resolve placeholder FB group names for a user."""
+    user_id = job["user_id"]
+    db.set_user_config(user_id, "fb_group_resolve", "running")
+
+    cookie_mgr = CookieManager(db, config.ENCRYPTION_KEY)
+    fb_cookies = cookie_mgr.get_fb_cookies(user_id)
+    if not fb_cookies:
+        logger.warning(f"Cannot resolve FB group names for user {user_id}: no FB cookies")
+        db.set_user_config(user_id, "fb_group_resolve", "done")
+        return
+
+    from src.facebook import FacebookClient
+    fb = FacebookClient(fb_cookies)
+
+    groups = db.get_all_fb_groups(user_id)
+    for group in groups:
+        if group["name"].startswith("Group "):
+            try:
+                real_name = fb.get_group_name(group["group_id"])
+                if real_name and not real_name.startswith("Group "):
+                    db.upsert_fb_group(user_id, group["group_id"], real_name, group["url"])
+                    logger.info(f"Resolved FB group {group['group_id']} -> {real_name} for user {user_id}")
+            except Exception as e:
+                logger.warning(f"Failed to resolve group {group['group_id']} for user {user_id}: {e}")
 
+    db.set_user_config(user_id, "fb_group_resolve", "done")
 
-def check_user_fb_group_resolve():
-    """Resolve placeholder FB group names for all active users."""
+
+# Job type (same name as the user_config status key the web UI polls) -> handler
+JOB_HANDLERS = {
+    "cookie_test": handle_cookie_test,
+    "fb_cookie_test": handle_fb_cookie_test,
+    "trigger_scrape": handle_trigger_scrape,
+    "trigger_ig_scrape": handle_trigger_ig_scrape,
+    "trigger_sync_following": handle_trigger_sync_following,
+    "trigger_fb_scrape": handle_trigger_fb_scrape,
+    "fb_group_resolve": handle_fb_group_resolve,
+    "reschedule": handle_reschedule,
+}
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+JOB_LEASE_SECONDS = 6 * 3600  # longer than any single scrape
+
+# Polling scans only run when another connection has committed since their last run
+_jobs_gate = ChangeGate(Config.POLL_FORCE_SECONDS)
+
+# Users this replica owns; other replicas sharing the database handle the rest
+_leases = UserLeases(WORKER_ID, Config.USER_LEASE_SECONDS)
+
+
+def rebalance_user_leases():
+    """Renew this replica's user leases and take over or hand back users as replicas come and go."""
+    global _last_heap_resync
     config = Config()
-    db = Database(config.DATABASE_PATH)
-    db.initialize()
+    db = get_database(config.DATABASE_PATH)
 
-    try:
-        users = db.get_all_active_users()
-        for user in users:
-            user_id = user["id"]
-            status = db.get_user_config(user_id, "fb_group_resolve")
-            if status != "pending":
-                continue
+    busy = _pool.active_users() if _pool is not None else set()
+    if _leases.rebalance(db, busy=busy):
+        _last_heap_resync = None  # next check_due_scrapes rebuilds the heap for the new set
+        _manual_runs_gate.reset()
+        _jobs_gate.reset()
 
-            db.set_user_config(user_id, "fb_group_resolve", "running")
 
-            cookie_mgr = CookieManager(db, config.ENCRYPTION_KEY)
-            fb_cookies = cookie_mgr.get_fb_cookies(user_id)
-            if not fb_cookies:
-                logger.warning(f"Cannot resolve FB group names for user {user_id}: no FB cookies")
-                db.set_user_config(user_id, "fb_group_resolve", "done")
-                continue
+def check_jobs():
+    """Claim queued jobs and hand them to the worker pool."""
+    config = Config()
+    db = get_database(config.DATABASE_PATH)
+    if not _jobs_gate.should_run(db):
+        return
 
-            from src.facebook import FacebookClient
-            fb = FacebookClient(fb_cookies)
+    db.reclaim_expired_jobs(config.JOB_MAX_ATTEMPTS)
+    while not _shutdown:
+        job = db.claim_next_job(WORKER_ID, JOB_LEASE_SECONDS)
+        if not job:
+            break
+        if job["type"] not in JOB_HANDLERS:
+            logger.error(f"Unknown job type {job['type']!r} (job #{job['id']})")
+            db.fail_job(job["id"], f"Unknown job type: {job['type']}")
+            continue
+        _submit(job["user_id"], _run_job, job)
+
+
+def _run_job(job: dict):
+    """Run a claimed job's handler on its own connection and record the outcome."""
+    config = Config()
+    db = get_database(config.DATABASE_PATH)
 
-            groups = db.get_all_fb_groups(user_id)
-            for group in groups:
-                if group["name"].startswith("Group "):
-                    try:
-                        real_name = fb.get_group_name(group["group_id"])
-                        if real_name and not real_name.startswith("Group "):
-                            db.upsert_fb_group(user_id, group["group_id"], real_name, group["url"])
-                            logger.info(f"Resolved FB group {group['group_id']} -> {real_name} for user {user_id}")
-                    except Exception as e:
-                        logger.warning(f"Failed to resolve group {group['group_id']} for user {user_id}: {e}")
-
-            db.set_user_config(user_id, "fb_group_resolve", "done")
-    finally:
-        db.close()
+    try:
+        JOB_HANDLERS[job["type"]](job, config, db)
+        db.complete_job(job["id"])
+    except Exception as e:
+        logger.error(f"Job #{job['id']} ({job['type']}) failed for user {job['user_id']}: {e}")
+        db.fail_job(job["id"], str(e))
 
 
 def check_newsletter_processing():
@@ -613,22 +743,20 @@ def check_newsletter_processing():
     if not config.ANTHROPIC_API_KEY:
         return
 
-    db = Database(config.DATABASE_PATH)
-    db.initialize()
+    db = get_database(config.DATABASE_PATH)
 
-    try:
-        users = db.get_all_active_users()
-        for user in users:
-            user_id = user["id"]
-            try:
-                classify_emails(user_id)
-                click_confirmations(user_id)
-                if config.NEWSLETTER_DIGEST_MODE != "oneshot":
-                    summarize_new_emails(user_id)
-            except Exception as e:
-                logger.error(f"Newsletter processing error for user {user_id}: {e}")
-    finally:
-        db.close()
+    users = db.get_all_active_users()
+    for user in users:
+        user_id = user["id"]
+        if not _leases.owns(user_id):
+            continue
+        try:
+            classify_emails(user_id)
+            click_confirmations(user_id)
+            if config.NEWSLETTER_DIGEST_MODE != "oneshot":
+                summarize_new_emails(user_id)
+        except Exception as e:
+            logger.error(f"Newsletter processing error for user {user_id}: {e}")
 
 
 def check_newsletter_digest():
@@ -645,169 +773,188 @@ def check_newsletter_digest():
     current_dow = now.weekday()  # 0=Mon, 6=Sun
     current_minutes = now.hour * 60 + now.minute
 
-    db = Database(config.DATABASE_PATH)
-    db.initialize()
-
-    try:
-        users = db.get_all_active_users()
-        for user in users:
-            user_id = user["id"]
-            schedules = get_schedules(db, user_id)
-
-            if not schedules:
-                # Fallback: no schedules configured, use NEWSLETTER_DIGEST_TIME env var (once daily)
-                try:
-                    target_h, target_m = map(int, config.NEWSLETTER_DIGEST_TIME.split(":"))
-                    diff_minutes = abs(current_minutes - (target_h * 60 + target_m))
-                    if diff_minutes > 2:
-                        continue
-                except ValueError:
-                    continue
-
-                last_digest = db.get_last_newsletter_digest_date(user_id)
-                if last_digest == today:
-                    continue
+    db = get_database(config.DATABASE_PATH)
 
-                try:
-                    build_and_send_digest(user_id)
-                except Exception as e:
-                    logger.error(f"Newsletter digest error for user {user_id}: {e}")
-                continue
-
-            # Schedule-based: check each schedule
-            for schedule in schedules:
-                schedule_id = schedule.get("id", "default")
-                try:
-                    target_h, target_m = map(int, schedule["time"].split(":"))
-                except (ValueError, KeyError):
-                    continue
-
-                # Check if current day-of-week matches
-                # Schedule days: 0=Sun, 1=Mon, ..., 6=Sat (JS convention)
-                # Python weekday: 0=Mon, ..., 6=Sun
-                # Convert python dow to JS dow: (python_dow + 1) % 7  ->  Mon=1, Sun=0
-                js_dow = (current_dow + 1) % 7
-                schedule_days = schedule.get("days", [1, 2, 3, 4, 5, 6, 0])  # default all days
-                if js_dow not in schedule_days:
-                    continue
+    # One query for every user's settings instead of several lookups per user
+    for user_id, settings in db.load_user_settings().items():
+        if not _leases.owns(user_id):
+            continue
+        schedules = settings.newsletter_schedules
 
-                # Check if within 2-minute window of target time
+        if not schedules:
+            # Fallback: no schedules configured, use NEWSLETTER_DIGEST_TIME env var (once daily)
+            try:
+                target_h, target_m = map(int, config.NEWSLETTER_DIGEST_TIME.split(":"))
                 diff_minutes = abs(current_minutes - (target_h * 60 + target_m))
                 if diff_minutes > 2:
                     continue
+            except ValueError:
+                continue
 
-                # Check if this schedule already ran today
-                last_key = f"newsletter_last_digest_{schedule_id}"
-                last_sent = db.get_user_config(user_id, last_key)
-                if last_sent == today:
-                    continue
+            last_digest = db.get_last_newsletter_digest_date(user_id)
+            if last_digest == today:
+                continue
 
-                schedule_name = schedule.get("name") or schedule_id
-                logger.info(f"Newsletter digest schedule '{schedule_name}' due for user {user_id} at {schedule['time']}")
-                try:
-                    build_and_send_digest(user_id, schedule_name=schedule_name)
-                    db.set_user_config(user_id, last_key, today)
-                except Exception as e:
-                    logger.error(f"Newsletter digest error for user {user_id} schedule '{schedule_id}': {e}")
-    finally:
-        db.close()
+            try:
+                build_and_send_digest(user_id)
+            except Exception as e:
+                logger.error(f"Newsletter digest error for user {user_id}: {e}")
+            continue
 
+        # Schedule-based: check each schedule
+        for schedule in schedules:
+            schedule_id = schedule.get("id", "default")
+            try:
+                target_h, target_m = map(int, schedule["time"].split(":"))
+            except (ValueError, KeyError):
+                continue
 
-_shutdown = False
+            # Check if current day-of-week matches
+            # Schedule days: 0=Sun, 1=Mon, ..., 6=Sat (JS convention)
+            # Python weekday: 0=Mon, ..., 6=Sun
+            # Convert python dow to JS dow: (python_dow + 1) % 7  ->  Mon=1, Sun=0
+            js_dow = (current_dow + 1) % 7
+            schedule_days = schedule.get("days", [1, 2, 3, 4, 5, 6, 0])  # default all days
+            if js_dow not in schedule_days:
+                continue
 
+            # Check if within 2-minute window of target time
+            diff_minutes = abs(current_minutes - (target_h * 60 + target_m))
+            if diff_minutes > 2:
+                continue
 
-def main():
-    global _shutdown
-    config = Config()
+            # Check if this schedule already ran today
+            last_key = f"newsletter_last_digest_{schedule_id}"
+            last_sent = settings.get(last_key)
+            if last_sent == today:
+                continue
 
-    db = Database(config.DATABASE_PATH)
-    db.initialize()
+            schedule_name = schedule.get("name") or schedule_id
+            logger.info(f"Newsletter digest schedule '{schedule_name}' due for user {user_id} at {schedule['time']}")
+            try:
+                build_and_send_digest(user_id, schedule_name=schedule_name)
+                db.set_user_config(user_id, last_key, today)
+            except Exception as e:
+                logger.error(f"Newsletter digest error for user {user_id} schedule '{schedule_id}': {e}")
 
-    # Reset stale manual runs from previous crashes
-    db.reset_stale_manual_runs()
-    db.close()
 
-    logger.info("Starting per-user polling scheduler...")
+def record_scheduler_stats():
+    """Sample queue gauges and append this interval's scheduler metrics to scheduler_stats."""
+    config = Config()
+    db = get_database(config.DATABASE_PATH)
 
-    def shutdown(signum, frame):
-        global _shutdown
-        logger.info("Shutting down...")
-        _shutdown = True
+    metrics.set_gauge("pending_jobs", db.count_pending_jobs())
+    metrics.set_gauge("scheduled_users", len(_cron_heap))
+    metrics.set_gauge("active_users", len(_pool.active_users()) if _pool is not None else 0)
+    metrics.heartbeat("scheduler")
+    db.record_scheduler_stats(WORKER_ID, metrics.drain(), keep_hours=config.METRICS_RETENTION_HOURS)
 
-    signal.signal(signal.SIGTERM, shutdown)
-    signal.signal(signal.SIGINT, shutdown)
 
-    # Track last run times for each polling job
-    last_due_check = 0.0
-    last_cookie_test = 0.0
-    last_manual_run = 0.0
-    last_trigger_check = 0.0
-    last_fb_resolve = 0.0
-    last_newsletter_check = 0.0
-    last_newsletter_digest = 0.0
+def enforce_retention():
+    """Apply each owned user's retention policy, drop expired sessions and free unused pages."""
+    config = Config()
+    db = get_database(config.DATABASE_PATH)
 
-    while not _shutdown:
-        now = time.monotonic()
+    for user_id, settings in db.load_user_settings().items():
+        if _shutdown:
+            return
+        if not _leases.owns(user_id):
+            continue
+        policy = RetentionPolicy.for_user(settings, config)
+        try:
+            counts = enforce_user_retention(db, user_id, policy, config.MEDIA_PATH, config.RETENTION_BATCH_SIZE)
+        except Exception as e:
+            logger.error(f"Retention error for user {user_id}: {e}")
+            continue
+        if any(counts.values()):
+            logger.info(f"Retention for user {user_id}: {counts}")
 
-        # check_due_scrapes every 60s
-        if now - last_due_check >= 60:
-            last_due_check = now
-            try:
-                check_due_scrapes()
-            except Exception as e:
-                logger.error(f"Error in check_due_scrapes: {e}")
+    db.delete_expired_sessions()
+    freed = compact(db, config.RETENTION_VACUUM_PAGES)
+    if freed:
+        logger.info(f"Incremental vacuum freed {freed} pages")
 
-        # check_user_cookie_tests every 10s
-        if now - last_cookie_test >= 10:
-            last_cookie_test = now
-            try:
-                check_user_cookie_tests()
-            except Exception as e:
-                logger.error(f"Error in check_user_cookie_tests: {e}")
 
-        # check_user_manual_runs every 30s
-        if now - last_manual_run >= 30:
-            last_manual_run = now
-            try:
-                check_user_manual_runs()
-            except Exception as e:
-                logger.error(f"Error in check_user_manual_runs: {e}")
+def sweep_media_files():
+    """Remove downloaded media that no media row points at any more."""
+    config = Config()
+    db = get_database(config.DATABASE_PATH)
+    removed = sweep_orphan_media(db, config.MEDIA_PATH, config.MEDIA_ORPHAN_GRACE_HOURS)
+    if removed:
+        logger.info(f"Removed {removed} orphaned media files")
 
-        # check_user_triggers every 10s
-        if now - last_trigger_check >= 10:
-            last_trigger_check = now
-            try:
-                check_user_triggers()
-            except Exception as e:
-                logger.error(f"Error in check_user_triggers: {e}")
 
-        # check_user_fb_group_resolve every 10s
-        if now - last_fb_resolve >= 10:
-            last_fb_resolve = now
-            try:
-                check_user_fb_group_resolve()
-            except Exception as e:
-                logger.error(f"Error in check_user_fb_group_resolve: {e}")
+_shutdown = False
 
-        # check_newsletter_processing every 60s
-        if now - last_newsletter_check >= 60:
-            last_newsletter_check = now
-            try:
-                check_newsletter_processing()
-            except Exception as e:
-                logger.error(f"Error in check_newsletter_processing: {e}")
 
-        # check_newsletter_digest every 60s
-        if now - last_newsletter_digest >= 60:
-            last_newsletter_digest = now
-            try:
-                check_newsletter_digest()
-            except Exception as e:
-                logger.error(f"Error in check_newsletter_digest: {e}")
+def main():
+    global _pool
+    config = Config()
 
-        # Sleep briefly to avoid busy-waiting
-        time.sleep(1)
+    # First use creates the schema; every later get_database() call reuses it
+    db = get_database(config.DATABASE_PATH)
 
+    # Reset stale manual runs from previous crashes
+    db.reset_stale_manual_runs()
+    # Pick up triggers written to user_config before the job queue existed
+    db.enqueue_pending_config_jobs(list(JOB_HANDLERS))
+
+    # Claim this replica's share of users before anything gets scheduled
+    rebalance_user_leases()
+
+    _pool = ScrapeWorkerPool(
+        max_workers=config.SCRAPE_WORKERS,
+        max_instagram=config.SCRAPE_IG_CONCURRENCY,
+        max_facebook=config.SCRAPE_FB_CONCURRENCY,
+        resume_wait=config.SCRAPE_RESUME_WAIT_SECONDS,
+    )
+    logger.info(f"Starting per-user polling scheduler ({config.SCRAPE_WORKERS} workers)...")
+
+    metrics_server = None
+    if config.METRICS_PORT:
+        try:
+            metrics_server = MetricsServer(metrics, config.METRICS_HOST, config.METRICS_PORT)
+            metrics_server.start()
+        except OSError as e:
+            logger.warning(f"Could not start metrics endpoint on port {config.METRICS_PORT}: {e}")
+            metrics_server = None
+
+    scheduler = Scheduler(metrics=metrics)
+    scheduler.every(10, check_due_scrapes)
+    # Both scans are gated on data_version, so polling often costs one PRAGMA when idle
+    scheduler.every(2, check_jobs)  # cookie tests, triggers, FB group resolve
+    scheduler.every(5, check_user_manual_runs)
+    scheduler.every(60, check_newsletter_processing)
+    scheduler.every(60, check_newsletter_digest)
+    scheduler.every(60, record_scheduler_stats)
+    scheduler.every(config.RETENTION_INTERVAL_SECONDS, enforce_retention)
+    scheduler.every(24 * 3600, sweep_media_files)
+    scheduler.every(config.USER_LEASE_RENEW_SECONDS, rebalance_user_leases)
+
+    async def run():
+        def shutdown():
+            global _shutdown
+            logger.info("Shutting down...")
+            _shutdown = True
+            scheduler.stop()
+
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGTERM, shutdown)
+        loop.add_signal_handler(signal.SIGINT, shutdown)
+        await scheduler.run()
+
+    asyncio.run(run())
+
+    logger.info("Waiting for running scrapes to finish...")
+    _pool.shutdown(wait=True)
+    # Anything we claimed but never started goes back to the queue
+    db.release_jobs(WORKER_ID)
+    _leases.release_all(db)
+    if metrics_server is not None:
+        metrics_server.stop()
+    _jobs_gate.close()
+    _manual_runs_gate.close()
+    close_databases()
     logger.info("Scheduler stopped.")
 
 
@@ -0,0 +1,189 @@
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers sub-second polling checks up to multi-minute scrapes
+DEFAULT_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600)
+
+
+class Histogram:
+    """Cumulative Prometheus-style histogram."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class _Interval:
+    """Aggregate of observations since the last drain (for the stats table)."""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float, ok: bool = True):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        if not ok:
+            self.errors += 1
+
+
+class SchedulerMetrics:
+    """Thread-safe registry of scheduler timings, lag, gauges and heartbeats."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._job_durations: dict[str, Histogram] = {}
+        self._job_errors: dict[str, int] = {}
+        self._cron_lag = Histogram()
+        self._gauges: dict[str, float] = {}
+        self._heartbeats: dict[str, float] = {}
+        self._intervals: dict[str, _Interval] = {}
+
+    def _interval(self, name: str) -> _Interval:
+        interval = self._intervals.get(name)
+        if interval is None:
+            interval = self._intervals[name] = _Interval()
+        return interval
+
+    def observe_job(self, name: str, seconds: float, ok: bool = True):
+        """Record one run of a periodic job and beat its heartbeat."""
+        with self._lock:
+            self._job_durations.setdefault(name, Histogram()).observe(seconds)
+            if not ok:
+                self._job_errors[name] = self._job_errors.get(name, 0) + 1
+            self._interval(name).observe(seconds, ok)
+            self._heartbeats[name] = time.time()
+
+    def observe_cron_lag(self, seconds: float):
+        """Record how long after its cron due time a user's scrape was started."""
+        with self._lock:
+            self._cron_lag.observe(seconds)
+            self._interval("cron_lag").observe(seconds)
+
+    def set_gauge(self, name: str, value: float):
+        with self._lock:
+            self._gauges[name] = value
+
+    def heartbeat(self, name: str):
+        with self._lock:
+            self._heartbeats[name] = time.time()
+
+    def drain(self) -> list[dict]:
+        """Per-name aggregates since the previous drain, plus current gauges and heartbeats."""
+        with self._lock:
+            intervals, self._intervals = self._intervals, {}
+            rows = [
+                {"name": name, "count": i.count, "errors": i.errors,
+                 "total_seconds": i.total, "max_seconds": i.max, "value": None,
+                 "heartbeat": self._heartbeats.get(name)}
+                for name, i in intervals.items()
+            ]
+            rows += [
+                {"name": name, "count": 0, "errors": 0, "total_seconds": 0.0,
+                 "max_seconds": 0.0, "value": value, "heartbeat": None}
+                for name, value in self._gauges.items()
+            ]
+        return rows
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        with self._lock:
+            lines = [
+                "# HELP scheduler_job_duration_seconds Duration of scheduler job runs.",
+                "# TYPE scheduler_job_duration_seconds histogram",
+            ]
+            for name, hist in sorted(self._job_durations.items()):
+                lines += _histogram_lines("scheduler_job_duration_seconds", hist, f'job="{name}"')
+            lines += [
+                "# HELP scheduler_job_errors_total Scheduler job runs that raised.",
+                "# TYPE scheduler_job_errors_total counter",
+            ]
+            for name in sorted(self._job_durations):
+                lines.append(f'scheduler_job_errors_total{{job="{name}"}} {self._job_errors.get(name, 0)}')
+            lines += [
+                "# HELP scheduler_cron_lag_seconds Delay between a user's cron due time and scrape start.",
+                "# TYPE scheduler_cron_lag_seconds histogram",
+            ]
+            lines += _histogram_lines("scheduler_cron_lag_seconds", self._cron_lag)
+            for name, value in sorted(self._gauges.items()):
+                lines += [f"# TYPE scheduler_{name} gauge", f"scheduler_{name} {_fmt(value)}"]
+            lines += [
+                "# HELP scheduler_heartbeat_timestamp_seconds Last time each job (or loop) reported in.",
+                "# TYPE scheduler_heartbeat_timestamp_seconds gauge",
+            ]
+            for name, ts in sorted(self._heartbeats.items()):
+                lines.append(f'scheduler_heartbeat_timestamp_seconds{{job="{name}"}} {_fmt(ts)}')
+        return "\n".join(lines) + "\n"
+
+
+def _fmt(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _histogram_lines(metric: str, hist: Histogram, labels: str = "") -> list[str]:
+    sep = "," if labels else ""
+    lines = [
+        f'{metric}_bucket{{{labels}{sep}le="{bound}"}} {count}'
+        for bound, count in zip(hist.buckets, hist.counts)
+    ]
+    lines.append(f'{metric}_bucket{{{labels}{sep}le="+Inf"}} {hist.count}')
+    label_block = f"{{{labels}}}" if labels else ""
+    lines.append(f"{metric}_sum{label_block} {_fmt(hist.sum)}")
+    lines.append(f"{metric}_count{label_block} {hist.count}")
+    return lines
+
+
+metrics = SchedulerMetrics()
+
+
+class MetricsServer:
+    """Serves a SchedulerMetrics registry as text on GET /metrics from a daemon thread."""
+
+    def __init__(self, registry: SchedulerMetrics, host: str = "127.0.0.1", port: int = 9464):
+        registry_ = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry_.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # scrapes every few seconds would drown the scraper log
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self):
+        self._thread.start()
+        logger.info(f"Metrics available on http://{self._server.server_address[0]}:{self.port}/metrics")
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
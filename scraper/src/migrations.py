@@ -0,0 +1,265 @@
+import logging
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+
+def _add_column(conn: sqlite3.Connection, table: str, column: str, definition: str):
+    """ADD COLUMN unless it exists (older databases got some columns from ad-hoc ALTERs)."""
+    columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if column not in columns:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def _columns_added_over_time(conn: sqlite3.Connection):
+    _add_column(conn, "accounts", "following", "BOOLEAN NOT NULL DEFAULT 1")
+    _add_column(conn, "newsletter_emails", "from_name", "TEXT DEFAULT ''")
+    _add_column(conn, "newsletter_emails", "summary", "TEXT")
+    _add_column(conn, "newsletter_digest_runs", "subject", "TEXT")
+    _add_column(conn, "newsletter_digest_runs", "schedule_name", "TEXT")
+    _add_column(conn, "newsletter_digest_runs", "digest_html", "TEXT")
+
+
+def _execute_script(conn: sqlite3.Connection, script: str):
+    """Run ;-separated statements inside the caller's transaction (executescript would commit it).
+
+    Pieces are joined until they form a complete statement, so trigger bodies
+    keep their inner semicolons.
+    """
+    statement = ""
+    for piece in script.split(";"):
+        statement += piece + ";"
+        if sqlite3.complete_statement(statement):
+            if statement.strip().rstrip(";").strip():
+                conn.execute(statement)
+            statement = ""
+
+
+def _hot_query_indexes(conn: sqlite3.Connection):
+    _execute_script(conn, """
+        -- Feeds: newest first per user, optionally per account or type
+        CREATE INDEX IF NOT EXISTS idx_posts_user_timestamp ON posts(user_id, timestamp);
+        CREATE INDEX IF NOT EXISTS idx_posts_user_username_timestamp ON posts(user_id, username, timestamp);
+        CREATE INDEX IF NOT EXISTS idx_posts_user_type_timestamp ON posts(user_id, type, timestamp);
+        -- Digests: posts added since a run started
+        CREATE INDEX IF NOT EXISTS idx_posts_user_created ON posts(user_id, created_at);
+        CREATE INDEX IF NOT EXISTS idx_media_post_order ON media(post_id, "order");
+
+        CREATE INDEX IF NOT EXISTS idx_fb_posts_group_timestamp ON fb_posts(group_id, timestamp);
+        CREATE INDEX IF NOT EXISTS idx_fb_posts_group_created ON fb_posts(group_id, created_at);
+        CREATE INDEX IF NOT EXISTS idx_fb_comments_post_order ON fb_comments(post_id, "order");
+        CREATE INDEX IF NOT EXISTS idx_fb_groups_group ON fb_groups(group_id);
+
+        -- Users that have a given config key (e.g. every user with ig_cookies)
+        CREATE INDEX IF NOT EXISTS idx_user_config_key_user ON user_config(key, user_id);
+
+        CREATE INDEX IF NOT EXISTS idx_scrape_runs_user_status_finished
+            ON scrape_runs(user_id, status, finished_at);
+        CREATE INDEX IF NOT EXISTS idx_scrape_runs_user_started ON scrape_runs(user_id, started_at);
+        CREATE INDEX IF NOT EXISTS idx_manual_runs_user_status_created
+            ON manual_runs(user_id, status, created_at);
+
+        -- Newsletter pipeline states: partial, so each stays as small as its backlog
+        CREATE INDEX IF NOT EXISTS idx_newsletter_unprocessed
+            ON newsletter_emails(user_id, received_at) WHERE processed = 0;
+        CREATE INDEX IF NOT EXISTS idx_newsletter_unclicked_confirmations
+            ON newsletter_emails(user_id, received_at) WHERE is_confirmation = 1 AND confirmation_clicked = 0;
+        CREATE INDEX IF NOT EXISTS idx_newsletter_undigested
+            ON newsletter_emails(user_id, received_at)
+            WHERE processed = 1 AND is_confirmation = 0 AND digest_date IS NULL;
+        CREATE INDEX IF NOT EXISTS idx_newsletter_unsummarized
+            ON newsletter_emails(user_id, received_at)
+            WHERE processed = 1 AND is_confirmation = 0 AND summary IS NULL;
+        CREATE INDEX IF NOT EXISTS idx_digest_runs_user_status_date
+            ON newsletter_digest_runs(user_id, status, digest_date);
+        CREATE INDEX IF NOT EXISTS idx_digest_runs_user_started ON newsletter_digest_runs(user_id, started_at);
+    """)
+
+
+def _feed_indexes_with_id(conn: sqlite3.Connection):
+    # Keyset pagination orders ties on timestamp by id, so the index must too
+    _execute_script(conn, """
+        DROP INDEX IF EXISTS idx_posts_user_timestamp;
+        DROP INDEX IF EXISTS idx_posts_user_username_timestamp;
+        DROP INDEX IF EXISTS idx_posts_user_type_timestamp;
+        DROP INDEX IF EXISTS idx_fb_posts_group_timestamp;
+        CREATE INDEX IF NOT EXISTS idx_posts_user_timestamp_id ON posts(user_id, timestamp, id);
+        CREATE INDEX IF NOT EXISTS idx_posts_user_username_timestamp_id
+            ON posts(user_id, username, timestamp, id);
+        CREATE INDEX IF NOT EXISTS idx_posts_user_type_timestamp_id ON posts(user_id, type, timestamp, id);
+        CREATE INDEX IF NOT EXISTS idx_fb_posts_group_timestamp_id ON fb_posts(group_id, timestamp, id)
+    """)
+
+
+def _feed_items(conn: sqlite3.Connection):
+    # Triggers keep the table in step with posts, fb_posts and fb_groups in the
+    # writer's own transaction, whether the scraper or the web app writes
+    _execute_script(conn, """
+        CREATE TABLE IF NOT EXISTS feed_items (
+            user_id INTEGER NOT NULL,
+            platform TEXT NOT NULL CHECK(platform IN ('instagram','facebook')),
+            item_id TEXT NOT NULL,
+            source_id TEXT NOT NULL,
+            source_name TEXT NOT NULL,
+            type TEXT NOT NULL,
+            timestamp TEXT,
+            content TEXT,
+            permalink TEXT,
+            comment_count INTEGER,
+            PRIMARY KEY (platform, item_id, user_id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_feed_items_user_timestamp
+            ON feed_items(user_id, timestamp, platform, item_id);
+        CREATE INDEX IF NOT EXISTS idx_feed_items_user_platform_timestamp
+            ON feed_items(user_id, platform, timestamp, item_id);
+        CREATE INDEX IF NOT EXISTS idx_feed_items_user_source_timestamp
+            ON feed_items(user_id, platform, source_id, timestamp, item_id);
+        CREATE INDEX IF NOT EXISTS idx_feed_items_user_type_timestamp
+            ON feed_items(user_id, type, timestamp, platform, item_id);
+
+        CREATE TRIGGER IF NOT EXISTS feed_items_post_insert AFTER INSERT ON posts BEGIN
+            INSERT OR REPLACE INTO feed_items
+                (user_id, platform, item_id, source_id, source_name, type, timestamp, content, permalink, comment_count)
+            VALUES (NEW.user_id, 'instagram', NEW.id, NEW.username, NEW.username, NEW.type,
+                    NEW.timestamp, NEW.caption, NEW.permalink, NULL);
+        END;
+        CREATE TRIGGER IF NOT EXISTS feed_items_post_delete AFTER DELETE ON posts BEGIN
+            DELETE FROM feed_items WHERE platform = 'instagram' AND item_id = OLD.id AND user_id = OLD.user_id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS feed_items_fb_post_insert AFTER INSERT ON fb_posts BEGIN
+            INSERT OR REPLACE INTO feed_items
+                (user_id, platform, item_id, source_id, source_name, type, timestamp, content, permalink, comment_count)
+            SELECT fg.user_id, 'facebook', NEW.id, NEW.group_id, fg.name, 'fb_post',
+                   NEW.timestamp, NEW.content, NEW.permalink, NEW.comment_count
+            FROM fb_groups fg WHERE fg.group_id = NEW.group_id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS feed_items_fb_post_delete AFTER DELETE ON fb_posts BEGIN
+            DELETE FROM feed_items WHERE platform = 'facebook' AND item_id = OLD.id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS feed_items_fb_group_insert AFTER INSERT ON fb_groups BEGIN
+            INSERT OR REPLACE INTO feed_items
+                (user_id, platform, item_id, source_id, source_name, type, timestamp, content, permalink, comment_count)
+            SELECT NEW.user_id, 'facebook', fp.id, fp.group_id, NEW.name, 'fb_post',
+                   fp.timestamp, fp.content, fp.permalink, fp.comment_count
+            FROM fb_posts fp WHERE fp.group_id = NEW.group_id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS feed_items_fb_group_rename AFTER UPDATE OF name ON fb_groups BEGIN
+            UPDATE feed_items SET source_name = NEW.name
+            WHERE user_id = NEW.user_id AND platform = 'facebook' AND source_id = NEW.group_id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS feed_items_fb_group_delete AFTER DELETE ON fb_groups BEGIN
+            DELETE FROM feed_items
+            WHERE user_id = OLD.user_id AND platform = 'facebook' AND source_id = OLD.group_id;
+        END;
+
+        INSERT OR REPLACE INTO feed_items
+            (user_id, platform, item_id, source_id, source_name, type, timestamp, content, permalink, comment_count)
+        SELECT user_id, 'instagram', id, username, username, type, timestamp, caption, permalink, NULL
+        FROM posts;
+        INSERT OR REPLACE INTO feed_items
+            (user_id, platform, item_id, source_id, source_name, type, timestamp, content, permalink, comment_count)
+        SELECT fg.user_id, 'facebook', fp.id, fp.group_id, fg.name, 'fb_post',
+               fp.timestamp, fp.content, fp.permalink, fp.comment_count
+        FROM fb_posts fp JOIN fb_groups fg ON fp.group_id = fg.group_id
+    """)
+
+
+# FTS5 tables over the text users search, each an external-content index
+# keyed on its source table's rowid: (table, fts table, indexed columns)
+SEARCH_INDEXES = [
+    ("posts", "posts_fts", ("caption", "username")),
+    ("fb_posts", "fb_posts_fts", ("content", "author_name")),
+    ("newsletter_emails", "newsletter_fts", ("subject", "body_text", "from_name")),
+]
+
+
+def _search_index(conn: sqlite3.Connection):
+    # External content keeps the text in one place; the triggers hand FTS5 the
+    # old values it needs to remove a row. fb_posts are indexed once, not per
+    # user, and search() scopes them through fb_groups.
+    for table, fts, columns in SEARCH_INDEXES:
+        cols = ", ".join(columns)
+        new = ", ".join(f"NEW.{c}" for c in columns)
+        old = ", ".join(f"OLD.{c}" for c in columns)
+        _execute_script(conn, f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                {cols}, content='{table}', content_rowid='rowid',
+                tokenize='unicode61 remove_diacritics 2'
+            );
+            CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN
+                INSERT INTO {fts}(rowid, {cols}) VALUES (NEW.rowid, {new});
+            END;
+            CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN
+                INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', OLD.rowid, {old});
+            END;
+            CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {cols} ON {table} BEGIN
+                INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', OLD.rowid, {old});
+                INSERT INTO {fts}(rowid, {cols}) VALUES (NEW.rowid, {new});
+            END;
+            INSERT INTO {fts}({fts}) VALUES ('rebuild')
+        """)
+
+
+def _retention_indexes(conn: sqlite3.Connection):
+    # Retention checks whether any user still has a post id before deleting
+    # or trimming its shared media; the primary key leads with user_id
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_posts_id ON posts(id)")
+
+
+def _nullable_feed_item_timestamps(conn: sqlite3.Connection):
+    # feed_items.timestamp used to be NOT NULL, which rejected posts and FB
+    # posts scraped without a timestamp. The table only holds derived rows, so
+    # drop it with its triggers and let _feed_items rebuild and backfill it.
+    not_null = {row[1]: row[3] for row in conn.execute("PRAGMA table_info(feed_items)")}
+    if not not_null.get("timestamp"):
+        return
+    triggers = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name IN ('posts', 'fb_posts', 'fb_groups')"
+    )]
+    for name in triggers:
+        if name.startswith("feed_items_"):
+            conn.execute(f"DROP TRIGGER {name}")
+    conn.execute("DROP TABLE feed_items")
+    _feed_items(conn)
+
+
+# Ordered (version, description, apply) steps on top of the CREATE TABLE IF NOT
+# EXISTS schema in Database.initialize(). Never edit or reorder a released
+# step; append a new one instead.
+MIGRATIONS = [
+    (1, "columns previously added by per-call ALTER TABLE", _columns_added_over_time),
+    (2, "indexes for feed, digest, newsletter and scheduling queries", _hot_query_indexes),
+    (3, "feed indexes with an id tie-breaker for keyset pagination", _feed_indexes_with_id),
+    (4, "feed_items table maintained by triggers", _feed_items),
+    (5, "FTS5 search indexes over captions, FB posts and newsletters", _search_index),
+    (6, "post id index for retention's shared-post checks", _retention_indexes),
+    (7, "feed_items rows without a timestamp", _nullable_feed_item_timestamps),
+]
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection, migrations=MIGRATIONS) -> int:
+    """Apply pending migrations in order, each in its own transaction; returns the new version.
+
+    BEGIN IMMEDIATE takes the write lock before user_version is re-read, so
+    two processes starting at once never apply the same step twice.
+    """
+    for version, description, apply in migrations:
+        if schema_version(conn) >= version:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if schema_version(conn) >= version:
+                conn.execute("ROLLBACK")
+                continue
+            apply(conn)
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        logger.info(f"Applied schema migration {version}: {description}")
+    return schema_version(conn)
@@ -1,5 +1,6 @@
-import json
+import itertools
 import logging
+from collections.abc import Iterable
 from datetime import datetime, timezone
 
 from bs4 import BeautifulSoup
@@ -8,7 +9,7 @@ from curl_cffi import requests
 from anthropic import Anthropic
 
 from src.config import Config
-from src.db import Database
+from src.db import Database, get_database
 
 logger = logging.getLogger(__name__)
 
@@ -16,24 +17,20 @@ logger = logging.getLogger(__name__)
 def classify_emails(user_id: int):
     """Classify unprocessed newsletter emails as confirmations or content."""
     config = Config()
-    db = Database(config.DATABASE_PATH)
-    db.initialize()
+    db = get_database(config.DATABASE_PATH)
 
-    try:
-        unclassified = db.get_unclassified_emails(user_id)
-        if not unclassified:
-            return
+    unclassified = db.get_unclassified_emails(user_id)
+    if not unclassified:
+        return
 
-        logger.info(f"Classifying {len(unclassified)} unprocessed newsletter emails for user {user_id}")
-        client = Anthropic(api_key=config.ANTHROPIC_API_KEY)
+    logger.info(f"Classifying {len(unclassified)} unprocessed newsletter emails for user {user_id}")
+    client = Anthropic(api_key=config.ANTHROPIC_API_KEY)
 
-        for email in unclassified:
-            try:
-                _classify_single_email(db, client, email)
-            except Exception as e:
-                logger.error(f"Failed to classify email {email['id']}: {e}")
-    finally:
-        db.close()
+    for email in unclassified:
+        try:
+            _classify_single_email(db, client, email)
+        except Exception as e:
+            logger.error(f"Failed to classify email {email['id']}: {e}")
 
 
 def _classify_single_email(db: Database, client: Anthropic, email: dict):
@@ -73,43 +70,36 @@ def _classify_single_email(db: Database, client: Anthropic, email: dict):
 def summarize_new_emails(user_id: int):
     """Summarize processed newsletter emails that don't have a summary yet."""
     config = Config()
-    db = Database(config.DATABASE_PATH)
-    db.initialize()
+    db = get_database(config.DATABASE_PATH)
 
-    try:
-        unsummarized = db.get_unsummarized_emails(user_id)
-        if not unsummarized:
-            return
+    unsummarized = db.reader().iter_unsummarized_emails(user_id)
+    first = next(unsummarized, None)
+    if first is None:
+        return
 
-        logger.info(f"Summarizing {len(unsummarized)} newsletter emails for user {user_id}")
-        client = Anthropic(api_key=config.ANTHROPIC_API_KEY)
-        system_prompt = db.get_user_config(user_id, "newsletter_system_prompt") or ""
-        _summarize_newsletters(client, unsummarized, system_prompt, db=db)
-    finally:
-        db.close()
+    client = Anthropic(api_key=config.ANTHROPIC_API_KEY)
+    system_prompt = db.get_user_settings(user_id).newsletter_system_prompt
+    summaries = _summarize_newsletters(client, itertools.chain([first], unsummarized), system_prompt, db=db)
+    logger.info(f"Summarized {len(summaries)} newsletter emails for user {user_id}")
 
 
 def click_confirmations(user_id: int):
     """Find confirmation emails and click the confirmation links."""
     config = Config()
-    db = Database(config.DATABASE_PATH)
-    db.initialize()
+    db = get_database(config.DATABASE_PATH)
 
-    try:
-        confirmations = db.get_unprocessed_confirmations(user_id)
-        if not confirmations:
-            return
+    confirmations = db.get_unprocessed_confirmations(user_id)
+    if not confirmations:
+        return
 
-        logger.info(f"Processing {len(confirmations)} confirmation emails for user {user_id}")
-        client = Anthropic(api_key=config.ANTHROPIC_API_KEY)
+    logger.info(f"Processing {len(confirmations)} confirmation emails for user {user_id}")
+    client = Anthropic(api_key=config.ANTHROPIC_API_KEY)
 
-        for email in confirmations:
-            try:
-                _click_confirmation(db, client, email)
-            except Exception as e:
-                logger.error(f"Failed to click confirmation for email {email['id']}: {e}")
-    finally:
-        db.close()
+    for email in confirmations:
+        try:
+            _click_confirmation(db, client, email)
+        except Exception as e:
+            logger.error(f"Failed to click confirmation for email {email['id']}: {e}")
 
 
 def _click_confirmation(db: Database, client: Anthropic, email: dict):
@@ -167,46 +157,46 @@ def _click_confirmation(db: Database, client: Anthropic, email: dict):
 def build_and_send_digest(user_id: int, schedule_name: str | None = None):
     """Build a newsletter digest from undigested emails and send it."""
     config = Config()
-    db = Database(config.DATABASE_PATH)
-    db.initialize()
-
-    try:
-        emails = db.get_undigested_emails(user_id)
-        if not emails:
-            logger.info(f"No undigested newsletter emails for user {user_id}")
-            return
+    db = get_database(config.DATABASE_PATH)
+
+    # Streamed: only a batch of email bodies is in memory at a time, and
+    # the summaries keep just what the digest needs
+    emails = db.reader().iter_undigested_emails(user_id)
+    first = next(emails, None)
+    if first is None:
+        logger.info(f"No undigested newsletter emails for user {user_id}")
+        return
 
-        today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-        run_id = db.insert_newsletter_digest_run(user_id, today)
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    run_id = db.insert_newsletter_digest_run(user_id, today)
 
-        logger.info(f"Building newsletter digest for user {user_id}: {len(emails)} emails")
+    logger.info(f"Building newsletter digest for user {user_id}")
 
-        try:
-            client = Anthropic(api_key=config.ANTHROPIC_API_KEY)
-            system_prompt = db.get_user_config(user_id, "newsletter_system_prompt") or ""
-            digest_prompt = db.get_user_config(user_id, "newsletter_digest_prompt") or ""
-            summaries = _summarize_newsletters(client, emails, system_prompt, db=db)
-            recent_digests = db.get_recent_digest_html(user_id, limit=3)
-            digest_title, digest_content = _structure_digest(client, summaries, digest_prompt, recent_digests)
-            html = _build_digest_html(config, digest_content, len(emails), today, emails=emails)
-            db.save_digest_html(run_id, html)
-            _send_digest_email(config, db, user_id, html, emails, digest_title)
-
-            email_ids = [e["id"] for e in emails]
-            db.mark_emails_digested(email_ids, today)
-            db.finish_newsletter_digest_run(run_id, "success", email_count=len(emails), subject=digest_title, schedule_name=schedule_name)
-            logger.info(f"Newsletter digest sent for user {user_id}: {len(emails)} emails summarized")
+    try:
+        client = Anthropic(api_key=config.ANTHROPIC_API_KEY)
+        settings = db.get_user_settings(user_id)
+        system_prompt = settings.newsletter_system_prompt
+        digest_prompt = settings.newsletter_digest_prompt
+        summaries = _summarize_newsletters(client, itertools.chain([first], emails), system_prompt, db=db)
+        recent_digests = db.reader().get_recent_digest_html(user_id, limit=3)
+        digest_title, digest_content = _structure_digest(client, summaries, digest_prompt, recent_digests)
+        html = _build_digest_html(config, digest_content, len(summaries), today, emails=summaries)
+        db.save_digest_html(run_id, html)
+        _send_digest_email(config, db, user_id, html, summaries, digest_title)
+
+        email_ids = [s["id"] for s in summaries]
+        db.mark_emails_digested(email_ids, today)
+        db.finish_newsletter_digest_run(run_id, "success", email_count=len(summaries), subject=digest_title, schedule_name=schedule_name)
+        logger.info(f"Newsletter digest sent for user {user_id}: {len(summaries)} emails summarized")
 
-        except Exception as e:
-            logger.error(f"Newsletter digest failed for user {user_id}: {e}")
-            db.finish_newsletter_digest_run(run_id, "error", error=str(e))
+    except Exception as e:
+        logger.error(f"Newsletter digest failed for user {user_id}: {e}")
+        db.finish_newsletter_digest_run(run_id, "error", error=str(e))
 
-    finally:
-        db.close()
 
 
-def _summarize_newsletters(client: Anthropic, emails: list[dict], system_prompt: str = "", db: Database = None) -> list[dict]:
-    """Use Claude to summarize each newsletter email."""
+def _summarize_newsletters(client: Anthropic, emails: Iterable[dict], system_prompt: str = "", db: Database = None) -> list[dict]:
+    """Use Claude to summarize each newsletter email; emails may be a stream of rows."""
     summaries = []
 
     default_system = (
@@ -356,7 +346,11 @@ def _clean_sender(from_address: str, fallback: str = "") -> str:
 def _build_digest_html(config: Config, digest_content: str,
                        email_count: int, digest_date: str,
                        emails: list[dict] | None = None) -> str:
-    """Build HTML for the newsletter digest email using Jinja2."""
+    """Build HTML for the newsletter digest email using Jinja2.
+
+    emails are the digest's summaries, which carry each newsletter's id,
+    subject and sender.
+    """
     import os
     from jinja2 import Environment, FileSystemLoader
 
@@ -388,19 +382,7 @@ def _build_digest_html(config: Config, digest_content: str,
 
 def _get_recipients(db: Database, user_id: int) -> list[str]:
     """Resolve recipient list from user_config with fallback chain."""
-    try:
-        recipients = json.loads(db.get_user_config(user_id, "newsletter_recipients") or "[]")
-        if recipients:
-            return recipients
-    except (json.JSONDecodeError, TypeError):
-        pass
-    # Fallback: old single-email key
-    old = db.get_user_config(user_id, "newsletter_digest_email") or ""
-    if old:
-        return [old]
-    # Fallback: main email_recipient
-    main = db.get_user_config(user_id, "email_recipient") or ""
-    return [main] if main else []
+    return db.get_user_settings(user_id).newsletter_recipients
 
 
 def _send_digest_email(config: Config, db: Database, user_id: int,
@@ -424,8 +406,4 @@ def _send_digest_email(config: Config, db: Database, user_id: int,
 
 def get_schedules(db: Database, user_id: int) -> list[dict]:
     """Load newsletter digest schedules from user_config."""
-    try:
-        schedules = json.loads(db.get_user_config(user_id, "newsletter_schedules") or "[]")
-        return [s for s in schedules if s.get("enabled", True)]
-    except (json.JSONDecodeError, TypeError):
-        return []
+    return db.get_user_settings(user_id).newsletter_schedules
@@ -0,0 +1,113 @@
+import threading
+import time
+
+_local = threading.local()
+
+
+def _held() -> list:
+    held = getattr(_local, "slots", None)
+    if held is None:
+        held = _local.slots = []
+    return held
+
+
+class PlatformSlot:
+    """Concurrency slot for talking to one platform, lent out while its holder paces.
+
+    Holding a slot means "this session is actively making requests". While the
+    holding thread sits in pace(), the slot is released so another user's
+    session can use it, and taken back before the next request.
+
+    The limit therefore bounds how many sessions make requests at the same
+    moment, not how many are open against the platform: a paused session
+    stays logged in mid-scrape while others use its slot, so up to
+    SCRAPE_WORKERS sessions can be open at once.
+
+    A session waking from pace() goes ahead of sessions that have not started
+    yet, and waits at most resume_wait seconds for a slot. After that it
+    carries on anyway, running over the limit until enough slots are
+    released; no new session starts until the count is back under it.
+    """
+
+    def __init__(self, limit: int, resume_wait: float = 10.0):
+        self.limit = limit
+        self.resume_wait = resume_wait
+        self._cond = threading.Condition()
+        self._active = 0
+        self._resuming = 0
+
+    def __enter__(self):
+        with self._cond:
+            self._cond.wait_for(lambda: self._active < self.limit and not self._resuming)
+            self._active += 1
+        _held().append(self)
+        return self
+
+    def __exit__(self, *exc):
+        _held().remove(self)
+        self._release()
+        return False
+
+    def _release(self):
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    def _resume(self):
+        """Take the slot back after a pause, waiting no longer than resume_wait."""
+        with self._cond:
+            self._resuming += 1
+            try:
+                self._cond.wait_for(lambda: self._active < self.limit, self.resume_wait)
+            finally:
+                self._resuming -= 1
+            self._active += 1
+            self._cond.notify_all()
+
+
+# Per-thread callbacks run before each pace() sleep, keyed on thread ident
+_pause_hooks: dict[int, list] = {}
+_pause_hooks_lock = threading.Lock()
+
+
+def add_pause_hook(fn, thread_id: int | None = None):
+    """Call fn(seconds) on thread_id (default: the caller) before each of its pace() sleeps."""
+    thread_id = threading.get_ident() if thread_id is None else thread_id
+    with _pause_hooks_lock:
+        _pause_hooks.setdefault(thread_id, []).append(fn)
+
+
+def remove_pause_hook(fn, thread_id: int | None = None):
+    thread_id = threading.get_ident() if thread_id is None else thread_id
+    with _pause_hooks_lock:
+        hooks = _pause_hooks.get(thread_id, [])
+        if fn in hooks:
+            hooks.remove(fn)
+        if not hooks:
+            _pause_hooks.pop(thread_id, None)
+
+
+def pace(seconds: float):
+    """Sleep for a humanization or back-off delay without holding a platform slot.
+
+    The session's own pacing is unchanged: it never resumes earlier than
+    seconds, and at most each slot's resume_wait later if every slot is busy
+    when it wakes up. Hooks added with add_pause_hook() for this thread run
+    first.
+
+    Only the platform slots are released. The sleeping session keeps its
+    worker thread, which is why ScrapeWorkerPool wants more workers than
+    platform slots.
+    """
+    with _pause_hooks_lock:
+        hooks = list(_pause_hooks.get(threading.get_ident(), []))
+    for hook in hooks:
+        hook(seconds)
+    held = list(_held())
+    for slot in reversed(held):
+        slot._release()
+    try:
+        time.sleep(seconds)
+    finally:
+        for slot in held:
+            slot._resume()
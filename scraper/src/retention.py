@@ -0,0 +1,123 @@
+import logging
+import os
+import time
+from dataclasses import dataclass
+
+from src.config import Config
+from src.db import Database
+from src.settings import UserSettings
+
+logger = logging.getLogger(__name__)
+
+# Post directories under MEDIA_PATH/<username>/ that don't belong to a post
+PROTECTED_MEDIA_DIRS = {"_profile"}
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """How many days to keep each kind of data; 0 keeps it forever."""
+    story_days: int = 0
+    run_log_days: int = 0
+    media_days: int = 0
+
+    @classmethod
+    def for_user(cls, settings: UserSettings, config: Config | None = None) -> "RetentionPolicy":
+        """The user's retention_<kind>_days settings over the RETENTION_* defaults."""
+        config = config or Config()
+
+        def days(kind: str, default: int) -> int:
+            value = settings.retention_days(kind)
+            return default if value is None else value
+
+        return cls(
+            story_days=days("story", config.RETENTION_STORY_DAYS),
+            run_log_days=days("run_log", config.RETENTION_RUN_LOG_DAYS),
+            media_days=days("media", config.RETENTION_MEDIA_DAYS),
+        )
+
+
+def remove_media_files(media_dir: str, rel_paths: list[str]) -> int:
+    """Delete files under media_dir and any post directories left empty; returns files removed."""
+    removed = 0
+    for rel_path in rel_paths:
+        full_path = os.path.join(media_dir, rel_path)
+        try:
+            os.remove(full_path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove {rel_path}: {e}")
+            continue
+        try:
+            os.rmdir(os.path.dirname(full_path))
+        except OSError:
+            pass  # not empty (or already gone)
+    return removed
+
+
+def enforce_user_retention(db: Database, user_id: int, policy: RetentionPolicy,
+                           media_dir: str, batch_size: int = 500) -> dict[str, int]:
+    """Apply policy to one user's data in batches of batch_size; returns counts per kind.
+
+    Each batch commits on its own, and files are removed only after the rows
+    pointing at them are gone, so a crash leaves at worst an orphaned file.
+    """
+    counts = {"stories": 0, "trimmed_media": 0, "run_logs": 0, "files": 0}
+    if policy.story_days:
+        while True:
+            deleted, paths = db.delete_old_stories(user_id, policy.story_days, batch_size)
+            counts["stories"] += deleted
+            counts["files"] += remove_media_files(media_dir, paths)
+            if not deleted:
+                break
+    if policy.media_days:
+        while True:
+            trimmed, paths = db.trim_old_media(user_id, policy.media_days, batch_size)
+            counts["trimmed_media"] += trimmed
+            counts["files"] += remove_media_files(media_dir, paths)
+            if not trimmed:
+                break
+    if policy.run_log_days:
+        while cleared := db.clear_old_run_logs(user_id, policy.run_log_days, batch_size):
+            counts["run_logs"] += cleared
+    return counts
+
+
+def sweep_orphan_media(db: Database, media_dir: str, grace_hours: int = 24) -> int:
+    """Remove post directories under media_dir that no media row refers to; returns files removed.
+
+    Files are downloaded before their rows commit, so anything modified in
+    the last grace_hours is left alone.
+    """
+    cutoff = time.time() - grace_hours * 3600
+    removed = 0
+    try:
+        usernames = sorted(os.listdir(media_dir))
+    except FileNotFoundError:
+        return 0
+    for username in usernames:
+        user_dir = os.path.join(media_dir, username)
+        if not os.path.isdir(user_dir):
+            continue
+        post_ids = [name for name in os.listdir(user_dir)
+                    if name not in PROTECTED_MEDIA_DIRS and os.path.isdir(os.path.join(user_dir, name))]
+        for start in range(0, len(post_ids), 500):
+            batch = post_ids[start:start + 500]
+            referenced = db.get_media_for_posts(batch)
+            for post_id in batch:
+                if post_id in referenced:
+                    continue
+                post_dir = os.path.join(user_dir, post_id)
+                files = [os.path.join(username, post_id, name) for name in os.listdir(post_dir)
+                         if os.path.getmtime(os.path.join(post_dir, name)) < cutoff]
+                removed += remove_media_files(media_dir, files)
+    return removed
+
+
+def compact(db: Database, max_pages: int = 0) -> int:
+    """Hand free pages back to the filesystem; returns pages freed."""
+    if db.auto_vacuum_mode() != "incremental":
+        logger.info("auto_vacuum is off for this database; run `python -m compact --vacuum` once")
+        return 0
+    return db.incremental_vacuum(max_pages)
@@ -0,0 +1,210 @@
+import asyncio
+import heapq
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from croniter import croniter
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicJob:
+    def __init__(self, name: str, interval: float, fn):
+        self.name = name
+        self.interval = interval
+        self.fn = fn
+
+
+class Scheduler:
+    """asyncio scheduler that runs blocking check functions periodically.
+
+    Each job gets its own task and runs on an executor thread, so one slow job
+    (e.g. a cookie test stuck in 429 back-off) never delays the others. A job
+    is never run concurrently with itself: the next run starts `interval`
+    seconds after the previous one started, or right away if it overran.
+
+    Run durations, errors and heartbeats are reported to metrics when given.
+    """
+
+    def __init__(self, metrics=None):
+        self._metrics = metrics
+        self._jobs: list[PeriodicJob] = []
+        self._stop: asyncio.Event | None = None
+        self._executor: ThreadPoolExecutor | None = None
+
+    def every(self, interval: float, fn, name: str | None = None):
+        self._jobs.append(PeriodicJob(name or fn.__name__, interval, fn))
+
+    def stop(self):
+        """Ask the scheduler to stop. Safe to call from a signal handler on the loop."""
+        if self._stop is not None:
+            self._stop.set()
+
+    async def _run_periodic(self, job: PeriodicJob):
+        loop = asyncio.get_running_loop()
+        while not self._stop.is_set():
+            started = time.monotonic()
+            ok = True
+            try:
+                await loop.run_in_executor(self._executor, job.fn)
+            except Exception as e:
+                ok = False
+                logger.error(f"Error in {job.name}: {e}")
+            elapsed = time.monotonic() - started
+            if self._metrics is not None:
+                self._metrics.observe_job(job.name, elapsed, ok)
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=max(0.0, job.interval - elapsed))
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self):
+        """Run all registered jobs until stop() is called."""
+        self._stop = asyncio.Event()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, len(self._jobs)), thread_name_prefix="scheduler",
+        )
+        tasks = [asyncio.create_task(self._run_periodic(job), name=job.name) for job in self._jobs]
+        try:
+            await self._stop.wait()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            # Checks already running on a thread can't be interrupted; let them finish
+            self._executor.shutdown(wait=True)
+
+
+class ChangeGate:
+    """Lets a polling scan skip ticks when nothing has been written since its last run.
+
+    Tracks PRAGMA data_version on the gate's own long-lived connection, which
+    changes whenever any other connection commits: the web app, a scrape
+    worker, or the scan itself. Scheduler ticks land on whichever executor
+    thread is free, so the caller's per-thread connection can't be used. A scan that wrote therefore runs once more before
+    the gate settles. A run is still forced every max_interval seconds for
+    time-based work such as reclaiming expired job leases.
+    """
+
+    def __init__(self, max_interval: float = 60):
+        self.max_interval = max_interval
+        self._lock = threading.Lock()
+        self._db = None
+        self._version: int | None = None
+        self._last_run: float | None = None
+
+    def _data_version(self, db) -> int:
+        if self._db is None or self._db.db_path != db.db_path:
+            self.close()
+            self._db = type(db)(db.db_path, check_same_thread=False, profile=db.profile)
+        return self._db.data_version()
+
+    def should_run(self, db) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            version = self._data_version(db)
+            if (version == self._version and self._last_run is not None
+                    and now - self._last_run < self.max_interval):
+                return False
+            self._version = version
+            self._last_run = now
+            return True
+
+    def reset(self):
+        """Make the next should_run() return True regardless of data_version."""
+        with self._lock:
+            self._version = None
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+            self._version = None
+
+
+class CronHeap:
+    """Min-heap of users keyed on their next cron due time.
+
+    Users popped by pop_due() are "in flight" until finish() puts them back
+    with a freshly computed due time, so a periodic resync() never re-queues
+    a user whose scrape is still running. Entries are invalidated lazily: the
+    heap may hold stale tuples, but only the one matching _due is live.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._heap: list[tuple[datetime, int]] = []
+        self._due: dict[int, datetime] = {}
+        self._in_flight: set[int] = set()
+
+    def _push(self, user_id: int, due: datetime):
+        self._due[user_id] = due
+        heapq.heappush(self._heap, (due, user_id))
+
+    def set(self, user_id: int, due: datetime | None):
+        """(Re)schedule user_id at due; None removes the user."""
+        with self._lock:
+            if user_id in self._in_flight:
+                return
+            if due is None:
+                self._due.pop(user_id, None)
+            else:
+                self._push(user_id, due)
+
+    def finish(self, user_id: int, due: datetime | None):
+        """Mark an in-flight user's run as finished and schedule its next run."""
+        with self._lock:
+            self._in_flight.discard(user_id)
+            if due is None:
+                self._due.pop(user_id, None)
+            else:
+                self._push(user_id, due)
+
+    def resync(self, schedule: dict[int, datetime | None]):
+        """Replace the heap contents with schedule, keeping in-flight users untouched."""
+        with self._lock:
+            self._heap = []
+            self._due = {}
+            for user_id, due in schedule.items():
+                if due is not None and user_id not in self._in_flight:
+                    self._due[user_id] = due
+                    self._heap.append((due, user_id))
+            heapq.heapify(self._heap)
+
+    def pop_due(self, now: datetime) -> list[tuple[int, datetime]]:
+        """Remove and return (user_id, due_at) for every user due at or before now."""
+        due_users = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due, user_id = heapq.heappop(self._heap)
+                if self._due.get(user_id) != due:
+                    continue  # superseded entry
+                del self._due[user_id]
+                self._in_flight.add(user_id)
+                due_users.append((user_id, due))
+        return due_users
+
+    def next_due(self, user_id: int) -> datetime | None:
+        with self._lock:
+            return self._due.get(user_id)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._due)
+
+
+# Due time of users that have never been scraped: before anything else
+NEVER_RUN = datetime.min.replace(tzinfo=timezone.utc)
+
+
+def next_run_time(cron_expr: str, last_run_time: str | None) -> datetime:
+    """Next cron fire time after last_run_time (UTC); never-run users are due immediately."""
+    if last_run_time is None:
+        return NEVER_RUN
+    last = datetime.fromisoformat(last_run_time)
+    if last.tzinfo is None:
+        last = last.replace(tzinfo=timezone.utc)
+    return croniter(cron_expr, last).get_next(datetime)
@@ -1,4 +1,5 @@
 import logging
+from itertools import takewhile
 from src.db import Database
 from src.instagram import InstagramClient, SessionExpiredError
 from src.downloader import MediaDownloader
@@ -17,37 +18,49 @@ class Scraper:
         self.fb = fb_client
 
     def scrape_account(self, username: str, since_date: str | None = None) -> tuple[int, int]:
-        new_posts = 0
-        new_stories = 0
-
         amount = 500 if since_date else 20
         posts = self.ig.get_user_posts(username, amount=amount)
-        for post in posts:
-            if since_date and post["timestamp"] < since_date:
-                break
-            was_new = self._process_post(post, username)
-            if was_new:
-                new_posts += 1
+        if since_date:
+            posts = list(takewhile(lambda post: post["timestamp"] >= since_date, posts))
+        new_posts = self._process_posts(posts, username)
 
         # Delay between posts and stories fetch to look more human
         self.ig.random_delay(5.0, 15.0)
 
         stories = self.ig.get_user_stories(username)
-        for story in stories:
-            was_new = self._process_post(story, username)
-            if was_new:
-                new_stories += 1
+        new_stories = self._process_posts(stories, username)
 
         self.db.update_last_checked(self.user_id, username)
         return new_posts, new_stories
 
-    def _process_post(self, post_data: dict, username: str) -> bool:
-        post_id = post_data["id"]
+    def _process_posts(self, posts: list[dict], username: str | None = None) -> int:
+        """Store the posts this user doesn't have yet; returns how many were new.
 
-        if self.db.get_post(post_id):
-            return False
+        One query picks out the new ids for the whole page before anything is
+        downloaded, and one more finds media already stored for posts that
+        another user scraped first.
+        """
+        new_ids = set(self.db.filter_new_post_ids(self.user_id, [post["id"] for post in posts]))
+        new_posts = []
+        for post in posts:
+            if post["id"] in new_ids:
+                new_posts.append(post)
+                new_ids.discard(post["id"])
+        stored_media = self.db.get_media_for_posts([post["id"] for post in new_posts])
+
+        count = 0
+        for post in new_posts:
+            post_username = username or post.get("username", "")
+            if self._process_post(post, post_username, has_media=post["id"] in stored_media):
+                count += 1
+        return count
+
+    def _process_post(self, post_data: dict, username: str, has_media: bool = False) -> bool:
+        """Download and store one new post; has_media means its media rows already exist."""
+        post_id = post_data["id"]
+        media = [] if has_media else post_data.get("media", [])
 
-        for item in post_data.get("media", []):
+        for item in media:
             file_path, thumb_path = self.downloader.download_with_thumbnail(
                 url=item["url"],
                 username=username,
@@ -57,24 +70,27 @@ class Scraper:
             item["file_path"] = file_path or ""
             item["thumbnail_path"] = thumb_path
 
-        self.db.insert_post(
-            user_id=self.user_id,
-            id=post_id,
-            username=username,
-            post_type=post_data["post_type"],
-            caption=post_data["caption"],
-            timestamp=post_data["timestamp"],
-            permalink=post_data["permalink"],
-        )
-
-        for item in post_data.get("media", []):
-            self.db.insert_media(
-                post_id=post_id,
-                media_type=item["type"],
-                file_path=item.get("file_path", ""),
-                thumbnail_path=item.get("thumbnail_path"),
-                order=item["order"],
-            )
+        # Post and media commit together, so a crash never leaves a post without its media
+        with self.db.transaction():
+            if not self.db.insert_post(
+                user_id=self.user_id,
+                id=post_id,
+                username=username,
+                post_type=post_data["post_type"],
+                caption=post_data["caption"],
+                timestamp=post_data["timestamp"],
+                permalink=post_data["permalink"],
+            ):
+                return False
+            self.db.insert_media_many(post_id, [
+                {
+                    "media_type": item["type"],
+                    "file_path": item.get("file_path", ""),
+                    "thumbnail_path": item.get("thumbnail_path"),
+                    "order": item["order"],
+                }
+                for item in media
+            ])
 
         return True
 
@@ -108,13 +124,9 @@ class Scraper:
         logger.info("Fetching timeline feed...")
         try:
             feed_posts = self.ig.get_timeline_feed(pages=5)
-            for post in feed_posts:
-                username = post.get("username", "")
-                if username not in followed:
-                    continue
-                was_new = self._process_post(post, username)
-                if was_new:
-                    total_posts += 1
+            total_posts = self._process_posts(
+                [post for post in feed_posts if post.get("username", "") in followed]
+            )
             logger.info(f"Timeline feed: {total_posts} new posts from {len(followed)} followed accounts")
         except SessionExpiredError:
             raise
@@ -127,13 +139,9 @@ class Scraper:
         logger.info("Fetching stories tray...")
         try:
             stories = self.ig.get_reels_tray()
-            for story in stories:
-                username = story.get("username", "")
-                if username not in followed:
-                    continue
-                was_new = self._process_post(story, username)
-                if was_new:
-                    total_stories += 1
+            total_stories = self._process_posts(
+                [story for story in stories if story.get("username", "") in followed]
+            )
             logger.info(f"Stories tray: {total_stories} new stories")
         except SessionExpiredError:
             raise
@@ -161,34 +169,34 @@ class Scraper:
         if not self.fb:
             return 0
         posts = self.fb.get_group_posts(group_id)
-        new_count = 0
+
+        # Fetch comments for unseen posts first, so the page is written in one
+        # commit without holding the write lock across requests
+        comments_by_post = {}
         for post in posts:
-            was_new = self.db.insert_fb_post(
-                id=post["id"],
-                group_id=group_id,
-                author_name=post["author_name"],
-                content=post["content"],
-                timestamp=post["timestamp"],
-                permalink=post["permalink"],
-                comment_count=post["comment_count"],
-            )
-            if was_new and post["comment_count"] > 0:
+            if post["comment_count"] > 0 and not self.db.get_fb_post(post["id"]):
                 story_fbid = post["id"].removeprefix("fb_")
                 try:
-                    comments = self.fb.get_post_comments(group_id, story_fbid, limit=3)
-                    for comment in comments:
-                        self.db.insert_fb_comment(
-                            post_id=post["id"],
-                            author_name=comment["author_name"],
-                            content=comment["content"],
-                            timestamp=comment["timestamp"],
-                            order=comment["order"],
-                        )
+                    comments_by_post[post["id"]] = self.fb.get_post_comments(group_id, story_fbid, limit=3)
                 except Exception as e:
                     logger.warning(f"Failed to fetch comments for {post['id']}: {e}")
-            if was_new:
-                new_count += 1
-        self.db.update_fb_group_last_checked(self.user_id, group_id)
+
+        new_count = 0
+        with self.db.transaction():
+            for post in posts:
+                was_new = self.db.insert_fb_post(
+                    id=post["id"],
+                    group_id=group_id,
+                    author_name=post["author_name"],
+                    content=post["content"],
+                    timestamp=post["timestamp"],
+                    permalink=post["permalink"],
+                    comment_count=post["comment_count"],
+                )
+                if was_new:
+                    self.db.insert_fb_comments(post["id"], comments_by_post.get(post["id"], []))
+                    new_count += 1
+            self.db.update_fb_group_last_checked(self.user_id, group_id)
         return new_count
 
     def scrape_all_fb_groups(self) -> int:
@@ -0,0 +1,127 @@
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+
+DEFAULT_CRON_SCHEDULE = "0 8 * * *"
+
+# Large or write-heavy keys that settings snapshots never need; read them directly.
+EXCLUDED_KEYS = ("ig_cookies", "fb_cookies", "cookie_test_log", "fb_cookie_test_log")
+
+
+@dataclass(frozen=True)
+class UserSettings:
+    """Snapshot of one user's user_config rows with typed accessors."""
+    user_id: int
+    values: dict[str, str] = field(default_factory=dict)
+
+    def get(self, key: str, default: str | None = None) -> str | None:
+        value = self.values.get(key)
+        return default if value is None else value
+
+    @property
+    def cron_schedule(self) -> str:
+        return self.values.get("cron_schedule") or DEFAULT_CRON_SCHEDULE
+
+    @property
+    def email_recipient(self) -> str | None:
+        return self.values.get("email_recipient") or None
+
+    @property
+    def ig_cookies_stale(self) -> bool:
+        return self.values.get("ig_cookies_stale") == "true"
+
+    @property
+    def fb_cookies_stale(self) -> bool:
+        return self.values.get("fb_cookies_stale") == "true"
+
+    def retention_days(self, kind: str) -> int | None:
+        """retention_<kind>_days as an int; None when unset or not a number (0 keeps forever)."""
+        try:
+            return max(0, int(self.values.get(f"retention_{kind}_days") or ""))
+        except ValueError:
+            return None
+
+    @property
+    def newsletter_system_prompt(self) -> str:
+        return self.values.get("newsletter_system_prompt") or ""
+
+    @property
+    def newsletter_digest_prompt(self) -> str:
+        return self.values.get("newsletter_digest_prompt") or ""
+
+    @property
+    def newsletter_schedules(self) -> list[dict]:
+        """Enabled newsletter digest schedules."""
+        try:
+            schedules = json.loads(self.values.get("newsletter_schedules") or "[]")
+            return [s for s in schedules if s.get("enabled", True)]
+        except (json.JSONDecodeError, TypeError, AttributeError):
+            return []
+
+    @property
+    def newsletter_recipients(self) -> list[str]:
+        """Digest recipients, falling back to the old single-address keys."""
+        try:
+            recipients = json.loads(self.values.get("newsletter_recipients") or "[]")
+            if recipients:
+                return recipients
+        except (json.JSONDecodeError, TypeError):
+            pass
+        old = self.values.get("newsletter_digest_email") or ""
+        if old:
+            return [old]
+        main = self.values.get("email_recipient") or ""
+        return [main] if main else []
+
+
+class SettingsCache:
+    """Process-wide cache of UserSettings, refreshed in bulk and invalidated per user on write.
+
+    Loaders take a token() before querying and pass it back when storing, so a
+    snapshot read before a concurrent set_user_config() is never cached.
+    The web app writes user_config directly, without invalidating anything
+    here, so entries also expire max_age seconds after they were loaded.
+    """
+
+    def __init__(self, max_age: float = 30):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._by_user: dict[int, tuple[UserSettings, float]] = {}
+        self._generation = 0
+        self._invalidated: dict[int, int] = {}
+
+    def token(self) -> int:
+        with self._lock:
+            return self._generation
+
+    def get(self, user_id: int) -> UserSettings | None:
+        with self._lock:
+            entry = self._by_user.get(user_id)
+            if entry is None:
+                return None
+            settings, loaded_at = entry
+            if time.monotonic() - loaded_at >= self.max_age:
+                del self._by_user[user_id]
+                return None
+            return settings
+
+    def _fresh(self, user_id: int, token: int) -> bool:
+        return self._invalidated.get(user_id, -1) < token
+
+    def replace(self, settings: dict[int, UserSettings], token: int):
+        """Swap in a freshly loaded snapshot for every active user."""
+        now = time.monotonic()
+        with self._lock:
+            self._by_user = {uid: (s, now) for uid, s in settings.items() if self._fresh(uid, token)}
+
+    def put(self, settings: UserSettings, token: int):
+        with self._lock:
+            if self._fresh(settings.user_id, token):
+                self._by_user[settings.user_id] = (settings, time.monotonic())
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._by_user.pop(user_id, None)
+            self._invalidated[user_id] = self._generation
+            self._generation += 1
@@ -0,0 +1,131 @@
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from src.pacing import PlatformSlot
+
+logger = logging.getLogger(__name__)
+
+PLATFORMS = ("instagram", "facebook")
+
+
+class ScrapeWorkerPool:
+    """Runs per-user work on a thread pool.
+
+    Work for the same user is serialized by chaining: each user has a queue,
+    and the next task is only handed to the executor once the current one
+    finishes, so a worker never sits blocked behind another task for the same
+    user. Different users run concurrently up to max_workers. Platform slots
+    cap how many workers may talk to Instagram or Facebook at the same time;
+    a worker sleeping between requests gives its slot up until it wakes, so
+    pauses overlap with other users' requests. That also means more sessions
+    than the platform limit can be open (paused mid-scrape) at once; only
+    max_workers bounds that.
+
+    A paused session still occupies its worker, so max_workers is sized
+    separately from, and above, the platform slots: with no more workers
+    than slots, sessions sleeping between requests leave queued users
+    waiting while slots sit idle.
+    """
+
+    def __init__(self, max_workers: int = 8, max_instagram: int = 2, max_facebook: int = 2,
+                 resume_wait: float = 10.0):
+        if max_workers <= max_instagram + max_facebook:
+            logger.warning(
+                f"{max_workers} scrape workers for {max_instagram + max_facebook} platform slots: "
+                "paused sessions will keep queued users from using idle slots"
+            )
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scrape")
+        self._platform_slots = {
+            "instagram": PlatformSlot(max_instagram, resume_wait),
+            "facebook": PlatformSlot(max_facebook, resume_wait),
+        }
+        self._lock = threading.Lock()
+        # Users with work running, each with the tasks waiting behind it
+        self._queues: dict[int, deque[tuple[Future, object, tuple]]] = {}
+
+    def submit(self, user_id: int, fn, *args) -> Future:
+        """Queue fn(*args) to run once no other work for user_id is running."""
+        future = Future()
+        future.add_done_callback(lambda f: self._log_failure(user_id, f))
+        with self._lock:
+            queue = self._queues.get(user_id)
+            if queue is not None:
+                queue.append((future, fn, args))
+                return future
+            self._queues[user_id] = deque()
+        self._start(user_id, future, fn, args)
+        return future
+
+    def _start(self, user_id: int, future: Future, fn, args: tuple):
+        def run():
+            if not future.set_running_or_notify_cancel():
+                self._advance(user_id)
+                return
+            try:
+                result = fn(*args)
+            except BaseException as e:
+                self._advance(user_id)
+                future.set_exception(e)
+            else:
+                self._advance(user_id)
+                future.set_result(result)
+
+        try:
+            task = self._executor.submit(run)
+        except RuntimeError:  # shut down
+            future.cancel()
+            self._advance(user_id)
+            return
+        task.add_done_callback(lambda t: self._dropped(user_id, future) if t.cancelled() else None)
+
+    def _dropped(self, user_id: int, future: Future):
+        """A task shutdown(cancel_futures=True) removed before it started."""
+        future.cancel()
+        self._advance(user_id)
+
+    def _advance(self, user_id: int):
+        """Start the user's next queued task, or mark the user idle."""
+        with self._lock:
+            queue = self._queues.get(user_id)
+            if not queue:
+                self._queues.pop(user_id, None)
+                return
+            future, fn, args = queue.popleft()
+        self._start(user_id, future, fn, args)
+
+    @staticmethod
+    def _log_failure(user_id: int, future: Future):
+        if future.cancelled():
+            return
+        exc = future.exception()
+        if exc is not None:
+            logger.error(f"Worker failed for user {user_id}: {exc}")
+
+    def is_active(self, user_id: int) -> bool:
+        """True if work for user_id is queued or running."""
+        with self._lock:
+            return user_id in self._queues
+
+    def active_users(self) -> set[int]:
+        with self._lock:
+            return set(self._queues)
+
+    def platform_slot(self, platform: str) -> PlatformSlot:
+        """Context manager that holds one of the platform's concurrency slots.
+
+        The slot is lent to other users while the holder sleeps in pacing.pace(),
+        so the platform limit caps concurrent requests, not open sessions.
+        """
+        return self._platform_slots[platform]
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting work and drop anything not yet started."""
+        with self._lock:
+            queued = [future for queue in self._queues.values() for future, _, _ in queue]
+            for queue in self._queues.values():
+                queue.clear()
+        for future in queued:
+            future.cancel()
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,92 @@
+import asyncio
+import sqlite3
+import threading
+
+import pytest
+
+from src.async_db import AsyncDatabase
+from src.db import Database
+
+
+def _insert(adb: AsyncDatabase, user_id: int, post_id: str, timestamp: str = "2026-01-01T00:00:00"):
+    return adb.insert_post(user_id, post_id, "acct", "post", "caption", timestamp, "")
+
+
+def test_hot_paths_round_trip(tmp_path):
+    path = str(tmp_path / "test.db")
+
+    async def run():
+        async with AsyncDatabase(path) as adb:
+            user_id = await adb.write(Database.insert_user, "a@example.com", "pw")
+            assert await _insert(adb, user_id, "p1")
+            assert not await _insert(adb, user_id, "p1")
+            assert await adb.filter_new_post_ids(user_id, ["p1", "p2"]) == ["p2"]
+            await _insert(adb, user_id, "p2", "2026-01-02T00:00:00")
+            assert [item["id"] for item in await adb.get_unified_feed(user_id)] == ["p2", "p1"]
+            run_id = await adb.write(Database.insert_scrape_run, user_id)
+            await adb.append_run_log_lines("scrape", run_id, [("ts", "INFO", "one"), (None, None, "two")])
+            return user_id, run_id, await adb.read(Database.get_run_log, "scrape", run_id)
+
+    user_id, run_id, log = asyncio.run(run())
+    assert log == "ts [INFO] one\ntwo\n"
+    # The sync API is unaffected and sees everything the facade wrote
+    db = Database(path)
+    assert db.get_run_log("scrape", run_id) == log
+    assert db.filter_new_post_ids(user_id, ["p1", "p2", "p3"]) == ["p3"]
+    db.close()
+
+
+def test_concurrent_writes_run_on_one_thread(tmp_path):
+    threads = set()
+
+    def insert(db, user_id, post_id):
+        threads.add(threading.current_thread().name)
+        return db.insert_post(user_id, post_id, "acct", "post", "", "2026-01-01", "")
+
+    async def run():
+        async with AsyncDatabase(str(tmp_path / "test.db"), readers=3) as adb:
+            user_id = await adb.write(Database.insert_user, "a@example.com", "pw")
+            results = await asyncio.gather(*(adb.write(insert, user_id, f"p{i}") for i in range(50)))
+            return results, await adb.filter_new_post_ids(user_id, [f"p{i}" for i in range(51)])
+
+    results, new_ids = asyncio.run(run())
+    assert all(results)
+    assert new_ids == ["p50"]
+    assert len(threads) == 1 and threads.pop().startswith("db-writer")
+
+
+def test_reads_do_not_wait_for_an_open_write_transaction(tmp_path):
+    locked, release = threading.Event(), threading.Event()
+
+    def hold_lock(db, user_id):
+        with db.transaction():
+            db.insert_post(user_id, "pending", "acct", "post", "", "2026-01-01", "")
+            locked.set()
+            release.wait(5)
+
+    async def run():
+        async with AsyncDatabase(str(tmp_path / "test.db")) as adb:
+            user_id = await adb.write(Database.insert_user, "a@example.com", "pw")
+            await _insert(adb, user_id, "p1")
+            writing = asyncio.ensure_future(adb.write(hold_lock, user_id))
+            await asyncio.to_thread(locked.wait, 5)
+            try:
+                feed = await asyncio.wait_for(adb.get_unified_feed(user_id), timeout=2)
+            finally:
+                release.set()
+            await writing
+            return feed, await adb.filter_new_post_ids(user_id, ["pending"])
+
+    feed, new_ids = asyncio.run(run())
+    assert [item["id"] for item in feed] == ["p1"]
+    assert new_ids == []
+
+
+def test_reader_threads_are_read_only(tmp_path):
+    async def run():
+        async with AsyncDatabase(str(tmp_path / "test.db")) as adb:
+            with pytest.raises(sqlite3.OperationalError):
+                await adb.read(Database.insert_user, "a@example.com", "pw")
+            return await adb.read(Database.get_user_by_email, "a@example.com")
+
+    assert asyncio.run(run()) is None
@@ -1,7 +1,13 @@
 import os
+import sqlite3
 import tempfile
+import time
 import pytest
-from src.db import Database
+from src.db import (
+    Database, LazyRow, MediaRow, PostRow, SqliteProfile, compress_text, decode_feed_cursor, decode_search_cursor,
+    decompress_text, encode_feed_cursor, encode_search_cursor,
+)
+from src.config import Config
 
 
 @pytest.fixture
@@ -49,6 +55,35 @@ def test_initialize_no_config_table(db):
     assert "config" not in table_names
 
 
+def test_connection_applies_sqlite_profile(tmp_path):
+    profile = SqliteProfile(synchronous="normal", cache_size_kb=4096, mmap_size_mb=8,
+                            temp_store="MEMORY", busy_timeout_ms=2500)
+    db = Database(str(tmp_path / "test.db"), profile=profile)
+    pragma = lambda name: db.execute(f"PRAGMA {name}").fetchone()[0]
+    assert pragma("journal_mode") == "wal"
+    assert pragma("synchronous") == 1
+    assert pragma("cache_size") == -4096
+    assert pragma("temp_store") == 2
+    assert pragma("busy_timeout") == 2500
+    assert pragma("foreign_keys") == 1
+    db.close()
+
+
+def test_sqlite_profile_from_config(monkeypatch):
+    monkeypatch.setattr(Config, "SQLITE_SYNCHRONOUS", "FULL")
+    monkeypatch.setattr(Config, "SQLITE_BUSY_TIMEOUT_MS", 1234)
+    profile = SqliteProfile.from_config()
+    assert profile.synchronous == "FULL"
+    assert profile.busy_timeout_ms == 1234
+
+
+def test_sqlite_profile_rejects_unknown_modes():
+    with pytest.raises(ValueError):
+        SqliteProfile(synchronous="NORMAL; DROP TABLE users")
+    with pytest.raises(ValueError):
+        SqliteProfile(temp_store="RAM")
+
+
 # ── Users ──────────────────────────────────────────────────────
 
 def test_insert_user(db):
@@ -172,6 +207,81 @@ def test_user_config_scoped_to_user(db, user_id, user_id_2):
     assert db.get_user_config(user_id_2, "theme") == "light"
 
 
+def test_load_user_settings_for_active_users(db, user_id, user_id_2):
+    db.set_user_config(user_id, "ig_cookies", "encrypted")
+    db.set_user_config(user_id, "cron_schedule", "0 9 * * *")
+    db.set_user_config(user_id, "newsletter_recipients", '["a@example.com"]')
+    db.set_user_config(user_id_2, "cron_schedule", "0 10 * * *")  # no cookies: not active
+
+    settings = db.load_user_settings()
+    assert set(settings) == {user_id}
+    s = settings[user_id]
+    assert s.cron_schedule == "0 9 * * *"
+    assert s.newsletter_recipients == ["a@example.com"]
+    assert s.get("ig_cookies") is None  # bulky keys are left out
+    assert s.email_recipient is None
+
+
+def test_load_user_settings_user_without_other_keys(db, user_id):
+    db.set_user_config(user_id, "ig_cookies", "encrypted")
+    s = db.load_user_settings()[user_id]
+    assert s.values == {}
+    assert s.cron_schedule == "0 8 * * *"
+    assert s.newsletter_schedules == []
+    assert not s.ig_cookies_stale
+
+
+def test_user_settings_typed_accessors(db, user_id):
+    db.set_user_config(user_id, "email_recipient", "me@example.com")
+    db.set_user_config(user_id, "ig_cookies_stale", "true")
+    db.set_user_config(user_id, "newsletter_schedules",
+                       '[{"id": "a", "time": "08:00"}, {"id": "b", "time": "18:00", "enabled": false}]')
+    s = db.get_user_settings(user_id)
+    assert s.ig_cookies_stale
+    assert [sch["id"] for sch in s.newsletter_schedules] == ["a"]
+    # Recipients fall back to the main email_recipient
+    assert s.newsletter_recipients == ["me@example.com"]
+
+
+def test_user_settings_cached_and_invalidated_on_set(db, user_id):
+    db.set_user_config(user_id, "email_recipient", "old@example.com")
+    first = db.get_user_settings(user_id)
+    assert db.get_user_settings(user_id) is first
+
+    db.set_user_config(user_id, "email_recipient", "new@example.com")
+    assert db.get_user_settings(user_id).email_recipient == "new@example.com"
+
+
+def test_user_settings_cache_shared_across_handles(db, user_id):
+    other = Database(db.db_path)
+    db.get_user_settings(user_id)
+    other.set_user_config(user_id, "email_recipient", "x@example.com")
+    assert db.get_user_settings(user_id).email_recipient == "x@example.com"
+    other.close()
+
+
+def test_user_settings_cache_skips_snapshot_older_than_write(db, user_id):
+    cache = db.settings_cache
+    token = cache.token()
+    stale = db.load_user_settings([user_id])[user_id]
+    db.set_user_config(user_id, "email_recipient", "new@example.com")
+    cache.put(stale, token)
+    assert cache.get(user_id) is None
+
+
+def test_user_settings_cache_expires_writes_from_elsewhere(db, user_id, monkeypatch):
+    db.set_user_config(user_id, "email_recipient", "old@example.com")
+    assert db.get_user_settings(user_id).email_recipient == "old@example.com"
+    # The web app writes user_config directly, bypassing set_user_config()
+    db.execute("UPDATE user_config SET value = 'new@example.com' WHERE user_id = ? AND key = 'email_recipient'",
+               (user_id,))
+    db.conn.commit()
+    assert db.get_user_settings(user_id).email_recipient == "old@example.com"
+    real_monotonic = time.monotonic
+    monkeypatch.setattr(time, "monotonic", lambda: real_monotonic() + db.settings_cache.max_age)
+    assert db.get_user_settings(user_id).email_recipient == "new@example.com"
+
+
 # ── Instagram Accounts ─────────────────────────────────────────
 
 def test_upsert_account(db, user_id):
@@ -281,6 +391,65 @@ def test_insert_media(db, user_id):
     assert media[0]["media_type"] == "image"
 
 
+def test_insert_media_many(db, user_id):
+    db.insert_post(
+        user_id=user_id, id="abc123", username="testuser",
+        post_type="post", caption="", timestamp="2026-01-01T00:00:00", permalink="",
+    )
+    db.insert_media_many("abc123", [
+        {"media_type": "image", "file_path": "a/1.jpg", "thumbnail_path": None, "order": 1},
+        {"media_type": "video", "file_path": "a/0.mp4", "thumbnail_path": "a/0.jpg", "order": 0},
+    ])
+    media = db.get_media_for_post("abc123")
+    assert [m["media_type"] for m in media] == ["video", "image"]
+
+
+def test_filter_new_post_ids(db, user_id, user_id_2):
+    for post_id in ("a", "c"):
+        db.insert_post(
+            user_id=user_id, id=post_id, username="u", post_type="post",
+            caption="", timestamp="2026-01-01T00:00:00", permalink="",
+        )
+    db.insert_post(
+        user_id=user_id_2, id="d", username="u", post_type="post",
+        caption="", timestamp="2026-01-01T00:00:00", permalink="",
+    )
+    assert db.filter_new_post_ids(user_id, ["e", "a", "b", "c", "d", "b"]) == ["e", "b", "d"]
+    assert db.filter_new_post_ids(user_id_2, ["a", "d"]) == ["a"]
+    assert db.filter_new_post_ids(user_id, []) == []
+
+
+def test_get_media_for_posts_groups_in_order(db, user_id):
+    for post_id in ("a", "b", "c"):
+        db.insert_post(
+            user_id=user_id, id=post_id, username="u", post_type="post",
+            caption="", timestamp="2026-01-01T00:00:00", permalink="",
+        )
+    db.insert_media("a", "image", "a/1.jpg", None, 1)
+    db.insert_media("b", "image", "b/0.jpg", None, 0)
+    db.insert_media("a", "video", "a/0.mp4", None, 0)
+    media = db.get_media_for_posts(["a", "b", "c"])
+    assert [m["file_path"] for m in media["a"]] == ["a/0.mp4", "a/1.jpg"]
+    assert [m["file_path"] for m in media["b"]] == ["b/0.jpg"]
+    assert "c" not in media
+    assert db.get_media_for_posts([]) == {}
+
+
+def test_get_new_posts_since_with_media(db, user_id):
+    db.insert_post(
+        user_id=user_id, id="p1", username="u", post_type="post",
+        caption="", timestamp="2026-01-01T00:00:00", permalink="",
+    )
+    db.insert_post(
+        user_id=user_id, id="p2", username="u", post_type="post",
+        caption="", timestamp="2026-01-02T00:00:00", permalink="",
+    )
+    db.insert_media("p1", "image", "u/p1/0.jpg", None, 0)
+    posts = db.get_new_posts_since(user_id, "2000-01-01", with_media=True)
+    assert [(p["id"], len(p["media"])) for p in posts] == [("p2", 0), ("p1", 1)]
+    assert "media" not in db.get_new_posts_since(user_id, "2000-01-01")[0]
+
+
 def test_get_feed_paginated(db, user_id):
     db.upsert_account(user_id, "testuser", None)
     for i in range(5):
@@ -294,6 +463,20 @@ def test_get_feed_paginated(db, user_id):
     assert page[0]["id"] == "post_4"
 
 
+def test_get_feed_cursor_pages_through_ties(db, user_id):
+    db.upsert_account(user_id, "testuser", None)
+    for i in range(5):
+        db.insert_post(
+            user_id=user_id, id=f"post_{i}", username="testuser",
+            post_type="post", caption="", timestamp="2026-01-01T00:00:00", permalink="",
+        )
+    seen, cursor = [], None
+    while page := db.get_feed(user_id, limit=2, cursor=cursor):
+        seen.extend(p["id"] for p in page)
+        cursor = encode_feed_cursor(page[-1])
+    assert seen == [f"post_{i}" for i in reversed(range(5))]
+
+
 def test_get_feed_scoped_to_user(db, user_id, user_id_2):
     db.upsert_account(user_id, "u1", None)
     db.upsert_account(user_id_2, "u2", None)
@@ -375,6 +558,33 @@ def test_get_last_scrape_time_only_success(db, user_id):
     assert db.get_last_scrape_time(user_id) is None
 
 
+def test_get_scrape_schedules(db, user_id, user_id_2):
+    db.set_user_config(user_id, "ig_cookies", "blob")
+    db.set_user_config(user_id, "cron_schedule", "0 9 * * *")
+    db.set_user_config(user_id_2, "ig_cookies", "blob")
+    db.set_user_config(user_id_2, "ig_cookies_stale", "true")
+    run_id = db.insert_scrape_run(user_id)
+    db.finish_scrape_run(run_id, status="success")
+    failed = db.insert_scrape_run(user_id_2)
+    db.finish_scrape_run(failed, status="error")
+
+    schedules = {s["user_id"]: s for s in db.get_scrape_schedules()}
+    assert schedules[user_id]["cron_schedule"] == "0 9 * * *"
+    assert schedules[user_id]["last_scrape"] == db.get_last_scrape_time(user_id)
+    assert schedules[user_id_2]["cron_schedule"] is None
+    assert schedules[user_id_2]["ig_cookies_stale"] == "true"
+    assert schedules[user_id_2]["last_scrape"] is None
+
+    only = db.get_scrape_schedules(user_id_2)
+    assert [s["user_id"] for s in only] == [user_id_2]
+
+
+def test_get_scrape_schedules_skips_inactive_and_cookieless(db, user_id, user_id_2):
+    db.set_user_config(user_id, "ig_cookies", "blob")
+    db.deactivate_user(user_id)
+    assert db.get_scrape_schedules() == []
+
+
 # ── Manual Runs ────────────────────────────────────────────────
 
 def test_manual_run_lifecycle(db, user_id):
@@ -437,6 +647,236 @@ def test_manual_runs_scoped_to_user(db, user_id, user_id_2):
     assert db.get_pending_manual_run(user_id_2)["user_id"] == user_id_2
 
 
+# ── Run Logs ───────────────────────────────────────────────────
+
+def test_run_log_lines_append_and_tail(db, user_id):
+    run_id = db.insert_scrape_run(user_id)
+    db.append_run_log_lines("scrape", run_id, [("t1", "INFO", "one"), ("t2", "WARNING", "two")])
+    db.append_run_log_lines("scrape", run_id, [("t3", "INFO", "three")])
+    lines = db.get_run_log_lines("scrape", run_id)
+    assert [(l["seq"], l["message"]) for l in lines] == [(1, "one"), (2, "two"), (3, "three")]
+    assert [l["message"] for l in db.get_run_log_lines("scrape", run_id, after_seq=2)] == ["three"]
+    assert db.get_run_log_lines("scrape", run_id, after_seq=3) == []
+    assert db.get_run_log("scrape", run_id) == "t1 [INFO] one\nt2 [WARNING] two\nt3 [INFO] three\n"
+
+
+def test_run_log_lines_kept_apart_per_run_kind(db, user_id):
+    scrape_id = db.insert_scrape_run(user_id)
+    manual_id = db.insert_manual_run(user_id, "2026-01-01")
+    db.append_run_log_lines("scrape", scrape_id, [("t", "INFO", "scheduled")])
+    db.append_run_log_lines("manual", manual_id, [("t", "INFO", "manual")])
+    assert [l["message"] for l in db.get_run_log_lines("scrape", scrape_id)] == ["scheduled"]
+    assert [l["message"] for l in db.get_run_log_lines("manual", manual_id)] == ["manual"]
+
+
+def test_run_log_includes_legacy_log_column(db, user_id):
+    run_id = db.insert_scrape_run(user_id)
+    db.execute("UPDATE scrape_runs SET log=? WHERE id=?", ("old line\n", run_id))
+    db.conn.commit()
+    db.append_run_log_lines("scrape", run_id, [("t", "INFO", "new line")])
+    assert db.get_run_log("scrape", run_id) == "old line\nt [INFO] new line\n"
+
+
+# ── Jobs ───────────────────────────────────────────────────────
+
+def _lease(db, owner, *user_ids):
+    for uid in user_ids:
+        assert db.acquire_user_lease(uid, owner, 60)
+
+
+def test_enqueue_and_claim_job(db, user_id):
+    job_id = db.enqueue_job(user_id, "cookie_test", {"source": "web"})
+    _lease(db, "worker-1", user_id)
+    job = db.claim_next_job("worker-1")
+    assert job["id"] == job_id
+    assert job["type"] == "cookie_test"
+    assert job["payload"] == {"source": "web"}
+    assert job["status"] == "running"
+    assert job["lease_owner"] == "worker-1"
+    assert job["attempts"] == 1
+    assert db.claim_next_job("worker-2") is None
+
+
+def test_enqueue_job_dedupes_pending(db, user_id, user_id_2):
+    assert db.enqueue_job(user_id, "trigger_scrape") is not None
+    assert db.enqueue_job(user_id, "trigger_scrape") is None
+    assert db.enqueue_job(user_id_2, "trigger_scrape") is not None
+
+
+def test_claim_job_fifo(db, user_id):
+    first = db.enqueue_job(user_id, "cookie_test")
+    second = db.enqueue_job(user_id, "fb_cookie_test")
+    _lease(db, "w", user_id)
+    assert db.claim_next_job("w")["id"] == first
+    assert db.claim_next_job("w")["id"] == second
+
+
+def test_complete_and_fail_job(db, user_id):
+    db.enqueue_job(user_id, "cookie_test")
+    db.enqueue_job(user_id, "fb_cookie_test")
+    _lease(db, "w", user_id)
+    ok = db.claim_next_job("w")
+    bad = db.claim_next_job("w")
+    db.complete_job(ok["id"])
+    db.fail_job(bad["id"], "boom")
+    assert db.get_job(ok["id"])["status"] == "done"
+    failed = db.get_job(bad["id"])
+    assert failed["status"] == "error"
+    assert failed["error"] == "boom"
+    assert failed["lease_owner"] is None
+
+
+def test_reclaim_expired_jobs(db, user_id):
+    job_id = db.enqueue_job(user_id, "trigger_scrape")
+    _lease(db, "dead-worker", user_id)
+    db.claim_next_job("dead-worker")
+    db.execute("UPDATE jobs SET lease_expires_at=datetime('now', '-1 minute') WHERE id=?", (job_id,))
+    db.execute("UPDATE user_leases SET expires_at=datetime('now', '-1 minute')")
+    db.conn.commit()
+    assert db.reclaim_expired_jobs() == 1
+    _lease(db, "new-worker", user_id)
+    job = db.claim_next_job("new-worker")
+    assert job["id"] == job_id
+    assert job["attempts"] == 2
+
+
+def test_reclaim_fails_job_that_keeps_killing_its_worker(db, user_id):
+    job_id = db.enqueue_job(user_id, "trigger_scrape")
+    _lease(db, "w", user_id)
+    for attempt in range(1, 4):
+        assert db.claim_next_job("w")["attempts"] == attempt
+        db.execute("UPDATE jobs SET lease_expires_at=datetime('now', '-1 minute') WHERE id=?", (job_id,))
+        db.conn.commit()
+        assert db.reclaim_expired_jobs(max_attempts=3) == (1 if attempt < 3 else 0)
+    job = db.get_job(job_id)
+    assert job["status"] == "error"
+    assert job["error"] == "Gave up after 3 attempts (worker lease expired)"
+    assert job["lease_owner"] is None and job["finished_at"] is not None
+    assert db.claim_next_job("w") is None
+
+
+def test_release_jobs(db, user_id, user_id_2):
+    mine = db.enqueue_job(user_id, "trigger_scrape")
+    theirs = db.enqueue_job(user_id_2, "trigger_scrape")
+    _lease(db, "me", user_id)
+    _lease(db, "them", user_id_2)
+    db.claim_next_job("me")
+    db.claim_next_job("them")
+    assert db.release_jobs("me") == 1
+    assert db.get_job(mine)["status"] == "pending"
+    assert db.get_job(theirs)["status"] == "running"
+
+
+def test_enqueue_pending_config_jobs(db, user_id, user_id_2):
+    db.set_user_config(user_id, "trigger_scrape", "pending")
+    db.set_user_config(user_id, "cookie_test", "done")
+    db.set_user_config(user_id_2, "fb_group_resolve", "pending")
+    db.enqueue_pending_config_jobs(["trigger_scrape", "cookie_test", "fb_group_resolve"])
+    db.enqueue_pending_config_jobs(["trigger_scrape", "cookie_test", "fb_group_resolve"])
+    jobs = db.execute("SELECT user_id, type FROM jobs ORDER BY id").fetchall()
+    assert [(j["user_id"], j["type"]) for j in jobs] == [
+        (user_id, "trigger_scrape"), (user_id_2, "fb_group_resolve"),
+    ]
+
+
+def test_count_pending_jobs(db, user_id):
+    db.enqueue_job(user_id, "cookie_test")
+    db.enqueue_job(user_id, "trigger_scrape")
+    _lease(db, "w1", user_id)
+    db.claim_next_job("w1")
+    assert db.count_pending_jobs() == 1
+
+
+def test_claim_next_job_skips_users_leased_elsewhere(db, user_id, user_id_2):
+    db.enqueue_job(user_id, "cookie_test")
+    db.enqueue_job(user_id_2, "cookie_test")
+    db.acquire_user_lease(user_id, "w2", 60)
+    db.acquire_user_lease(user_id_2, "w1", 60)
+    job = db.claim_next_job("w1")
+    assert job["user_id"] == user_id_2
+    assert db.claim_next_job("w1") is None
+    assert db.claim_next_job("w2")["user_id"] == user_id
+
+
+def test_claim_next_job_leaves_unleased_users_alone(db, user_id):
+    job_id = db.enqueue_job(user_id, "trigger_scrape")
+    assert db.claim_next_job("w1") is None
+    assert db.claim_next_job("w2") is None
+    # Expired leases don't count either
+    _lease(db, "w1", user_id)
+    db.execute("UPDATE user_leases SET expires_at=datetime('now', '-1 seconds')")
+    db.conn.commit()
+    assert db.claim_next_job("w1") is None
+    # Once a replica takes the user, only that replica gets the job
+    _lease(db, "w2", user_id)
+    assert db.claim_next_job("w1") is None
+    assert db.claim_next_job("w2")["id"] == job_id
+
+
+# ── User Leases ────────────────────────────────────────────────
+
+def test_acquire_user_lease_exclusive(db, user_id):
+    assert db.acquire_user_lease(user_id, "w1", 60)
+    assert not db.acquire_user_lease(user_id, "w2", 60)
+    assert db.acquire_user_lease(user_id, "w1", 60)  # renewal by the owner
+    assert [(l["user_id"], l["owner"]) for l in db.get_live_user_leases()] == [(user_id, "w1")]
+
+
+def test_expired_user_lease_can_be_taken_over(db, user_id):
+    db.acquire_user_lease(user_id, "w1", 60)
+    db.execute("UPDATE user_leases SET expires_at=datetime('now', '-1 seconds')")
+    db.conn.commit()
+    assert db.get_live_user_leases() == []
+    assert db.renew_user_leases("w1", 60) == []
+    assert db.acquire_user_lease(user_id, "w2", 60)
+    assert db.get_live_user_leases()[0]["owner"] == "w2"
+
+
+def test_renew_and_release_user_leases(db, user_id, user_id_2):
+    db.acquire_user_lease(user_id, "w1", 60)
+    db.acquire_user_lease(user_id_2, "w1", 60)
+    assert sorted(db.renew_user_leases("w1", 120)) == [user_id, user_id_2]
+    assert db.release_user_leases("w1", [user_id]) == 1
+    assert db.release_user_leases("w2") == 0
+    assert [l["user_id"] for l in db.get_live_user_leases()] == [user_id_2]
+
+
+def test_heartbeat_replica_lists_live_replicas(db):
+    assert db.heartbeat_replica("w1", 60) == ["w1"]
+    db.execute("INSERT INTO scraper_replicas VALUES ('dead', datetime('now', '-1 seconds'))")
+    db.conn.commit()
+    assert db.heartbeat_replica("w2", 60) == ["w1", "w2"]
+    db.remove_replica("w1")
+    assert db.heartbeat_replica("w2", 60) == ["w2"]
+
+
+# ── Scheduler Stats ────────────────────────────────────────────
+
+def test_record_and_get_scheduler_stats(db):
+    db.record_scheduler_stats("host:1", [
+        {"name": "check_jobs", "count": 3, "errors": 1, "total_seconds": 0.3,
+         "max_seconds": 0.2, "value": None, "heartbeat": 1700000000.0},
+        {"name": "pending_jobs", "count": 0, "errors": 0, "total_seconds": 0.0,
+         "max_seconds": 0.0, "value": 4, "heartbeat": None},
+    ])
+    stats = {s["name"]: s for s in db.get_scheduler_stats()}
+    assert stats["check_jobs"]["count"] == 3
+    assert stats["check_jobs"]["worker"] == "host:1"
+    assert stats["check_jobs"]["heartbeat_at"] == "2023-11-14 22:13:20"
+    assert stats["pending_jobs"]["value"] == 4
+    assert stats["pending_jobs"]["heartbeat_at"] is None
+
+
+def test_record_scheduler_stats_prunes_old_rows(db):
+    db.execute(
+        """INSERT INTO scheduler_stats (worker, name, recorded_at)
+           VALUES ('w', 'old', datetime('now', '-2 days'))"""
+    )
+    db.conn.commit()
+    db.record_scheduler_stats("w", [], keep_hours=24)
+    assert db.execute("SELECT COUNT(*) FROM scheduler_stats").fetchone()[0] == 0
+
+
 # ── Facebook Groups ────────────────────────────────────────────
 
 def test_upsert_fb_group(db, user_id):
@@ -552,6 +992,20 @@ def test_insert_fb_comment(db, user_id):
     assert comments[0]["author_name"] == "Jane"
 
 
+def test_insert_fb_comments(db, user_id):
+    db.upsert_fb_group(user_id, "123", "Test Group", "https://facebook.com/groups/123")
+    db.insert_fb_post(
+        id="fb_post_1", group_id="123", author_name="John",
+        content="Hello", timestamp="2026-01-15T10:00:00",
+        permalink="", comment_count=2,
+    )
+    db.insert_fb_comments("fb_post_1", [
+        {"author_name": "Jane", "content": "First", "timestamp": "2026-01-15T11:00:00", "order": 0},
+        {"author_name": "Bob", "content": "Second", "timestamp": "2026-01-15T12:00:00", "order": 1},
+    ])
+    assert [c["author_name"] for c in db.get_comments_for_post("fb_post_1")] == ["Jane", "Bob"]
+
+
 def test_get_new_fb_posts_since(db, user_id, user_id_2):
     db.upsert_fb_group(user_id, "123", "Group", "https://facebook.com/groups/123")
     db.upsert_fb_group(user_id_2, "456", "Other Group", "https://facebook.com/groups/456")
@@ -613,6 +1067,60 @@ def test_get_unified_feed_filter_platform(db, user_id):
     assert ig_only[0]["platform"] == "instagram"
 
 
+def test_get_unified_feed_includes_posts_without_timestamp(db, user_id):
+    assert db.insert_post(
+        user_id=user_id, id="ig_1", username="iguser", post_type="post",
+        caption="", timestamp=None, permalink="",
+    )
+    db.upsert_fb_group(user_id, "123", "Group", "https://facebook.com/groups/123")
+    assert db.insert_fb_post(
+        id="fb_1", group_id="123", author_name="John",
+        content="", timestamp=None, permalink="", comment_count=0,
+    )
+    assert not db.insert_post(
+        user_id=user_id, id="ig_1", username="iguser", post_type="post",
+        caption="", timestamp=None, permalink="",
+    )
+    assert sorted(item["id"] for item in db.get_unified_feed(user_id)) == ["fb_1", "ig_1"]
+
+
+def test_insert_post_raises_on_non_duplicate_constraint_errors(db, user_id):
+    with pytest.raises(sqlite3.IntegrityError):
+        db.insert_post(
+            user_id=user_id, id="ig_1", username=None, post_type="post",
+            caption="", timestamp="2026-01-15T12:00:00", permalink="",
+        )
+
+
+def test_get_unified_feed_source_filters_keep_their_platform(db, user_id):
+    db.upsert_account(user_id, "iguser", None)
+    db.upsert_account(user_id, "other", None)
+    for post_id, username in [("ig_1", "iguser"), ("ig_2", "other")]:
+        db.insert_post(
+            user_id=user_id, id=post_id, username=username, post_type="post",
+            caption="", timestamp="2026-01-15T12:00:00", permalink="",
+        )
+    db.upsert_fb_group(user_id, "123", "Group", "https://facebook.com/groups/123")
+    db.upsert_fb_group(user_id, "456", "Other Group", "https://facebook.com/groups/456")
+    for post_id, group_id in [("fb_1", "123"), ("fb_2", "456")]:
+        db.insert_fb_post(
+            id=post_id, group_id=group_id, author_name="John",
+            content="", timestamp="2026-01-15T14:00:00",
+            permalink="", comment_count=0,
+        )
+
+    def ids(**filters):
+        return sorted(item["id"] for item in db.get_unified_feed(user_id, limit=10, **filters))
+
+    assert ids(account="iguser") == ["fb_1", "fb_2", "ig_1"]
+    assert ids(group_id="123") == ["fb_1", "ig_1", "ig_2"]
+    assert ids(account="iguser", group_id="123") == ["fb_1", "ig_1"]
+    assert ids(platform="facebook", account="iguser") == ["fb_1", "fb_2"]
+    assert ids(platform="instagram", group_id="123") == ["ig_1", "ig_2"]
+    assert ids(platform="instagram", account="iguser") == ["ig_1"]
+    assert ids(platform="facebook", group_id="123") == ["fb_1"]
+
+
 def test_get_unified_feed_filter_type(db, user_id):
     db.upsert_account(user_id, "iguser", None)
     db.insert_post(
@@ -645,6 +1153,369 @@ def test_get_unified_feed_scoped_to_user(db, user_id, user_id_2):
     assert len(db.get_unified_feed(user_id_2, limit=10)) == 1
 
 
+def test_hydrate_feed_attaches_media_and_comments(db, user_id):
+    db.insert_post(
+        user_id=user_id, id="ig_1", username="iguser", post_type="post",
+        caption="", timestamp="2026-01-15T12:00:00", permalink="",
+    )
+    db.insert_media("ig_1", "image", "iguser/ig_1/0.jpg", None, 0)
+    db.upsert_fb_group(user_id, "123", "Group", "https://facebook.com/groups/123")
+    db.insert_fb_post("fb_1", "123", "John", "", "2026-01-15T14:00:00", "", 1)
+    db.insert_fb_comment("fb_1", "Jane", "Hi", "2026-01-15T15:00:00", 0)
+    feed = db.hydrate_feed(db.get_unified_feed(user_id))
+    assert [c["author_name"] for c in feed[0]["comments"]] == ["Jane"]
+    assert "media" not in feed[0]
+    assert [m["file_path"] for m in feed[1]["media"]] == ["iguser/ig_1/0.jpg"]
+    assert "comments" not in feed[1]
+
+
+def test_get_unified_feed_filter_account_and_group(db, user_id):
+    db.insert_post(
+        user_id=user_id, id="ig_1", username="iguser", post_type="post",
+        caption="", timestamp="2026-01-15T12:00:00", permalink="",
+    )
+    db.insert_post(
+        user_id=user_id, id="ig_2", username="other", post_type="post",
+        caption="", timestamp="2026-01-15T13:00:00", permalink="",
+    )
+    db.upsert_fb_group(user_id, "123", "Group", "https://facebook.com/groups/123")
+    db.upsert_fb_group(user_id, "456", "Other", "https://facebook.com/groups/456")
+    db.insert_fb_post("fb_1", "123", "John", "", "2026-01-15T14:00:00", "", 0)
+    db.insert_fb_post("fb_2", "456", "John", "", "2026-01-15T15:00:00", "", 0)
+    assert [p["id"] for p in db.get_unified_feed(user_id, platform="instagram", account="iguser")] == ["ig_1"]
+    assert [p["id"] for p in db.get_unified_feed(user_id, platform="facebook", group_id="123")] == ["fb_1"]
+
+
+def test_feed_items_follow_fb_group_changes(db, user_id, user_id_2):
+    db.upsert_fb_group(user_id, "123", "Group", "https://facebook.com/groups/123")
+    db.insert_fb_post("fb_1", "123", "John", "", "2026-01-15T14:00:00", "", 0)
+    # A second user joining the group sees its existing posts
+    db.upsert_fb_group(user_id_2, "123", "Group", "https://facebook.com/groups/123")
+    assert [p["id"] for p in db.get_unified_feed(user_id_2)] == ["fb_1"]
+    db.insert_fb_post("fb_2", "123", "John", "", "2026-01-15T15:00:00", "", 0)
+    assert [p["id"] for p in db.get_unified_feed(user_id)] == ["fb_2", "fb_1"]
+    assert [p["id"] for p in db.get_unified_feed(user_id_2)] == ["fb_2", "fb_1"]
+
+    db.upsert_fb_group(user_id, "123", "Renamed", "https://facebook.com/groups/123")
+    assert {p["source_name"] for p in db.get_unified_feed(user_id)} == {"Renamed"}
+    assert {p["source_name"] for p in db.get_unified_feed(user_id_2)} == {"Group"}
+
+    db.delete_fb_group(user_id, "123")
+    assert db.get_unified_feed(user_id) == []
+    assert len(db.get_unified_feed(user_id_2)) == 2
+    db.delete_fb_group(user_id_2, "123")
+    assert db.execute("SELECT COUNT(*) FROM feed_items").fetchone()[0] == 0
+
+
+def test_rebuild_feed_items(db, user_id, user_id_2):
+    db.insert_post(
+        user_id=user_id, id="ig_1", username="iguser", post_type="post",
+        caption="", timestamp="2026-01-15T12:00:00", permalink="",
+    )
+    db.insert_post(
+        user_id=user_id_2, id="ig_2", username="other", post_type="post",
+        caption="", timestamp="2026-01-15T12:00:00", permalink="",
+    )
+    db.upsert_fb_group(user_id, "123", "Group", "https://facebook.com/groups/123")
+    db.insert_fb_post("fb_1", "123", "John", "", "2026-01-15T14:00:00", "", 0)
+    before = db.get_unified_feed(user_id)
+    db.execute("DELETE FROM feed_items")
+    db.conn.commit()
+
+    assert db.rebuild_feed_items(user_id) == 2
+    assert db.get_unified_feed(user_id) == before
+    assert db.get_unified_feed(user_id_2) == []
+    assert db.rebuild_feed_items() == 3
+
+
+def test_get_unified_feed_cursor_matches_offset(db, user_id):
+    db.upsert_account(user_id, "iguser", None)
+    db.upsert_fb_group(user_id, "123", "Group", "https://facebook.com/groups/123")
+    for i in range(6):
+        # Two timestamps shared by both platforms, so pages split inside ties
+        timestamp = f"2026-01-0{1 + i % 2}T00:00:00"
+        db.insert_post(
+            user_id=user_id, id=f"ig_{i}", username="iguser", post_type="post",
+            caption="", timestamp=timestamp, permalink="",
+        )
+        db.insert_fb_post(
+            id=f"fb_{i}", group_id="123", author_name="John",
+            content="", timestamp=timestamp, permalink="", comment_count=0,
+        )
+    expected = [p["id"] for p in db.get_unified_feed(user_id, limit=100)]
+    seen, cursor = [], None
+    while page := db.get_unified_feed(user_id, limit=5, cursor=cursor):
+        seen.extend(p["id"] for p in page)
+        cursor = encode_feed_cursor(page[-1])
+    assert seen == expected
+    assert len(seen) == 12
+
+
+def test_feed_cursor_round_trip():
+    item = {"timestamp": "2026-01-15T12:00:00", "platform": "facebook", "id": "fb_1"}
+    assert decode_feed_cursor(encode_feed_cursor(item)) == ("2026-01-15T12:00:00", "facebook", "fb_1")
+
+
+def test_feed_cursor_rejects_garbage(db, user_id):
+    with pytest.raises(ValueError):
+        decode_feed_cursor("not a cursor")
+    with pytest.raises(ValueError):
+        db.get_unified_feed(user_id, cursor="WzEsMiwzXQ")  # [1,2,3]
+
+
+# ── Search ─────────────────────────────────────────────────────
+
+def _seed_search(db, user_id, user_id_2):
+    db.insert_post(user_id, "ig_1", "cafeowner", "post", "Sommerfest i haven på café Nord",
+                   "2026-01-01T00:00:00", "")
+    db.insert_post(user_id_2, "ig_2", "other", "post", "Sommerfest for someone else",
+                   "2026-01-01T00:00:00", "")
+    db.upsert_fb_group(user_id, "123", "Neighbours", "")
+    db.insert_fb_post("fb_1", "123", "John", "Who is going to the sommerfest?", "2026-01-02T00:00:00", "", 0)
+    db.insert_fb_post("fb_2", "456", "Jane", "Sommerfest in a group we don't follow", "2026-01-02T00:00:00", "", 0)
+    return db.insert_newsletter_email(user_id, "m1", "news@example.com", "me@example.com",
+                                      "Weekend plans", "The sommerfest starts at noon", "<p>html</p>",
+                                      from_name="Local News")
+
+
+def test_search_covers_all_platforms_for_user(db, user_id, user_id_2):
+    email_id = _seed_search(db, user_id, user_id_2)
+    hits = db.search(user_id, "sommerfest")
+    assert sorted((h["platform"], h["id"]) for h in hits) == [
+        ("facebook", "fb_1"), ("instagram", "ig_1"), ("newsletter", email_id),
+    ]
+    assert [h["rank"] for h in hits] == sorted(h["rank"] for h in hits)
+    newsletter = next(h for h in hits if h["platform"] == "newsletter")
+    assert newsletter["title"] == "Weekend plans"
+    assert newsletter["source_name"] == "Local News"
+    assert next(h for h in hits if h["platform"] == "facebook")["source_name"] == "Neighbours"
+
+
+def test_search_snippet_marks_matches(db, user_id, user_id_2):
+    _seed_search(db, user_id, user_id_2)
+    [hit] = db.search(user_id, "cafe", platform="instagram")
+    assert hit["id"] == "ig_1"
+    assert "<mark>café</mark>" in hit["snippet"]
+
+
+def test_search_matches_prefix_of_last_word(db, user_id, user_id_2):
+    _seed_search(db, user_id, user_id_2)
+    assert [h["id"] for h in db.search(user_id, "sommerf", platform="facebook")] == ["fb_1"]
+    assert db.search(user_id, "nord sommerf", platform="facebook") == []
+
+
+def test_search_treats_query_syntax_literally(db, user_id, user_id_2):
+    _seed_search(db, user_id, user_id_2)
+    assert db.search(user_id, 'sommerfest" OR NEAR(') == []
+    assert db.search(user_id, "   ") == []
+
+
+def test_search_rejects_unknown_platform(db, user_id):
+    with pytest.raises(ValueError):
+        db.search(user_id, "x", platform="myspace")
+
+
+def test_search_excludes_confirmation_emails(db, user_id):
+    email_id = db.insert_newsletter_email(user_id, "m1", "news@example.com", "me@example.com",
+                                          "Confirm your subscription", "Click to confirm", "")
+    db.mark_email_as_confirmation(email_id)
+    assert db.search(user_id, "confirm") == []
+
+
+def test_search_cursor_pages_through_all_hits(db, user_id):
+    db.upsert_fb_group(user_id, "123", "Group", "")
+    for i in range(7):
+        db.insert_post(user_id, f"ig_{i}", "acct", "post", "harbour " * (i + 1), f"2026-01-0{i + 1}", "")
+        db.insert_fb_post(f"fb_{i}", "123", "John", "harbour walk", f"2026-01-0{i + 1}", "", 0)
+    expected = [(h["platform"], h["id"]) for h in db.search(user_id, "harbour", limit=100)]
+    seen, cursor = [], None
+    while page := db.search(user_id, "harbour", limit=4, cursor=cursor):
+        seen.extend((h["platform"], h["id"]) for h in page)
+        cursor = encode_search_cursor(page[-1])
+    assert seen == expected
+    assert len(seen) == 14
+
+
+def test_search_cursor_round_trip():
+    hit = {"rank": -1.25e-06, "platform": "instagram", "rowid": 42}
+    assert decode_search_cursor(encode_search_cursor(hit)) == (-1.25e-06, "instagram", 42)
+    with pytest.raises(ValueError):
+        decode_search_cursor("not-a-cursor")
+    with pytest.raises(ValueError):
+        decode_search_cursor(encode_feed_cursor({"timestamp": "t", "platform": "p", "id": "i"}))
+
+
+def test_search_index_follows_updates_and_deletes(db, user_id):
+    db.upsert_fb_group(user_id, "123", "Group", "")
+    db.insert_fb_post("fb_1", "123", "John", "old words", "2026-01-01", "", 0)
+    db.execute("UPDATE fb_posts SET content = 'new words' WHERE id = 'fb_1'")
+    db.conn.commit()
+    assert db.search(user_id, "old") == []
+    assert [h["id"] for h in db.search(user_id, "new")] == ["fb_1"]
+    db.execute("DELETE FROM fb_posts WHERE id = 'fb_1'")
+    db.conn.commit()
+    assert db.search(user_id, "words") == []
+
+
+def test_rebuild_search_index(db, user_id, user_id_2):
+    _seed_search(db, user_id, user_id_2)
+    before = db.search(user_id, "sommerfest")
+    db.execute("INSERT INTO posts_fts(posts_fts) VALUES ('delete-all')")
+    db.conn.commit()
+    assert all(h["platform"] != "instagram" for h in db.search(user_id, "sommerfest"))
+
+    assert db.rebuild_search_index() == {"posts": 2, "fb_posts": 2, "newsletter_emails": 1}
+    assert db.search(user_id, "sommerfest") == before
+
+
+# ── Newsletter Compression ─────────────────────────────────────
+
+BIG_HTML = "<p>" + "Lots of newsletter markup. " * 200 + "</p>"
+
+
+def _stored(db, table, column, row_id):
+    return db.execute(f"SELECT {column} FROM {table} WHERE id=?", (row_id,)).fetchone()[0]
+
+
+def test_compress_text_round_trip():
+    packed = compress_text(BIG_HTML)
+    assert isinstance(packed, bytes) and len(packed) < len(BIG_HTML)
+    assert decompress_text(packed) == BIG_HTML
+    assert compress_text("short") == "short"
+    assert decompress_text("plain") == "plain"
+    assert compress_text(None) is None and decompress_text(None) is None
+
+
+def test_newsletter_body_html_stored_compressed(db, user_id):
+    email_id = db.insert_newsletter_email(user_id, "m1", "news@example.com", "me@example.com",
+                                          "Subject", "plain text body", BIG_HTML)
+    assert isinstance(_stored(db, "newsletter_emails", "body_html", email_id), bytes)
+    assert _stored(db, "newsletter_emails", "body_text", email_id) == "plain text body"
+    [email] = db.get_unclassified_emails(user_id)
+    assert email["body_html"] == BIG_HTML
+    assert email.get("body_html") == BIG_HTML
+
+
+def test_uncompressed_rows_still_read(db, user_id):
+    email_id = db.insert_newsletter_email(user_id, "m1", "news@example.com", "me@example.com",
+                                          "Subject", "text", "")
+    db.execute("UPDATE newsletter_emails SET body_html=? WHERE id=?", (BIG_HTML, email_id))
+    db.conn.commit()
+    assert db.get_unclassified_emails(user_id)[0]["body_html"] == BIG_HTML
+
+
+def test_digest_html_stored_compressed(db, user_id):
+    run_id = db.insert_newsletter_digest_run(user_id, "2026-01-01")
+    db.save_digest_html(run_id, BIG_HTML)
+    db.finish_newsletter_digest_run(run_id, "success")
+    assert isinstance(_stored(db, "newsletter_digest_runs", "digest_html", run_id), bytes)
+    assert db.get_recent_digest_html(user_id)[0]["digest_html"] == BIG_HTML
+    assert db.get_digest_runs(user_id)[0]["digest_html"] == BIG_HTML
+
+
+def test_lazy_row_decompresses_on_access():
+    row = LazyRow({"id": 1, "body_html": compress_text(BIG_HTML)})
+    assert isinstance(dict.__getitem__(row, "body_html"), bytes)
+    assert row["body_html"] == BIG_HTML
+    assert dict.__getitem__(row, "body_html") == BIG_HTML
+    assert dict(LazyRow({"body_html": compress_text(BIG_HTML)}).items())["body_html"] == BIG_HTML
+
+
+def test_recompress_text_columns(db, user_id):
+    email_id = db.insert_newsletter_email(user_id, "m1", "news@example.com", "me@example.com",
+                                          "Subject", "text", "")
+    run_id = db.insert_newsletter_digest_run(user_id, "2026-01-01")
+    db.execute("UPDATE newsletter_emails SET body_html=? WHERE id=?", (BIG_HTML, email_id))
+    db.execute("UPDATE newsletter_digest_runs SET digest_html=? WHERE id=?", (BIG_HTML, run_id))
+    db.conn.commit()
+    assert db.compression_stats()["newsletter_emails.body_html"]["compressed"] == 0
+
+    result = db.recompress_text_columns(batch_size=1)
+
+    assert result["rows"] == 2
+    assert result["bytes_before"] == 2 * len(BIG_HTML)
+    assert result["bytes_after"] < result["bytes_before"] / 10
+    stats = db.compression_stats()
+    assert stats["newsletter_emails.body_html"] == {
+        "rows": 1, "compressed": 1,
+        "stored_bytes": len(_stored(db, "newsletter_emails", "body_html", email_id)),
+    }
+    assert stats["newsletter_digest_runs.digest_html"]["compressed"] == 1
+    assert db.get_unclassified_emails(user_id)[0]["body_html"] == BIG_HTML
+    assert db.recompress_text_columns()["rows"] == 0
+
+
+# ── Compact Rows & Streaming ───────────────────────────────────
+
+def test_compact_row_reads_like_a_dict():
+    row = MediaRow(1, "p1", "image", "a/p1/0.jpg", None, 0)
+    assert row["file_path"] == row.file_path == "a/p1/0.jpg"
+    assert row.get("thumbnail_path", "x") is None and row.get("missing", "x") == "x"
+    assert "order" in row and dict(row)["order"] == 0
+    assert row == {"id": 1, "post_id": "p1", "media_type": "image", "file_path": "a/p1/0.jpg",
+                   "thumbnail_path": None, "order": 0}
+    with pytest.raises(KeyError):
+        row["missing"]
+    assert not hasattr(row, "__dict__")
+
+
+def test_iter_posts_streams_in_batches(db, user_id, user_id_2):
+    for i in range(7):
+        db.insert_post(user_id, f"p{i}", "acct", "post", f"caption {i}", f"2026-01-0{i + 1}", "")
+    db.insert_post(user_id_2, "other", "acct", "post", "", "2026-01-01", "")
+    db.execute("UPDATE posts SET created_at = '2026-01-01 00:00:00' WHERE id IN ('p0', 'p1')")
+    db.conn.commit()
+
+    posts = list(db.iter_posts(user_id, batch_size=3))
+
+    assert all(isinstance(post, PostRow) for post in posts)
+    assert [post["id"] for post in posts] == [f"p{i}" for i in range(7)]
+    assert posts[3] == db.get_post("p3")
+    assert [post.id for post in db.iter_posts(user_id, since="2026-01-01 00:00:00", batch_size=2)] == \
+        [f"p{i}" for i in range(2, 7)]
+
+
+def test_iter_media_and_fb_posts(db, user_id):
+    for i in range(3):
+        db.insert_post(user_id, f"p{i}", "acct", "post", "", "2026-01-01", "")
+        db.insert_media_many(f"p{i}", [{"media_type": "image", "file_path": f"acct/p{i}/{m}.jpg", "order": m}
+                                       for m in range(2)])
+    grouped = db.get_media_for_posts(["p0", "p1", "p2"])
+    assert list(db.iter_media(["p2", "p0", "p1"], batch_size=2)) == grouped["p0"] + grouped["p2"] + grouped["p1"]
+
+    db.upsert_fb_group(user_id, "g1", "Group", "")
+    db.upsert_fb_group(user_id, "g2", "Group 2", "")
+    for i in range(3):
+        db.insert_fb_post(f"fb{i}", f"g{i % 2 + 1}", "Author", "content", "2026-01-01", "", 0)
+    assert [post.id for post in db.iter_fb_posts(user_id, batch_size=1)] == ["fb0", "fb2", "fb1"]
+
+
+def test_iter_undigested_emails_survives_updates_while_streaming(db, user_id):
+    ids = [db.insert_newsletter_email(user_id, f"m{i}", "news@example.com", "me@example.com",
+                                      f"Subject {i}", "text", BIG_HTML) for i in range(5)]
+    for email_id in ids:
+        db.mark_email_processed(email_id)
+
+    seen = []
+    for email in db.iter_undigested_emails(user_id, batch_size=2):
+        assert isinstance(email._body_html, bytes)
+        assert email["body_html"] == BIG_HTML
+        db.mark_emails_digested([email.id], "2026-01-01")
+        seen.append(email.id)
+
+    assert seen == ids
+    assert db.get_undigested_emails(user_id) == []
+    assert list(db.iter_undigested_emails(user_id)) == []
+
+
+def test_iter_unsummarized_emails_matches_list(db, user_id):
+    email_id = db.insert_newsletter_email(user_id, "m1", "news@example.com", "me@example.com",
+                                          "Subject", "text", BIG_HTML)
+    db.mark_email_processed(email_id)
+    [row] = db.iter_unsummarized_emails(user_id)
+    assert row == db.get_unsummarized_emails(user_id)[0]
+
+
 # ── Delete Accounts Not In ─────────────────────────────────────
 
 def test_delete_accounts_not_in(db, user_id):
@@ -668,3 +1539,147 @@ def test_delete_accounts_not_in_keeps_with_posts(db, user_id):
     usernames = [a["username"] for a in accounts]
     assert "has_posts" in usernames
     assert "no_posts" not in usernames
+
+
+# ── Transactions ───────────────────────────────────────────────
+
+def _other_connection_posts(db) -> int:
+    other = Database(db.db_path)
+    try:
+        return other.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+    finally:
+        other.close()
+
+
+def test_transaction_commits_once_on_exit(db, user_id):
+    with db.transaction():
+        for i in range(3):
+            db.insert_post(
+                user_id=user_id, id=f"p{i}", username="u", post_type="post",
+                caption="", timestamp="2026-01-01T00:00:00", permalink="",
+            )
+        assert _other_connection_posts(db) == 0
+    assert _other_connection_posts(db) == 3
+
+
+def test_transaction_rolls_back_on_error(db, user_id):
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            db.insert_post(
+                user_id=user_id, id="p1", username="u", post_type="post",
+                caption="", timestamp="2026-01-01T00:00:00", permalink="",
+            )
+            db.insert_media("p1", "image", "u/p1/0.jpg", None, 0)
+            raise RuntimeError("crash between writes")
+    assert db.get_post("p1") is None
+    assert db.get_media_for_post("p1") == []
+    # Writes after the failed block commit normally again
+    db.insert_post(
+        user_id=user_id, id="p2", username="u", post_type="post",
+        caption="", timestamp="2026-01-01T00:00:00", permalink="",
+    )
+    assert _other_connection_posts(db) == 1
+
+
+def test_nested_transaction_failure_keeps_outer_writes(db, user_id):
+    with db.transaction():
+        db.insert_post(
+            user_id=user_id, id="p1", username="u", post_type="post",
+            caption="", timestamp="2026-01-01T00:00:00", permalink="",
+        )
+        with pytest.raises(RuntimeError):
+            with db.transaction():
+                db.insert_post(
+                    user_id=user_id, id="p2", username="u", post_type="post",
+                    caption="", timestamp="2026-01-01T00:00:00", permalink="",
+                )
+                raise RuntimeError("inner failure")
+    assert db.get_post("p1") is not None
+    assert db.get_post("p2") is None
+    assert _other_connection_posts(db) == 1
+
+
+# ── Reader ─────────────────────────────────────────────────────
+
+def test_reader_is_a_separate_read_only_connection(db, user_id):
+    reader = db.reader()
+    assert reader is db.reader() and reader.reader() is reader
+    assert reader.conn is not db.conn
+    pragma = lambda name: reader.execute(f"PRAGMA {name}").fetchone()[0]
+    assert pragma("query_only") == 1
+    assert pragma("cache_size") == -db.profile.reader_cache_size_kb
+    with pytest.raises(sqlite3.OperationalError):
+        reader.insert_user("ro@example.com", "pw")
+    assert db.get_user_by_email("ro@example.com") is None
+
+
+def test_reader_reads_committed_data_while_writer_holds_the_lock(db, user_id):
+    db.insert_post(
+        user_id=user_id, id="p1", username="u", post_type="post",
+        caption="", timestamp="2026-01-01T00:00:00", permalink="",
+    )
+    with db.transaction():
+        db.insert_post(
+            user_id=user_id, id="p2", username="u", post_type="post",
+            caption="", timestamp="2026-01-01T00:00:01", permalink="",
+        )
+        assert [item["id"] for item in db.reader().get_unified_feed(user_id)] == ["p1"]
+    assert [item["id"] for item in db.reader().get_unified_feed(user_id)] == ["p2", "p1"]
+
+
+def test_reader_decompresses_and_closes_with_its_writer(db, user_id):
+    run_id = db.insert_newsletter_digest_run(user_id, "2026-01-01")
+    html = "<p>digest</p>" * 500
+    db.save_digest_html(run_id, html)
+    db.finish_newsletter_digest_run(run_id, "success")
+    reader = db.reader()
+    assert [row["digest_html"] for row in reader.get_recent_digest_html(user_id)] == [html]
+    db.close()
+    assert reader._conn is None
+
+
+# ── Connection Manager ─────────────────────────────────────────
+
+def test_get_database_reuses_handle_per_thread(tmp_path):
+    import threading
+    from src.db import get_database
+
+    path = str(tmp_path / "managed.db")
+    db = get_database(path)
+    assert get_database(path) is db
+    # Schema was created on first use
+    assert db.execute("SELECT name FROM sqlite_master WHERE name='users'").fetchone()
+
+    other = []
+    t = threading.Thread(target=lambda: other.append(get_database(path)))
+    t.start()
+    t.join()
+    assert other[0] is not db
+
+
+def test_connection_manager_initializes_schema_once(tmp_path, monkeypatch):
+    import threading
+    from src.db import ConnectionManager
+
+    calls = []
+    original = Database.initialize
+    monkeypatch.setattr(Database, "initialize", lambda self: calls.append(1) or original(self))
+    manager = ConnectionManager(str(tmp_path / "managed.db"))
+    threads = [threading.Thread(target=manager.get) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    manager.get()
+    assert calls == [1]
+    manager.close_all()
+
+
+def test_closed_handle_reconnects(tmp_path):
+    from src.db import get_database, close_databases
+
+    path = str(tmp_path / "managed.db")
+    db = get_database(path)
+    uid = db.insert_user("a@example.com", "pw")
+    close_databases()
+    assert get_database(path).get_user_by_id(uid)["email"] == "a@example.com"
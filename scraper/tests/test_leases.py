@@ -0,0 +1,65 @@
+import os
+import tempfile
+
+import pytest
+
+from src.db import Database
+from src.leases import UserLeases
+
+
+@pytest.fixture
+def db():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        database = Database(os.path.join(tmpdir, "test.db"))
+        database.initialize()
+        for i in range(4):
+            database.insert_user(f"user{i}@example.com", "pw")
+        yield database
+        database.close()
+
+
+def test_single_replica_owns_everyone(db):
+    leases = UserLeases("w1")
+    assert leases.rebalance(db)
+    assert leases.owned() == set(db.get_active_user_ids())
+    assert not leases.rebalance(db)
+
+
+def test_users_split_between_replicas(db):
+    a, b = UserLeases("a"), UserLeases("b")
+    a.rebalance(db)
+    b.rebalance(db)  # b registers but everything is still leased by a
+    assert b.owned() == set()
+
+    a.rebalance(db)  # a sees two replicas and hands back half
+    b.rebalance(db)
+    assert len(a.owned()) == 2
+    assert len(b.owned()) == 2
+    assert a.owned().isdisjoint(b.owned())
+
+
+def test_busy_users_are_not_handed_back(db):
+    a, b = UserLeases("a"), UserLeases("b")
+    a.rebalance(db)
+    b.rebalance(db)
+    everyone = set(db.get_active_user_ids())
+    a.rebalance(db, busy=everyone)
+    assert a.owned() == everyone
+
+
+def test_released_users_are_taken_over(db):
+    a, b = UserLeases("a"), UserLeases("b")
+    a.rebalance(db)
+    b.rebalance(db)
+    a.release_all(db)
+    b.rebalance(db)
+    assert b.owned() == set(db.get_active_user_ids())
+
+
+def test_deactivated_users_are_dropped(db):
+    leases = UserLeases("w1")
+    leases.rebalance(db)
+    user_id = min(leases.owned())
+    db.deactivate_user(user_id)
+    leases.rebalance(db)
+    assert user_id not in leases.owned()
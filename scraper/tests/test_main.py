@@ -0,0 +1,71 @@
+import logging
+import threading
+
+from src import pacing
+
+from src.main import CookieTestLogHandler, DbLogHandler
+
+
+def _logger(handler: logging.Handler) -> logging.Logger:
+    log = logging.getLogger(f"test_main.{id(handler)}")
+    log.setLevel(logging.INFO)
+    log.propagate = False
+    log.addHandler(handler)
+    return log
+
+
+def test_db_log_handler_flushes_in_batches():
+    batches = []
+    handler = DbLogHandler(batches.append, capacity=3, flush_seconds=3600)
+    log = _logger(handler)
+    for i in range(4):
+        log.info(f"line {i}")
+    assert [[message for _, _, message in batch] for batch in batches] == [["line 0", "line 1", "line 2"]]
+    handler.close()
+    assert [message for _, _, message in batches[1]] == ["line 3"]
+    assert batches[1][0][1] == "INFO"
+
+
+def test_db_log_handler_flushes_warnings_immediately():
+    batches = []
+    handler = DbLogHandler(batches.append, capacity=100, flush_seconds=3600)
+    log = _logger(handler)
+    log.info("starting")
+    log.warning("rate limited")
+    assert [(level, message) for _, level, message in batches[0]] == [("INFO", "starting"), ("WARNING", "rate limited")]
+
+
+def test_db_log_handler_ignores_other_threads():
+    batches = []
+    handler = DbLogHandler(batches.append, capacity=1)
+    log = _logger(handler)
+    thread = threading.Thread(target=lambda: log.info("from another run"))
+    thread.start()
+    thread.join()
+    log.info("mine")
+    assert [message for batch in batches for _, _, message in batch] == ["mine"]
+
+
+def test_cookie_test_log_handler_ignores_other_threads():
+    lines = []
+    log = _logger(CookieTestLogHandler(lines.append))
+    thread = threading.Thread(target=lambda: log.info("another user's account"))
+    thread.start()
+    thread.join()
+    log.info("rate limited")
+    assert lines == ["rate limited"]
+
+
+def test_db_log_handler_flushes_before_a_long_pause(monkeypatch):
+    monkeypatch.setattr(pacing.time, "sleep", lambda seconds: None)
+    batches = []
+    handler = DbLogHandler(batches.append, capacity=100, flush_seconds=2)
+    log = _logger(handler)
+    log.info("fetching feed")
+    pacing.pace(0.5)
+    assert batches == []
+    pacing.pace(30)
+    assert [message for _, _, message in batches[0]] == ["fetching feed"]
+    handler.close()
+    # A closed handler no longer hooks pace()
+    assert handler._before_pause not in pacing._pause_hooks.get(threading.get_ident(), [])
@@ -0,0 +1,65 @@
+import urllib.request
+
+import pytest
+
+from src.metrics import Histogram, MetricsServer, SchedulerMetrics
+
+
+def test_histogram_buckets_are_cumulative():
+    hist = Histogram(buckets=(1, 5, 10))
+    for value in (0.5, 3, 7, 20):
+        hist.observe(value)
+    assert hist.counts == [1, 2, 3]
+    assert hist.count == 4
+    assert hist.sum == 30.5
+
+
+def test_render_prometheus_text():
+    m = SchedulerMetrics()
+    m.observe_job("check_jobs", 0.02)
+    m.observe_job("check_jobs", 2, ok=False)
+    m.observe_cron_lag(12.5)
+    m.set_gauge("pending_jobs", 3)
+
+    text = m.render()
+    assert 'scheduler_job_duration_seconds_count{job="check_jobs"} 2' in text
+    assert 'scheduler_job_duration_seconds_bucket{job="check_jobs",le="0.05"} 1' in text
+    assert 'scheduler_job_duration_seconds_bucket{job="check_jobs",le="+Inf"} 2' in text
+    assert 'scheduler_job_errors_total{job="check_jobs"} 1' in text
+    assert "scheduler_cron_lag_seconds_sum 12.5" in text
+    assert "scheduler_pending_jobs 3" in text
+    assert 'scheduler_heartbeat_timestamp_seconds{job="check_jobs"}' in text
+
+
+def test_drain_returns_interval_aggregates_and_resets():
+    m = SchedulerMetrics()
+    m.observe_job("check_jobs", 1.0)
+    m.observe_job("check_jobs", 3.0, ok=False)
+    m.set_gauge("pending_jobs", 2)
+
+    rows = {r["name"]: r for r in m.drain()}
+    assert rows["check_jobs"]["count"] == 2
+    assert rows["check_jobs"]["errors"] == 1
+    assert rows["check_jobs"]["total_seconds"] == 4.0
+    assert rows["check_jobs"]["max_seconds"] == 3.0
+    assert rows["check_jobs"]["heartbeat"] is not None
+    assert rows["pending_jobs"]["value"] == 2
+
+    # Interval counters reset, gauges and cumulative histograms don't
+    assert [r["name"] for r in m.drain()] == ["pending_jobs"]
+    assert 'scheduler_job_duration_seconds_count{job="check_jobs"} 2' in m.render()
+
+
+def test_metrics_server_serves_registry():
+    m = SchedulerMetrics()
+    m.set_gauge("pending_jobs", 1)
+    server = MetricsServer(m, port=0)
+    server.start()
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics") as resp:
+            assert resp.status == 200
+            assert "scheduler_pending_jobs 1" in resp.read().decode()
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"http://127.0.0.1:{server.port}/other")
+    finally:
+        server.stop()
@@ -0,0 +1,154 @@
+import sqlite3
+
+import pytest
+
+from src.db import Database
+from src.migrations import MIGRATIONS, _execute_script, migrate, schema_version
+
+
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def test_initialize_brings_fresh_db_to_latest(tmp_path):
+    db = Database(str(tmp_path / "test.db"))
+    db.initialize()
+    assert schema_version(db.conn) == MIGRATIONS[-1][0]
+    assert "following" in _columns(db.conn, "accounts")
+    assert {"summary", "from_name"} <= _columns(db.conn, "newsletter_emails")
+    assert {"subject", "schedule_name", "digest_html"} <= _columns(db.conn, "newsletter_digest_runs")
+    db.close()
+
+
+def test_initialize_is_idempotent(tmp_path):
+    path = str(tmp_path / "test.db")
+    for _ in range(2):
+        db = Database(path)
+        db.initialize()
+        db.close()
+    db = Database(path)
+    assert schema_version(db.conn) == MIGRATIONS[-1][0]
+    db.close()
+
+
+def test_migrates_db_with_some_columns_already_added(tmp_path):
+    """Databases touched by the old per-call ALTERs have a subset of the columns."""
+    path = str(tmp_path / "test.db")
+    db = Database(path)
+    db.initialize()
+    db.close()
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA user_version = 0")
+    conn.commit()
+    assert migrate(conn) == MIGRATIONS[-1][0]
+    conn.close()
+
+
+def test_failed_migration_rolls_back(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "test.db"))
+    conn.execute("CREATE TABLE t (a INTEGER)")
+    conn.commit()
+
+    def broken(c):
+        c.execute("ALTER TABLE t ADD COLUMN b TEXT")
+        raise RuntimeError("boom")
+
+    steps = [(1, "ok", lambda c: c.execute("ALTER TABLE t ADD COLUMN x TEXT")), (2, "broken", broken)]
+    with pytest.raises(RuntimeError):
+        migrate(conn, steps)
+    assert schema_version(conn) == 1
+    assert _columns(conn, "t") == {"a", "x"}
+    conn.close()
+
+
+def test_feed_items_migration_backfills_existing_rows(tmp_path):
+    path = str(tmp_path / "test.db")
+    db = Database(path)
+    db.initialize()
+    user_id = db.insert_user("a@example.com", "pw")
+    db.insert_post(user_id, "ig_1", "iguser", "post", "caption", "2026-01-01T00:00:00", "")
+    db.upsert_fb_group(user_id, "123", "Group", "")
+    db.insert_fb_post("fb_1", "123", "John", "content", "2026-01-02T00:00:00", "", 0)
+    # Roll back to before feed_items existed
+    db.conn.executescript("""
+        DROP TRIGGER feed_items_post_insert; DROP TRIGGER feed_items_post_delete;
+        DROP TRIGGER feed_items_fb_post_insert; DROP TRIGGER feed_items_fb_post_delete;
+        DROP TRIGGER feed_items_fb_group_insert; DROP TRIGGER feed_items_fb_group_rename;
+        DROP TRIGGER feed_items_fb_group_delete; DROP TABLE feed_items;
+        PRAGMA user_version = 3;
+    """)
+    db.close()
+
+    db = Database(path)
+    db.initialize()
+    assert [item["id"] for item in db.get_unified_feed(user_id)] == ["fb_1", "ig_1"]
+    db.close()
+
+
+def test_feed_items_rebuilt_without_not_null_timestamp(tmp_path):
+    path = str(tmp_path / "test.db")
+    db = Database(path)
+    db.initialize()
+    user_id = db.insert_user("a@example.com", "pw")
+    db.insert_post(user_id, "ig_1", "iguser", "post", "caption", None, "")
+    # Swap in feed_items as the first version of migration 4 created it
+    db.conn.executescript("""
+        DROP TABLE feed_items;
+        CREATE TABLE feed_items (
+            user_id INTEGER NOT NULL,
+            platform TEXT NOT NULL CHECK(platform IN ('instagram','facebook')),
+            item_id TEXT NOT NULL,
+            source_id TEXT NOT NULL,
+            source_name TEXT NOT NULL,
+            type TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            content TEXT,
+            permalink TEXT,
+            comment_count INTEGER,
+            PRIMARY KEY (platform, item_id, user_id)
+        );
+        PRAGMA user_version = 6;
+    """)
+    db.close()
+
+    db = Database(path)
+    db.initialize()
+    assert [item["id"] for item in db.get_unified_feed(user_id)] == ["ig_1"]
+    assert db.insert_post(user_id, "ig_2", "iguser", "post", "caption", None, "")
+    assert len(db.get_unified_feed(user_id)) == 2
+    db.close()
+
+
+def test_execute_script_keeps_trigger_bodies_whole(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "test.db"))
+    conn.execute("CREATE TABLE t (a INTEGER)")
+    conn.execute("CREATE TABLE log (a INTEGER)")
+    steps = [(1, "trigger", lambda c: _execute_script(c, """
+        CREATE TRIGGER t_insert AFTER INSERT ON t BEGIN
+            INSERT INTO log VALUES (NEW.a);
+            INSERT INTO log VALUES (NEW.a * 10);
+        END;
+        INSERT INTO t VALUES (1)
+    """))]
+    migrate(conn, steps)
+    assert [row[0] for row in conn.execute("SELECT a FROM log ORDER BY a")] == [1, 10]
+    conn.close()
+
+
+def test_search_index_migration_indexes_existing_rows(tmp_path):
+    path = str(tmp_path / "test.db")
+    db = Database(path)
+    db.initialize()
+    user_id = db.insert_user("a@example.com", "pw")
+    db.insert_post(user_id, "ig_1", "iguser", "post", "harbour sunset", "2026-01-01T00:00:00", "")
+    # Roll back to before the search indexes existed
+    db.conn.executescript("""
+        DROP TABLE posts_fts; DROP TABLE fb_posts_fts; DROP TABLE newsletter_fts;
+        PRAGMA user_version = 4;
+    """)
+    db.close()
+
+    db = Database(path)
+    db.initialize()
+    assert [hit["id"] for hit in db.search(user_id, "sunset")] == ["ig_1"]
+    db.close()
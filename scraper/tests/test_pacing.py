@@ -0,0 +1,135 @@
+import threading
+import time
+
+from src.pacing import PlatformSlot, add_pause_hook, pace, remove_pause_hook
+
+
+def test_pace_without_slot_just_sleeps():
+    started = time.monotonic()
+    pace(0.05)
+    assert time.monotonic() - started >= 0.05
+
+
+def test_slot_is_lent_out_while_holder_paces():
+    slot = PlatformSlot(1)
+    pausing = threading.Event()
+    other_ran = threading.Event()
+
+    def holder():
+        with slot:
+            pausing.set()
+            pace(0.3)
+
+    def other():
+        pausing.wait()
+        with slot:
+            other_ran.set()
+
+    t1 = threading.Thread(target=holder)
+    t2 = threading.Thread(target=other)
+    t1.start()
+    t2.start()
+    # The other user gets the only slot during the holder's pause, not after it
+    assert other_ran.wait(0.2)
+    t1.join()
+    t2.join()
+
+
+def test_pacing_never_shortened_and_slot_retaken():
+    slot = PlatformSlot(1)
+    lock = threading.Lock()
+    in_use = []
+    paused = []
+    max_in_use = []
+
+    def session():
+        with slot:
+            started = time.monotonic()
+            pace(0.05)
+            paused.append(time.monotonic() - started)
+            with lock:
+                in_use.append(1)
+                max_in_use.append(len(in_use))
+            time.sleep(0.02)  # "request" while holding the slot
+            with lock:
+                in_use.pop()
+
+    threads = [threading.Thread(target=session) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert min(paused) >= 0.05
+    assert max(max_in_use) == 1
+
+
+def test_pause_hooks_run_only_for_their_thread():
+    calls = []
+    add_pause_hook(calls.append)
+    try:
+        thread = threading.Thread(target=pace, args=(0.01,))
+        thread.start()
+        thread.join()
+        pace(0.01)
+    finally:
+        remove_pause_hook(calls.append)
+    pace(0.01)
+    assert calls == [0.01]
+
+
+def test_resume_waits_at_most_resume_wait_for_a_slot():
+    slot = PlatformSlot(1, resume_wait=0.1)
+    taken, release = threading.Event(), threading.Event()
+
+    def other():
+        with slot:
+            taken.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=other)
+    with slot:
+        started = time.monotonic()
+        thread.start()
+        pace(0.05)  # the other session takes the slot and keeps it
+        resumed = time.monotonic() - started
+    release.set()
+    thread.join()
+    assert taken.is_set()
+    assert 0.15 <= resumed < 1
+    # The overdraft is paid back: the slot is free again afterwards
+    with slot:
+        pass
+
+
+def test_resuming_session_goes_before_new_sessions():
+    slot = PlatformSlot(1)
+    lent, resuming = threading.Event(), threading.Event()
+    order = []
+
+    def holder():
+        with slot:
+            pace(0.05)
+            order.append("holder")
+
+    def borrower():
+        with slot:
+            lent.set()
+            time.sleep(0.2)  # the holder wakes up and waits behind this
+            resuming.set()
+            time.sleep(0.05)  # so does a new session
+
+    def newcomer():
+        resuming.wait(5)
+        with slot:
+            order.append("newcomer")
+
+    threads = [threading.Thread(target=holder)]
+    threads[0].start()
+    time.sleep(0.01)
+    threads += [threading.Thread(target=borrower), threading.Thread(target=newcomer)]
+    for t in threads[1:]:
+        t.start()
+    for t in threads:
+        t.join()
+    assert lent.is_set()
+    assert order == ["holder", "newcomer"]
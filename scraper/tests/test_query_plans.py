@@ -0,0 +1,154 @@
+"""EXPLAIN QUERY PLAN regression tests for the hot read paths.
+
+Each case runs the real Database method against a seeded database, captures
+the SQL it issued and fails if any statement's plan contains a full SCAN or a
+temp B-tree sort, unless the case explicitly allows the sort.
+"""
+import os
+import re
+import tempfile
+
+import pytest
+
+from src.db import Database, encode_feed_cursor, encode_search_cursor
+
+
+def _seed(db: Database) -> int:
+    users = [db.insert_user(f"user{i}@example.com", "pw") for i in range(3)]
+    for uid in users:
+        db.set_user_config(uid, "ig_cookies", "encrypted")
+        for p in range(60):
+            post_id = f"{uid}_{p}"
+            db.insert_post(uid, post_id, f"acct{p % 5}", ("post", "reel", "story")[p % 3],
+                           "caption", f"2024-01-{1 + p % 28:02d}T{p % 24:02d}:00:00", "https://ig")
+            for m in range(2):
+                db.insert_media(post_id, "image", f"/media/{post_id}_{m}.jpg", None, m)
+        for g in range(3):
+            group_id = f"g{uid}_{g}"
+            db.upsert_fb_group(uid, group_id, f"Group {g}", "https://fb")
+            for p in range(20):
+                fb_id = f"{group_id}_{p}"
+                db.insert_fb_post(fb_id, group_id, "Author", "content",
+                                  f"2024-02-{1 + p % 28:02d}T00:00:00", "https://fb", 1)
+                db.insert_fb_comment(fb_id, "Commenter", "comment", "2024-02-01", 0)
+        for e in range(40):
+            email_id = db.insert_newsletter_email(uid, f"m{uid}_{e}", "from@example.com",
+                                                  "to@example.com", "Subject", "text", "<p>html</p>")
+            if e % 3:
+                db.mark_email_processed(email_id)
+            if e % 7 == 0:
+                db.mark_email_as_confirmation(email_id)
+        for r in range(10):
+            run_id = db.insert_scrape_run(uid)
+            db.finish_scrape_run(run_id, "success" if r % 4 else "error")
+            digest_id = db.insert_newsletter_digest_run(uid, f"2024-03-{1 + r:02d}")
+            db.finish_newsletter_digest_run(digest_id, "success")
+        db.insert_manual_run(uid, "2024-01-01")
+        db.enqueue_job(uid, "cookie_test")
+    return users[0]
+
+
+@pytest.fixture(scope="module", params=[False, True], ids=["default-stats", "analyzed"])
+def seeded(request):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db = Database(os.path.join(tmpdir, "plans.db"))
+        db.initialize()
+        user_id = _seed(db)
+        if request.param:
+            db.execute("ANALYZE")
+            db.conn.commit()
+        yield db, user_id
+        db.close()
+
+
+# Queries whose ORDER BY needs a sort: the "since" queries sort only the rows
+# added during one run, and search ranks only the rows that matched.
+ALLOW_TEMP_SORT = {"get_new_posts_since", "get_new_fb_posts_since",
+                   "search", "search_fb", "search_cursor"}
+
+# Plan lines that say SCAN without reading a whole table: an FTS5 MATCH
+# (index 0:M...) and a pass over a subquery's already-filtered rows
+NOT_A_TABLE_SCAN = re.compile(r"^SCAN (\w+ VIRTUAL TABLE INDEX \d+:M|\(subquery-\d+\))")
+
+HOT_QUERIES = {
+    "get_feed": lambda db, u: db.get_feed(u),
+    "get_feed_account": lambda db, u: db.get_feed(u, account="acct1"),
+    "get_new_posts_since": lambda db, u: db.get_new_posts_since(u, "2024-01-01"),
+    "get_media_for_post": lambda db, u: db.get_media_for_post(f"{u}_1"),
+    "filter_new_post_ids": lambda db, u: db.filter_new_post_ids(u, [f"{u}_{p}" for p in range(55, 65)]),
+    "get_comments_for_post": lambda db, u: db.get_comments_for_post(f"g{u}_0_1"),
+    "get_media_for_posts": lambda db, u: db.get_media_for_posts([f"{u}_{p}" for p in range(20)]),
+    "get_comments_for_posts": lambda db, u: db.get_comments_for_posts([f"g{u}_0_{p}" for p in range(20)]),
+    "get_new_fb_posts_since": lambda db, u: db.get_new_fb_posts_since(u, "2024-01-01"),
+    "get_unified_feed": lambda db, u: db.get_unified_feed(u),
+    "get_unified_feed_ig": lambda db, u: db.get_unified_feed(u, platform="instagram"),
+    "get_unified_feed_ig_account": lambda db, u: db.get_unified_feed(u, platform="instagram", account="acct2"),
+    "get_unified_feed_ig_type": lambda db, u: db.get_unified_feed(u, platform="instagram", type="story"),
+    "get_unified_feed_fb": lambda db, u: db.get_unified_feed(u, platform="facebook"),
+    "get_unified_feed_fb_group": lambda db, u: db.get_unified_feed(u, platform="facebook", group_id=f"g{u}_1"),
+    "get_feed_cursor": lambda db, u: db.get_feed(u, cursor=encode_feed_cursor(db.get_feed(u)[-1])),
+    "get_unified_feed_cursor": lambda db, u: db.get_unified_feed(
+        u, cursor=encode_feed_cursor(db.get_unified_feed(u)[-1])),
+    "get_unified_feed_ig_cursor": lambda db, u: db.get_unified_feed(
+        u, platform="instagram", cursor=encode_feed_cursor(db.get_unified_feed(u, platform="instagram")[-1])),
+    "get_unified_feed_fb_group_cursor": lambda db, u: db.get_unified_feed(
+        u, platform="facebook", group_id=f"g{u}_1",
+        cursor=encode_feed_cursor(db.get_unified_feed(u, platform="facebook", group_id=f"g{u}_1")[-1])),
+    "get_unified_feed_type_cursor": lambda db, u: db.get_unified_feed(
+        u, type="reel", cursor=encode_feed_cursor(db.get_unified_feed(u, type="reel")[-1])),
+    "get_unclassified_emails": lambda db, u: db.get_unclassified_emails(u),
+    "get_unprocessed_confirmations": lambda db, u: db.get_unprocessed_confirmations(u),
+    "get_undigested_emails": lambda db, u: db.get_undigested_emails(u),
+    "get_unsummarized_emails": lambda db, u: db.get_unsummarized_emails(u),
+    "get_last_newsletter_digest_date": lambda db, u: db.get_last_newsletter_digest_date(u),
+    "get_recent_digest_html": lambda db, u: db.get_recent_digest_html(u),
+    "get_last_scrape_time": lambda db, u: db.get_last_scrape_time(u),
+    "get_recent_scrape_runs": lambda db, u: db.get_recent_scrape_runs(u),
+    "get_run_log_lines": lambda db, u: db.get_run_log_lines("scrape", 1, after_seq=5),
+    "search": lambda db, u: db.search(u, "caption content text"),
+    "search_fb": lambda db, u: db.search(u, "content", platform="facebook"),
+    "search_cursor": lambda db, u: db.search(
+        u, "caption", cursor=encode_search_cursor(db.search(u, "caption")[-1])),
+    "delete_old_stories": lambda db, u: db.delete_old_stories(u, 30),
+    "trim_old_media": lambda db, u: db.trim_old_media(u, 30),
+    "clear_old_run_logs": lambda db, u: db.clear_old_run_logs(u, 30),
+    "iter_posts": lambda db, u: list(db.iter_posts(u, batch_size=25)),
+    "iter_posts_since": lambda db, u: list(db.iter_posts(u, since="2024-01-01", batch_size=25)),
+    "iter_media": lambda db, u: list(db.iter_media([f"{u}_{p}" for p in range(20)], batch_size=8)),
+    "iter_fb_posts": lambda db, u: list(db.iter_fb_posts(u, batch_size=8)),
+    "iter_undigested_emails": lambda db, u: list(db.iter_undigested_emails(u, batch_size=4)),
+    "iter_unsummarized_emails": lambda db, u: list(db.iter_unsummarized_emails(u, batch_size=4)),
+    "get_scrape_schedules": lambda db, u: db.get_scrape_schedules(),
+    "get_pending_manual_run": lambda db, u: db.get_pending_manual_run(u),
+    "get_all_active_users": lambda db, u: db.get_all_active_users(),
+    "load_user_settings": lambda db, u: db.load_user_settings(),
+}
+
+
+def _query_plans(db: Database, call) -> list[tuple[str, list[str]]]:
+    statements = []
+    db.conn.set_trace_callback(statements.append)
+    try:
+        call()
+    finally:
+        db.conn.set_trace_callback(None)
+    plans = []
+    for sql in statements:
+        if not sql.lstrip().upper().startswith(("SELECT", "WITH")):
+            continue
+        rows = db.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+        plans.append((sql, [row["detail"] for row in rows]))
+    return plans
+
+
+@pytest.mark.parametrize("name", list(HOT_QUERIES))
+def test_hot_query_uses_indexes(seeded, name):
+    db, user_id = seeded
+    plans = _query_plans(db, lambda: HOT_QUERIES[name](db, user_id))
+    assert plans, f"{name} issued no SELECT"
+    for sql, details in plans:
+        scans = [d for d in details if d.startswith("SCAN ") and not NOT_A_TABLE_SCAN.match(d)]
+        assert not scans, f"{name} scans a table: {details}\n{sql}"
+        if name not in ALLOW_TEMP_SORT:
+            sorts = [d for d in details if "USE TEMP B-TREE" in d]
+            assert not sorts, f"{name} sorts in a temp B-tree: {details}\n{sql}"
@@ -0,0 +1,221 @@
+import os
+import sqlite3
+import tempfile
+
+import pytest
+
+from src.config import Config
+from src.db import Database
+from src.retention import (
+    RetentionPolicy, compact, enforce_user_retention, remove_media_files, sweep_orphan_media,
+)
+from src.settings import UserSettings
+
+
+@pytest.fixture
+def db():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        database = Database(os.path.join(tmpdir, "test.db"))
+        database.initialize()
+        yield database
+        database.close()
+
+
+@pytest.fixture
+def media_dir(tmp_path):
+    return str(tmp_path / "media")
+
+
+def _touch(media_dir, rel_path, age_hours=0):
+    full_path = os.path.join(media_dir, rel_path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    with open(full_path, "wb") as f:
+        f.write(b"x")
+    if age_hours:
+        old = os.path.getmtime(full_path) - age_hours * 3600
+        os.utime(full_path, (old, old))
+
+
+def _add_post(db, media_dir, user_id, post_id, post_type="story", days_old=10, media_type="image"):
+    db.insert_post(user_id, post_id, "acct", post_type, "caption", "2026-01-01T00:00:00+00:00", "")
+    ext = ".mp4" if media_type == "video" else ".jpg"
+    full, thumb = f"acct/{post_id}/0{ext}", f"acct/{post_id}/0_thumb.jpg"
+    db.insert_media(post_id, media_type, full, thumb, 0)
+    _touch(media_dir, full)
+    _touch(media_dir, thumb)
+    db.execute("UPDATE posts SET created_at = datetime('now', ?) WHERE id = ? AND user_id = ?",
+               (f"-{days_old} days", post_id, user_id))
+    db.conn.commit()
+    return full, thumb
+
+
+def _has_post(db, user_id, post_id):
+    return not db.filter_new_post_ids(user_id, [post_id])
+
+
+# ── Policy ─────────────────────────────────────────────────────
+
+def test_policy_user_settings_override_config_defaults():
+    config = Config()
+    config.RETENTION_STORY_DAYS = 7
+    config.RETENTION_MEDIA_DAYS = 90
+    settings = UserSettings(1, {"retention_story_days": "2", "retention_media_days": "0",
+                                "retention_run_log_days": "junk"})
+    policy = RetentionPolicy.for_user(settings, config)
+    assert policy == RetentionPolicy(story_days=2, run_log_days=config.RETENTION_RUN_LOG_DAYS, media_days=0)
+
+
+def test_default_policy_keeps_everything(db, media_dir):
+    user_id = db.insert_user("a@example.com", "pw")
+    _add_post(db, media_dir, user_id, "s1", days_old=1000)
+    counts = enforce_user_retention(db, user_id, RetentionPolicy(), media_dir)
+    assert not any(counts.values())
+    assert _has_post(db, user_id, "s1")
+
+
+# ── Stories ────────────────────────────────────────────────────
+
+def test_old_stories_deleted_with_their_files(db, media_dir):
+    user_id = db.insert_user("a@example.com", "pw")
+    full, thumb = _add_post(db, media_dir, user_id, "s_old", days_old=10)
+    _add_post(db, media_dir, user_id, "s_new", days_old=1)
+    _add_post(db, media_dir, user_id, "p_old", post_type="post", days_old=10)
+
+    counts = enforce_user_retention(db, user_id, RetentionPolicy(story_days=3), media_dir, batch_size=1)
+
+    assert counts["stories"] == 1
+    assert counts["files"] == 2
+    assert not _has_post(db, user_id, "s_old")
+    assert db.get_media_for_post("s_old") == []
+    assert not os.path.exists(os.path.join(media_dir, full))
+    assert not os.path.exists(os.path.dirname(os.path.join(media_dir, thumb)))
+    assert {item["id"] for item in db.get_unified_feed(user_id)} == {"s_new", "p_old"}
+
+
+def test_story_another_user_has_keeps_its_media(db, media_dir):
+    user_id = db.insert_user("a@example.com", "pw")
+    other = db.insert_user("b@example.com", "pw")
+    full, _ = _add_post(db, media_dir, user_id, "s1", days_old=10)
+    db.insert_post(other, "s1", "acct", "story", "caption", "2026-01-01T00:00:00+00:00", "")
+
+    counts = enforce_user_retention(db, user_id, RetentionPolicy(story_days=3), media_dir)
+
+    assert counts["stories"] == 1 and counts["files"] == 0
+    assert not _has_post(db, user_id, "s1")
+    assert len(db.get_media_for_post("s1")) == 1
+    assert os.path.exists(os.path.join(media_dir, full))
+
+
+# ── Media ──────────────────────────────────────────────────────
+
+def test_old_media_trimmed_to_thumbnails(db, media_dir):
+    user_id = db.insert_user("a@example.com", "pw")
+    full, thumb = _add_post(db, media_dir, user_id, "p1", post_type="reel", days_old=40, media_type="video")
+    recent, _ = _add_post(db, media_dir, user_id, "p2", post_type="post", days_old=5)
+
+    counts = enforce_user_retention(db, user_id, RetentionPolicy(media_days=30), media_dir)
+
+    assert counts["trimmed_media"] == 1 and counts["files"] == 1
+    [media] = db.get_media_for_post("p1")
+    assert (media["file_path"], media["thumbnail_path"], media["media_type"]) == (thumb, thumb, "image")
+    assert not os.path.exists(os.path.join(media_dir, full))
+    assert os.path.exists(os.path.join(media_dir, thumb))
+    assert os.path.exists(os.path.join(media_dir, recent))
+    # Already trimmed rows are left alone
+    assert enforce_user_retention(db, user_id, RetentionPolicy(media_days=30), media_dir)["trimmed_media"] == 0
+
+
+def test_media_without_thumbnail_or_shared_is_kept(db, media_dir):
+    user_id = db.insert_user("a@example.com", "pw")
+    other = db.insert_user("b@example.com", "pw")
+    _add_post(db, media_dir, user_id, "shared", post_type="post", days_old=40)
+    db.insert_post(other, "shared", "acct", "post", "caption", "2026-01-01T00:00:00+00:00", "")
+    db.insert_post(user_id, "nothumb", "acct", "post", "caption", "2026-01-01T00:00:00+00:00", "")
+    db.insert_media("nothumb", "image", "acct/nothumb/0.jpg", None, 0)
+    db.execute("UPDATE posts SET created_at = datetime('now', '-40 days')")
+    db.conn.commit()
+
+    assert db.trim_old_media(user_id, 30) == (0, [])
+
+
+# ── Run logs ───────────────────────────────────────────────────
+
+def test_old_run_logs_and_digest_html_cleared(db, media_dir):
+    user_id = db.insert_user("a@example.com", "pw")
+    old_run = db.insert_scrape_run(user_id)
+    new_run = db.insert_scrape_run(user_id)
+    manual_run = db.insert_manual_run(user_id, "2026-01-01")
+    for kind, run_id in (("scrape", old_run), ("scrape", new_run), ("manual", manual_run)):
+        db.append_run_log_lines(kind, run_id, [("ts", "INFO", "line")])
+    db.finish_scrape_run(old_run, "success")
+    digest_id = db.insert_newsletter_digest_run(user_id, "2026-01-01")
+    db.save_digest_html(digest_id, "<html>big</html>")
+    db.execute("UPDATE scrape_runs SET started_at = datetime('now', '-60 days') WHERE id = ?", (old_run,))
+    db.execute("UPDATE manual_runs SET started_at = datetime('now', '-60 days')")
+    db.execute("UPDATE newsletter_digest_runs SET started_at = datetime('now', '-60 days')")
+    db.conn.commit()
+
+    counts = enforce_user_retention(db, user_id, RetentionPolicy(run_log_days=30), media_dir, batch_size=1)
+
+    assert counts["run_logs"] == 3
+    assert db.get_run_log("scrape", old_run) == ""
+    assert db.get_run_log("manual", manual_run) == ""
+    assert db.get_run_log("scrape", new_run) != ""
+    assert db.get_scrape_run(old_run)["status"] == "success"
+    assert db.get_recent_digest_html(user_id) == []
+
+
+# ── Files and compaction ───────────────────────────────────────
+
+def test_sweep_removes_only_old_unreferenced_post_dirs(db, media_dir):
+    user_id = db.insert_user("a@example.com", "pw")
+    kept, _ = _add_post(db, media_dir, user_id, "p1", post_type="post")
+    _touch(media_dir, "acct/gone/0.jpg", age_hours=48)
+    _touch(media_dir, "acct/fresh/0.jpg")
+    _touch(media_dir, "acct/_profile/0.jpg", age_hours=48)
+
+    assert sweep_orphan_media(db, media_dir, grace_hours=24) == 1
+
+    assert not os.path.exists(os.path.join(media_dir, "acct/gone"))
+    for rel_path in (kept, "acct/fresh/0.jpg", "acct/_profile/0.jpg"):
+        assert os.path.exists(os.path.join(media_dir, rel_path))
+
+
+def test_sweep_without_media_dir(db, media_dir):
+    assert sweep_orphan_media(db, media_dir) == 0
+
+
+def test_remove_media_files_ignores_missing(media_dir):
+    _touch(media_dir, "acct/p1/0.jpg")
+    assert remove_media_files(media_dir, ["acct/p1/0.jpg", "acct/p1/1.jpg"]) == 1
+
+
+def test_new_database_uses_incremental_vacuum(db):
+    assert db.auto_vacuum_mode() == "incremental"
+    user_id = db.insert_user("a@example.com", "pw")
+    with db.transaction():
+        for i in range(300):
+            db.insert_post(user_id, f"p{i}", "acct", "post", "caption " * 100, "2026-01-01", "")
+    db.execute("DELETE FROM posts")
+    db.conn.commit()
+    assert compact(db) > 0
+    assert db.execute("PRAGMA freelist_count").fetchone()[0] == 0
+
+
+def test_vacuum_converts_old_database_and_keeps_search(tmp_path):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE placeholder (a)")  # created before auto_vacuum was ever set
+    conn.close()
+    db = Database(path)
+    db.initialize()
+    assert db.auto_vacuum_mode() == "none"
+    assert compact(db) == 0
+    user_id = db.insert_user("a@example.com", "pw")
+    db.insert_post(user_id, "p1", "acct", "post", "harbour", "2026-01-01", "")
+
+    db.vacuum()
+
+    assert db.auto_vacuum_mode() == "incremental"
+    assert [hit["id"] for hit in db.search(user_id, "harbour")] == ["p1"]
+    db.close()
@@ -0,0 +1,180 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from src.scheduler import ChangeGate, CronHeap, Scheduler, next_run_time
+
+
+def _run_for(scheduler: Scheduler, seconds: float):
+    async def run():
+        asyncio.get_running_loop().call_later(seconds, scheduler.stop)
+        await scheduler.run()
+    asyncio.run(run())
+
+
+def test_runs_jobs_periodically():
+    calls = []
+    scheduler = Scheduler()
+    scheduler.every(0.05, lambda: calls.append(1), name="tick")
+    _run_for(scheduler, 0.3)
+    assert 3 <= len(calls) <= 8
+
+
+def test_slow_job_does_not_block_others():
+    fast_calls = []
+    release = threading.Event()
+    scheduler = Scheduler()
+    scheduler.every(10, lambda: release.wait(2), name="slow")
+    scheduler.every(0.05, lambda: fast_calls.append(1), name="fast")
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.3, release.set)
+        loop.call_later(0.3, scheduler.stop)
+        await scheduler.run()
+
+    started = time.monotonic()
+    asyncio.run(run())
+    assert len(fast_calls) >= 3
+    assert time.monotonic() - started < 2
+
+
+def test_job_errors_are_contained():
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        raise RuntimeError("boom")
+
+    scheduler = Scheduler()
+    scheduler.every(0.05, flaky)
+    _run_for(scheduler, 0.2)
+    assert len(calls) >= 2
+
+
+def test_stop_returns_promptly_between_runs():
+    scheduler = Scheduler()
+    scheduler.every(3600, lambda: None)
+    started = time.monotonic()
+    _run_for(scheduler, 0.1)
+    assert time.monotonic() - started < 1
+
+
+# ── CronHeap ───────────────────────────────────────────────────
+
+T0 = datetime(2026, 1, 1, 8, 0, tzinfo=timezone.utc)
+
+
+def test_cron_heap_pops_only_due_users_in_order():
+    heap = CronHeap()
+    heap.set(1, T0 + timedelta(minutes=5))
+    heap.set(2, T0)
+    heap.set(3, T0 + timedelta(hours=1))
+    assert heap.pop_due(T0 + timedelta(minutes=10)) == [(2, T0), (1, T0 + timedelta(minutes=5))]
+    assert len(heap) == 1
+    assert heap.pop_due(T0 + timedelta(minutes=10)) == []
+
+
+def test_cron_heap_reschedule_supersedes_old_entry():
+    heap = CronHeap()
+    heap.set(1, T0)
+    heap.set(1, T0 + timedelta(hours=2))
+    assert heap.pop_due(T0 + timedelta(hours=1)) == []
+    assert heap.next_due(1) == T0 + timedelta(hours=2)
+    heap.set(1, None)
+    assert heap.pop_due(T0 + timedelta(days=1)) == []
+
+
+def test_cron_heap_in_flight_users_survive_resync():
+    heap = CronHeap()
+    heap.set(1, T0)
+    assert heap.pop_due(T0) == [(1, T0)]
+    heap.resync({1: T0, 2: T0})
+    heap.set(1, T0)
+    assert heap.pop_due(T0) == [(2, T0)]
+    heap.finish(1, T0 + timedelta(days=1))
+    assert heap.next_due(1) == T0 + timedelta(days=1)
+
+
+def test_cron_heap_resync_drops_missing_users():
+    heap = CronHeap()
+    heap.set(1, T0)
+    heap.resync({2: T0, 3: None})
+    assert heap.pop_due(T0) == [(2, T0)]
+
+
+def test_next_run_time():
+    assert next_run_time("0 8 * * *", "2026-01-01 07:00:00") == T0
+    assert next_run_time("0 8 * * *", "2026-01-01T08:30:00+00:00") == T0 + timedelta(days=1)
+    assert next_run_time("0 8 * * *", None) <= T0
+
+
+def test_change_gate_skips_until_another_connection_writes(tmp_path):
+    from src.db import Database
+
+    path = str(tmp_path / "gate.db")
+    poller, writer = Database(path), Database(path)
+    poller.initialize()
+    gate = ChangeGate(max_interval=3600)
+
+    assert gate.should_run(poller)
+    assert not gate.should_run(poller)
+
+    # The scan's own writes reopen the gate for one more run
+    uid = poller.insert_user("a@example.com", "pw")
+    assert gate.should_run(poller)
+    assert not gate.should_run(poller)
+
+    writer.set_user_config(uid, "trigger_scrape", "pending")
+    assert gate.should_run(poller)
+    assert not gate.should_run(poller)
+    gate.close()
+    poller.close()
+    writer.close()
+
+
+def test_change_gate_forces_run_after_max_interval(tmp_path):
+    from src.db import Database
+
+    db = Database(str(tmp_path / "gate.db"))
+    gate = ChangeGate(max_interval=0.05)
+    assert gate.should_run(db)
+    assert not gate.should_run(db)
+    time.sleep(0.06)
+    assert gate.should_run(db)
+    db.close()
+
+
+def test_change_gate_skips_across_threads(tmp_path):
+    from src.db import Database, get_database
+
+    path = str(tmp_path / "gate.db")
+    gate = ChangeGate(max_interval=3600)
+    results = []
+
+    def tick():
+        results.append(gate.should_run(get_database(path)))
+
+    for _ in range(4):
+        thread = threading.Thread(target=tick)
+        thread.start()
+        thread.join()
+    assert results == [True, False, False, False]
+
+    Database(path).insert_user("a@example.com", "pw")
+    tick()
+    assert results[-1] is True
+    gate.close()
+
+
+def test_scheduler_reports_job_metrics():
+    from src.metrics import SchedulerMetrics
+
+    metrics = SchedulerMetrics()
+    scheduler = Scheduler(metrics=metrics)
+    scheduler.every(0.05, lambda: None, name="tick")
+    _run_for(scheduler, 0.2)
+    rows = {r["name"]: r for r in metrics.drain()}
+    assert rows["tick"]["count"] >= 2
+    assert rows["tick"]["errors"] == 0
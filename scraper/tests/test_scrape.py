@@ -178,3 +178,95 @@ def test_scrape_all_backfill(env):
     scraper = Scraper(db=db, ig_client=mock_ig, downloader=mock_downloader, user_id=user_id)
     total_posts, total_stories = scraper.scrape_all_backfill("2026-01-01")
     assert total_posts == 1
+
+
+def test_process_post_writes_post_and_media_atomically(env):
+    db, media_dir, user_id = env
+    mock_downloader = MagicMock()
+    mock_downloader.download_with_thumbnail.return_value = ("u/p1/0.jpg", None)
+    scraper = Scraper(db=db, ig_client=MagicMock(), downloader=mock_downloader, user_id=user_id)
+    post = {
+        "id": "p1", "caption": "", "timestamp": "2026-01-01T00:00:00", "permalink": "",
+        "post_type": "post",
+        "media": [{"type": "image", "url": "https://example.com/0.jpg", "order": 0}],
+    }
+
+    with patch.object(db, "insert_media_many", side_effect=RuntimeError("disk full")):
+        with pytest.raises(RuntimeError):
+            scraper._process_post(post, "u")
+    assert db.get_post("p1") is None
+
+    assert scraper._process_post(post, "u") is True
+    assert len(db.get_media_for_post("p1")) == 1
+
+
+def test_scrape_fb_group_stores_posts_and_comments(env):
+    db, media_dir, user_id = env
+    db.upsert_fb_group(user_id, "123", "Group", "https://facebook.com/groups/123")
+    db.insert_fb_post("fb_old", "123", "Ann", "seen", "2026-01-01T00:00:00", "", 4)
+
+    mock_fb = MagicMock()
+    mock_fb.get_group_posts.return_value = [
+        {"id": "fb_old", "author_name": "Ann", "content": "seen",
+         "timestamp": "2026-01-01T00:00:00", "permalink": "", "comment_count": 4},
+        {"id": "fb_new", "author_name": "Bo", "content": "new",
+         "timestamp": "2026-01-02T00:00:00", "permalink": "", "comment_count": 1},
+    ]
+    mock_fb.get_post_comments.return_value = [
+        {"author_name": "Cy", "content": "nice", "timestamp": "2026-01-02T01:00:00", "order": 0},
+    ]
+    scraper = Scraper(db=db, ig_client=MagicMock(), downloader=MagicMock(), user_id=user_id, fb_client=mock_fb)
+
+    assert scraper.scrape_fb_group("123") == 1
+    mock_fb.get_post_comments.assert_called_once_with("123", "new", limit=3)
+    assert [c["author_name"] for c in db.get_comments_for_post("fb_new")] == ["Cy"]
+    assert db.get_fb_group(user_id, "123")["last_checked_at"] is not None
+
+
+def test_scrape_all_checks_a_page_for_new_posts_once(env):
+    db, media_dir, user_id = env
+    db.upsert_account(user_id, "user1", None)
+    db.insert_post(user_id=user_id, id="old", username="user1", post_type="post",
+                   caption="", timestamp="2026-01-01T00:00:00", permalink="")
+    post = {"username": "user1", "caption": "", "timestamp": "2026-01-02T00:00:00",
+            "permalink": "", "post_type": "post", "media": [{"type": "image", "url": "u", "order": 0}]}
+    mock_ig = MagicMock()
+    mock_ig.get_timeline_feed.return_value = [
+        {**post, "id": "old"}, {**post, "id": "new1"}, {**post, "id": "new2"}, {**post, "id": "new1"},
+    ]
+    mock_ig.get_reels_tray.return_value = []
+    mock_downloader = MagicMock()
+    mock_downloader.download_with_thumbnail.return_value = ("path", None)
+
+    scraper = Scraper(db=db, ig_client=mock_ig, downloader=mock_downloader, user_id=user_id)
+    with patch.object(db, "filter_new_post_ids", wraps=db.filter_new_post_ids) as filter_new, \
+            patch.object(db, "get_post", side_effect=AssertionError("per-post lookup")):
+        total_posts, _ = scraper.scrape_all()
+
+    assert total_posts == 2
+    assert filter_new.call_args_list[0].args == (user_id, ["old", "new1", "new2", "new1"])
+    assert mock_downloader.download_with_thumbnail.call_count == 2
+
+
+def test_post_already_stored_by_another_user_shares_media(env):
+    db, media_dir, user_id = env
+    other_id = db.insert_user("other@example.com", "hashedpassword")
+    db.insert_post(user_id=other_id, id="p1", username="star", post_type="post",
+                   caption="", timestamp="2026-01-01T00:00:00", permalink="")
+    db.insert_media("p1", "image", "star/p1/0.jpg", None, 0)
+
+    mock_ig = MagicMock()
+    mock_ig.get_user_posts.return_value = [{
+        "id": "p1", "caption": "", "timestamp": "2026-01-01T00:00:00", "permalink": "",
+        "post_type": "post", "media": [{"type": "image", "url": "u", "order": 0}],
+    }]
+    mock_ig.get_user_stories.return_value = []
+    mock_downloader = MagicMock()
+
+    scraper = Scraper(db=db, ig_client=mock_ig, downloader=mock_downloader, user_id=user_id)
+    new_posts, _ = scraper.scrape_account("star")
+
+    assert new_posts == 1
+    assert db.filter_new_post_ids(user_id, ["p1"]) == []
+    mock_downloader.download_with_thumbnail.assert_not_called()
+    assert len(db.get_media_for_post("p1")) == 1
@@ -0,0 +1,103 @@
+import threading
+import time
+
+from src.workers import ScrapeWorkerPool
+
+
+def test_runs_different_users_concurrently():
+    pool = ScrapeWorkerPool(max_workers=2)
+    barrier = threading.Barrier(2, timeout=5)
+    futures = [pool.submit(uid, barrier.wait) for uid in (1, 2)]
+    for f in futures:
+        f.result(timeout=5)
+    pool.shutdown()
+
+
+def test_serializes_work_for_same_user():
+    pool = ScrapeWorkerPool(max_workers=4)
+    running = []
+    overlaps = []
+
+    def work():
+        running.append(1)
+        if len(running) > 1:
+            overlaps.append(True)
+        time.sleep(0.05)
+        running.pop()
+
+    futures = [pool.submit(1, work) for _ in range(3)]
+    for f in futures:
+        f.result(timeout=5)
+    pool.shutdown()
+    assert overlaps == []
+
+
+def test_is_active_tracks_queued_and_running_work():
+    pool = ScrapeWorkerPool(max_workers=1)
+    release = threading.Event()
+    future = pool.submit(7, release.wait)
+    assert pool.is_active(7)
+    assert pool.active_users() == {7}
+    release.set()
+    future.result(timeout=5)
+    pool.shutdown()
+    assert not pool.is_active(7)
+
+
+def test_platform_slot_caps_concurrency():
+    pool = ScrapeWorkerPool(max_workers=4, max_instagram=1)
+    lock = threading.Lock()
+    active = []
+    peak = []
+
+    def work():
+        with pool.platform_slot("instagram"):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.05)
+            with lock:
+                active.pop()
+
+    futures = [pool.submit(uid, work) for uid in range(3)]
+    for f in futures:
+        f.result(timeout=5)
+    pool.shutdown()
+    assert max(peak) == 1
+
+
+def test_failures_do_not_break_the_pool():
+    pool = ScrapeWorkerPool(max_workers=1)
+
+    def boom():
+        raise RuntimeError("boom")
+
+    pool.submit(1, boom)
+    assert pool.submit(1, lambda: "ok").result(timeout=5) == "ok"
+    pool.shutdown()
+    assert not pool.is_active(1)
+
+
+def test_queued_work_for_one_user_does_not_hold_workers():
+    pool = ScrapeWorkerPool(max_workers=2)
+    release = threading.Event()
+    first = pool.submit(1, release.wait, 5)
+    queued = [pool.submit(1, lambda: None) for _ in range(3)]
+    # Both workers would be tied up by user 1 if its queued tasks blocked on a lock
+    assert pool.submit(2, lambda: "other user").result(timeout=1) == "other user"
+    release.set()
+    for f in [first, *queued]:
+        f.result(timeout=5)
+    pool.shutdown()
+    assert not pool.is_active(1)
+
+
+def test_shutdown_cancels_queued_work():
+    pool = ScrapeWorkerPool(max_workers=1)
+    release = threading.Event()
+    running = pool.submit(1, release.wait, 5)
+    queued = pool.submit(1, lambda: "never")
+    threading.Timer(0.05, release.set).start()
+    pool.shutdown()
+    assert running.result(timeout=5) is True
+    assert queued.cancelled()
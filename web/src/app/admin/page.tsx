@@ -13,11 +13,27 @@ interface User {
   created_at: string;
 }
 
+interface SchedulerStat {
+  name: string;
+  runs: number;
+  errors: number;
+  avg_seconds: number | null;
+  max_seconds: number;
+  value: number | null;
+  last_heartbeat: string | null;
+}
+
+function formatSeconds(seconds: number | null): string {
+  if (seconds == null) return "—";
+  return seconds < 1 ? `${Math.round(seconds * 1000)} ms` : `${seconds.toFixed(1)} s`;
+}
+
 export default function AdminPage() {
   const [users, setUsers] = useState<User[]>([]);
   const [error, setError] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
   const [toggling, setToggling] = useState<number | null>(null);
+  const [stats, setStats] = useState<SchedulerStat[]>([]);
 
   async function fetchUsers() {
     const res = await fetch("/api/admin/users");
@@ -36,8 +52,17 @@ export default function AdminPage() {
     setLoading(false);
   }
 
+  async function fetchStats() {
+    const res = await fetch("/api/admin/scheduler");
+    if (res.ok) {
+      const data = await res.json();
+      setStats(data.stats);
+    }
+  }
+
   useEffect(() => {
     fetchUsers();
+    fetchStats();
   }, []);
 
   async function toggleActive(targetUserId: number, active: boolean) {
@@ -120,6 +145,51 @@ export default function AdminPage() {
           </table>
         </CardContent>
       </Card>
+      <Card className="mt-6">
+        <CardHeader>
+          <CardTitle>Scheduler (last hour)</CardTitle>
+        </CardHeader>
+        <CardContent>
+          {stats.length === 0 ? (
+            <p className="text-sm text-muted-foreground">No scheduler stats recorded yet.</p>
+          ) : (
+            <table className="w-full text-sm">
+              <thead>
+                <tr className="border-b text-left text-muted-foreground">
+                  <th className="pb-2 font-medium">Job</th>
+                  <th className="pb-2 font-medium">Runs</th>
+                  <th className="pb-2 font-medium">Errors</th>
+                  <th className="pb-2 font-medium">Avg</th>
+                  <th className="pb-2 font-medium">Max</th>
+                  <th className="pb-2 font-medium">Last seen</th>
+                </tr>
+              </thead>
+              <tbody>
+                {stats.map((stat) => (
+                  <tr key={stat.name} className="border-b last:border-0">
+                    <td className="py-2">{stat.name}</td>
+                    {stat.value != null ? (
+                      <td className="py-2" colSpan={4}>{stat.value}</td>
+                    ) : (
+                      <>
+                        <td className="py-2">{stat.runs}</td>
+                        <td className="py-2">{stat.errors}</td>
+                        <td className="py-2">{formatSeconds(stat.avg_seconds)}</td>
+                        <td className="py-2">{formatSeconds(stat.max_seconds)}</td>
+                      </>
+                    )}
+                    <td className="py-2">
+                      {stat.last_heartbeat
+                        ? new Date(stat.last_heartbeat + "Z").toLocaleTimeString()
+                        : "—"}
+                    </td>
+                  </tr>
+                ))}
+              </tbody>
+            </table>
+          )}
+        </CardContent>
+      </Card>
     </div>
   );
 }
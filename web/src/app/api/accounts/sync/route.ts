@@ -1,6 +1,6 @@
 import { NextResponse } from "next/server";
 import { requireUserId } from "@/lib/auth";
-import { getUserConfig, setUserConfig } from "@/lib/db";
+import { getUserConfig, setUserConfig, enqueueJob } from "@/lib/db";
 
 function unauthorized() {
   return NextResponse.json({ error: "Unauthorized" }, { status: 401 });
@@ -15,6 +15,7 @@ export async function POST() {
     return NextResponse.json({ error: "A sync is already queued or running" }, { status: 409 });
   }
   setUserConfig(userId, "trigger_sync_following", "pending");
+  enqueueJob(userId, "trigger_sync_following");
   return NextResponse.json({ ok: true });
 }
 
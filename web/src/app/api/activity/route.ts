@@ -1,6 +1,6 @@
 import { NextResponse } from "next/server";
 import { requireUserId } from "@/lib/auth";
-import { getRecentScrapeRuns, getRecentManualRuns, getScrapeRunLog, getManualRunLog } from "@/lib/db";
+import { getRecentScrapeRuns, getRecentManualRuns, getRunLogTail } from "@/lib/db";
 
 export async function GET(req: Request) {
   let userId: number;
@@ -13,11 +13,11 @@ export async function GET(req: Request) {
   const { searchParams } = new URL(req.url);
   const logType = searchParams.get("logType"); // "scrape" | "manual"
   const logId = searchParams.get("logId");
+  const after = Math.max(0, parseInt(searchParams.get("after") || "0") || 0);
 
   if (logType && logId) {
     const id = Number(logId);
-    const log = logType === "scrape" ? getScrapeRunLog(userId, id) : getManualRunLog(userId, id);
-    return NextResponse.json({ log });
+    return NextResponse.json(getRunLogTail(userId, logType === "scrape" ? "scrape" : "manual", id, after));
   }
 
   const scrapeRuns = getRecentScrapeRuns(userId, 10).map((r) => ({
@@ -0,0 +1,13 @@
+import { NextRequest, NextResponse } from "next/server";
+import { requireUserId } from "@/lib/auth";
+import { isUserAdmin, getSchedulerStats } from "@/lib/db";
+
+export async function GET(request: NextRequest) {
+  let userId: number;
+  try { userId = await requireUserId(); } catch {
+    return NextResponse.json({ error: "Unauthorized" }, { status: 401 });
+  }
+  if (!isUserAdmin(userId)) return NextResponse.json({ error: "Forbidden" }, { status: 403 });
+  const hours = Math.min(Math.max(Number(request.nextUrl.searchParams.get("hours")) || 1, 1), 24);
+  return NextResponse.json({ stats: getSchedulerStats(hours) });
+}
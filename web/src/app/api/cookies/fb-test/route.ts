@@ -1,6 +1,6 @@
 import { NextResponse } from "next/server";
 import { requireUserId } from "@/lib/auth";
-import { getUserConfig, setUserConfig } from "@/lib/db";
+import { getUserConfig, setUserConfig, enqueueJob } from "@/lib/db";
 
 function unauthorized() {
   return NextResponse.json({ error: "Unauthorized" }, { status: 401 });
@@ -11,6 +11,7 @@ export async function POST() {
   try { userId = await requireUserId(); } catch { return unauthorized(); }
 
   setUserConfig(userId, "fb_cookie_test", "pending");
+  enqueueJob(userId, "fb_cookie_test");
   setUserConfig(userId, "fb_cookie_test_log", "Queued, waiting for scraper to pick up...");
   return NextResponse.json({ ok: true });
 }
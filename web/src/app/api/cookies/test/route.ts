@@ -1,6 +1,6 @@
 import { NextResponse } from "next/server";
 import { requireUserId } from "@/lib/auth";
-import { getUserConfig, setUserConfig } from "@/lib/db";
+import { getUserConfig, setUserConfig, enqueueJob } from "@/lib/db";
 
 function unauthorized() {
   return NextResponse.json({ error: "Unauthorized" }, { status: 401 });
@@ -12,6 +12,7 @@ export async function POST() {
   try { userId = await requireUserId(); } catch { return unauthorized(); }
 
   setUserConfig(userId, "cookie_test", "pending");
+  enqueueJob(userId, "cookie_test");
   setUserConfig(userId, "cookie_test_log", "Queued, waiting for scraper to pick up...");
   return NextResponse.json({ ok: true });
 }
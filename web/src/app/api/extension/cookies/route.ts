@@ -1,5 +1,5 @@
 import { NextRequest, NextResponse } from "next/server";
-import { getUserIdByApiKey, setUserConfig } from "@/lib/db";
+import { getUserIdByApiKey, setUserConfig, enqueueJob } from "@/lib/db";
 
 export async function POST(request: NextRequest) {
   const { api_key, cookies } = await request.json();
@@ -21,6 +21,7 @@ export async function POST(request: NextRequest) {
   const fernet = new Fernet(encryptionKey);
   setUserConfig(userId, "ig_cookies", fernet.encrypt(JSON.stringify(cookies)));
   setUserConfig(userId, "ig_cookies_stale", "false");
+  enqueueJob(userId, "reschedule");
 
   const res = NextResponse.json({ ok: true });
   res.headers.set("Access-Control-Allow-Origin", "*");
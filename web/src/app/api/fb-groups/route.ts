@@ -1,6 +1,6 @@
 import { NextRequest, NextResponse } from "next/server";
 import { requireUserId } from "@/lib/auth";
-import { getFbGroups, addFbGroup, deleteFbGroup, setUserConfig } from "@/lib/db";
+import { getFbGroups, addFbGroup, deleteFbGroup, setUserConfig, enqueueJob } from "@/lib/db";
 
 function unauthorized() {
   return NextResponse.json({ error: "Unauthorized" }, { status: 401 });
@@ -36,6 +36,7 @@ export async function POST(request: NextRequest) {
     }
     addFbGroup(userId, groupId, name || `Group ${groupId}`, url);
     setUserConfig(userId, "fb_group_resolve", "pending");
+    enqueueJob(userId, "fb_group_resolve");
     return NextResponse.json({ ok: true });
   } catch (e: any) {
     return NextResponse.json({ error: e.message }, { status: 500 });
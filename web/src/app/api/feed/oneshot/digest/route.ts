@@ -4,7 +4,7 @@ import {
   getFirstActiveUserId,
   getUserConfig,
   getPostsSince,
-  getMediaForPost,
+  getMediaForPosts,
   getLastIgDigestDate,
   setLastIgDigestDate,
 } from "@/lib/db";
@@ -269,9 +269,10 @@ export async function POST(request: NextRequest) {
   }
 
   // Build post list with media
+  const mediaByPost = getMediaForPosts(userId, rawPosts.filter((p) => p.platform === "instagram").map((p) => p.id));
   const posts: DigestPost[] = rawPosts.map((p) => {
     const media = p.platform === "instagram"
-      ? getMediaForPost(userId, p.id).map((m) => ({
+      ? (mediaByPost.get(p.id) ?? []).map((m) => ({
           type: m.media_type,
           url: `https://ig.raakode.dk/api/media/${m.file_path}`,
           thumbnail: m.thumbnail_path ? `https://ig.raakode.dk/api/media/${m.thumbnail_path}` : null,
@@ -3,7 +3,7 @@ import {
   getFirstActiveUserId,
   getPostsSince,
   getLastIgDigestDate,
-  getMediaForPost,
+  getMediaForPosts,
 } from "@/lib/db";
 
 function authCheck(request: NextRequest): boolean {
@@ -53,6 +53,8 @@ export async function GET(request: NextRequest) {
     return NextResponse.json({ pending: false, reason: "no_new_posts" });
   }
 
+  const mediaByPost = getMediaForPosts(userId, posts.filter((p) => p.platform === "instagram").map((p) => p.id));
+
   return NextResponse.json({
     pending: true,
     user_id: userId,
@@ -60,7 +62,7 @@ export async function GET(request: NextRequest) {
     since_date: since,
     posts: posts.map((p) => {
       const media = p.platform === "instagram"
-        ? getMediaForPost(userId, p.id).map((m) => ({
+        ? (mediaByPost.get(p.id) ?? []).map((m) => ({
             type: m.media_type,
             url: `https://ig.raakode.dk/api/media/${m.file_path}`,
             thumbnail: m.thumbnail_path ? `https://ig.raakode.dk/api/media/${m.thumbnail_path}` : null,
@@ -1,6 +1,6 @@
 import { NextRequest, NextResponse } from "next/server";
 import { requireUserId } from "@/lib/auth";
-import { getUnifiedFeed, getMediaForPost, getCommentsForPost } from "@/lib/db";
+import { getUnifiedFeed, getMediaForPosts, getCommentsForPosts, encodeFeedCursor } from "@/lib/db";
 
 export async function GET(request: NextRequest) {
   let userId: number;
@@ -12,24 +12,28 @@ export async function GET(request: NextRequest) {
 
   const { searchParams } = new URL(request.url);
   const limit = Math.min(100, Math.max(1, parseInt(searchParams.get("limit") || "20") || 20));
-  const offset = Math.max(0, parseInt(searchParams.get("offset") || "0") || 0);
+  const cursor = searchParams.get("cursor") || undefined;
   const account = searchParams.get("account") || undefined;
   const type = searchParams.get("type") || undefined;
   const platform = searchParams.get("platform") || undefined;
   const groupId = searchParams.get("groupId") || undefined;
 
   try {
-    const posts = getUnifiedFeed(userId, limit, offset, account, type, platform, groupId);
+    const posts = getUnifiedFeed(userId, limit, cursor, account, type, platform, groupId);
+    const media = getMediaForPosts(userId, posts.filter((p) => p.platform === "instagram").map((p) => p.id));
+    const comments = getCommentsForPosts(posts.filter((p) => p.platform === "facebook").map((p) => p.id));
     const enriched = posts.map((post) => {
       if (post.platform === "instagram") {
-        return { ...post, media: getMediaForPost(userId, post.id) };
+        return { ...post, media: media.get(post.id) ?? [] };
       }
       // FB posts: attach comments
-      return { ...post, comments: getCommentsForPost(post.id) };
+      return { ...post, comments: comments.get(post.id) ?? [] };
     });
 
-    return NextResponse.json({ posts: enriched, hasMore: posts.length === limit });
+    const hasMore = posts.length === limit;
+    const nextCursor = hasMore ? encodeFeedCursor(posts[posts.length - 1]) : null;
+    return NextResponse.json({ posts: enriched, hasMore, nextCursor });
   } catch {
-    return NextResponse.json({ posts: [], hasMore: false });
+    return NextResponse.json({ posts: [], hasMore: false, nextCursor: null });
   }
 }
@@ -1,9 +1,9 @@
 import { NextRequest, NextResponse } from "next/server";
 import { requireUserId } from "@/lib/auth";
-import { getManualRunLog } from "@/lib/db";
+import { getRunLogTail } from "@/lib/db";
 
 export async function GET(
-  _request: NextRequest,
+  request: NextRequest,
   { params }: { params: Promise<{ id: string }> }
 ) {
   let userId: number;
@@ -18,6 +18,6 @@ export async function GET(
   if (isNaN(runId)) {
     return NextResponse.json({ error: "Invalid run ID" }, { status: 400 });
   }
-  const log = getManualRunLog(userId, runId);
-  return NextResponse.json({ log });
+  const after = Math.max(0, parseInt(request.nextUrl.searchParams.get("after") || "0") || 0);
+  return NextResponse.json(getRunLogTail(userId, "manual", runId, after));
 }
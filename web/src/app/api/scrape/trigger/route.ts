@@ -1,6 +1,6 @@
 import { NextRequest, NextResponse } from "next/server";
 import { requireUserId } from "@/lib/auth";
-import { getUserConfig, setUserConfig } from "@/lib/db";
+import { getUserConfig, setUserConfig, enqueueJob } from "@/lib/db";
 
 function unauthorized() {
   return NextResponse.json({ error: "Unauthorized" }, { status: 401 });
@@ -19,6 +19,7 @@ export async function POST(request: NextRequest) {
       return NextResponse.json({ error: "An IG scrape is already queued or running" }, { status: 409 });
     }
     setUserConfig(userId, "trigger_ig_scrape", "pending");
+    enqueueJob(userId, "trigger_ig_scrape");
     return NextResponse.json({ ok: true });
   }
 
@@ -28,6 +29,7 @@ export async function POST(request: NextRequest) {
       return NextResponse.json({ error: "A FB scrape is already queued or running" }, { status: 409 });
     }
     setUserConfig(userId, "trigger_fb_scrape", "pending");
+    enqueueJob(userId, "trigger_fb_scrape");
     return NextResponse.json({ ok: true });
   }
 
@@ -37,6 +39,7 @@ export async function POST(request: NextRequest) {
     return NextResponse.json({ error: "A scrape is already queued or running" }, { status: 409 });
   }
   setUserConfig(userId, "trigger_scrape", "pending");
+  enqueueJob(userId, "trigger_scrape");
   return NextResponse.json({ ok: true });
 }
 
@@ -0,0 +1,31 @@
+import { NextRequest, NextResponse } from "next/server";
+import { requireUserId } from "@/lib/auth";
+import { searchContent, encodeSearchCursor, SearchInputError } from "@/lib/db";
+
+export async function GET(request: NextRequest) {
+  let userId: number;
+  try {
+    userId = await requireUserId();
+  } catch {
+    return NextResponse.json({ error: "Unauthorized" }, { status: 401 });
+  }
+
+  const { searchParams } = new URL(request.url);
+  const query = searchParams.get("q") || "";
+  const limit = Math.min(100, Math.max(1, parseInt(searchParams.get("limit") || "20") || 20));
+  const cursor = searchParams.get("cursor") || undefined;
+  const platform = searchParams.get("platform") || undefined;
+
+  try {
+    const hits = searchContent(userId, query, limit, cursor, platform);
+    const hasMore = hits.length === limit;
+    const nextCursor = hasMore ? encodeSearchCursor(hits[hits.length - 1]) : null;
+    return NextResponse.json({ hits, hasMore, nextCursor });
+  } catch (e) {
+    if (e instanceof SearchInputError) {
+      return NextResponse.json({ error: e.message }, { status: 400 });
+    }
+    console.error("Search failed:", e);
+    return NextResponse.json({ error: "Search failed" }, { status: 500 });
+  }
+}
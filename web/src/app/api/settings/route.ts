@@ -1,6 +1,14 @@
 import { NextRequest, NextResponse } from "next/server";
 import { requireUserId } from "@/lib/auth";
-import { getUserConfig, setUserConfig } from "@/lib/db";
+import { getUserConfig, setUserConfig, enqueueJob } from "@/lib/db";
+
+// Days to keep each kind of data (0 keeps forever); the scraper's retention
+// job falls back to its RETENTION_* defaults while a key is unset
+const RETENTION_KEYS = {
+  storyDays: "retention_story_days",
+  runLogDays: "retention_run_log_days",
+  mediaDays: "retention_media_days",
+} as const;
 
 function unauthorized() {
   return NextResponse.json({ error: "Unauthorized" }, { status: 401 });
@@ -19,6 +27,9 @@ export async function GET() {
     const fbCookiesStale = getUserConfig(userId, "fb_cookies_stale") === "true";
     const apiKey = getUserConfig(userId, "api_key") || "";
     const fbEnabled = getUserConfig(userId, "fb_enabled") === "true";
+    const retention = Object.fromEntries(
+      Object.entries(RETENTION_KEYS).map(([field, key]) => [field, getUserConfig(userId, key)])
+    );
 
     return NextResponse.json({
       hasCookies,
@@ -29,6 +40,7 @@ export async function GET() {
       fbCookiesStale,
       apiKey,
       fbEnabled,
+      retention,
     });
   } catch {
     return NextResponse.json({
@@ -40,6 +52,7 @@ export async function GET() {
       fbCookiesStale: false,
       apiKey: "",
       fbEnabled: false,
+      retention: {},
     });
   }
 }
@@ -61,10 +74,12 @@ export async function POST(request: NextRequest) {
     const encrypted = fernet.encrypt(JSON.stringify(body.cookies));
     setUserConfig(userId, "ig_cookies", encrypted);
     setUserConfig(userId, "ig_cookies_stale", "false");
+    enqueueJob(userId, "reschedule");
   }
 
   if (body.cronSchedule) {
     setUserConfig(userId, "cron_schedule", body.cronSchedule);
+    enqueueJob(userId, "reschedule");
   }
 
   if (body.emailRecipient !== undefined) {
@@ -75,5 +90,16 @@ export async function POST(request: NextRequest) {
     setUserConfig(userId, "fb_enabled", body.fbEnabled ? "true" : "false");
   }
 
+  if (body.retention) {
+    for (const [field, key] of Object.entries(RETENTION_KEYS)) {
+      const days = body.retention[field];
+      if (days === undefined) continue;
+      if (!Number.isInteger(days) || days < 0) {
+        return NextResponse.json({ error: `retention.${field} must be a whole number of days` }, { status: 400 });
+      }
+      setUserConfig(userId, key, String(days));
+    }
+  }
+
   return NextResponse.json({ ok: true });
 }
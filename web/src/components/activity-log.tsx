@@ -62,12 +62,29 @@ function LogViewer({
 
   useEffect(() => {
     let interval: ReturnType<typeof setInterval>;
+    // Fetch the whole log once, then only the lines added since lastSeq
+    let lastSeq = 0;
+    let inFlight = false;
+    setLog("");
     async function fetchLog() {
+      if (inFlight) return;
+      inFlight = true;
+      try {
+        await appendNewLines();
+      } finally {
+        inFlight = false;
+      }
+    }
+    async function appendNewLines() {
       const res = await fetch(
-        `/api/activity?logType=${kind === "scheduled" ? "scrape" : "manual"}&logId=${runId}`
+        `/api/activity?logType=${kind === "scheduled" ? "scrape" : "manual"}&logId=${runId}&after=${lastSeq}`
       );
       const data = await res.json();
-      setLog(data.log || "");
+      const lines: string[] = data.lines || [];
+      lastSeq = data.lastSeq ?? lastSeq;
+      if (lines.length) {
+        setLog((prev) => prev + lines.map((line) => line + "\n").join(""));
+      }
     }
     fetchLog();
     if (isActive) {
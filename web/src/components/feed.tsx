@@ -44,7 +44,7 @@ export function Feed({ account }: FeedProps) {
   const [loading, setLoading] = useState(false);
   const [tab, setTab] = useState<string>("all");
   const [fbEnabled, setFbEnabled] = useState(false);
-  const offsetRef = useRef(0);
+  const cursorRef = useRef<string | null>(null);
 
   useEffect(() => {
     fetch("/api/settings")
@@ -57,11 +57,9 @@ export function Feed({ account }: FeedProps) {
 
   const loadPosts = useCallback(async (reset = false) => {
     setLoading(true);
-    if (reset) offsetRef.current = 0;
-    const params = new URLSearchParams({
-      limit: "20",
-      offset: String(offsetRef.current),
-    });
+    if (reset) cursorRef.current = null;
+    const params = new URLSearchParams({ limit: "20" });
+    if (cursorRef.current) params.set("cursor", cursorRef.current);
     if (account) params.set("account", account);
     if (tab !== "all") params.set("type", tab);
 
@@ -73,7 +71,7 @@ export function Feed({ account }: FeedProps) {
     } else {
       setPosts((prev) => [...prev, ...data.posts]);
     }
-    offsetRef.current += data.posts.length;
+    cursorRef.current = data.nextCursor;
     setHasMore(data.hasMore);
     setLoading(false);
   }, [account, tab]);
@@ -1,15 +1,45 @@
 import Database from "better-sqlite3";
+import { deflateSync, inflateSync } from "node:zlib";
 
 const DATABASE_PATH = process.env.DATABASE_PATH || "/data/db/ig.db";
 
+// Same SQLITE_* settings as the scraper's SqliteProfile. The busy timeout is
+// how long a write waits for the scraper's write lock before "database is locked".
+const BUSY_TIMEOUT_MS = parseInt(process.env.SQLITE_BUSY_TIMEOUT_MS || "15000") || 15000;
+const SYNCHRONOUS = ["OFF", "NORMAL", "FULL", "EXTRA"].includes((process.env.SQLITE_SYNCHRONOUS || "").toUpperCase())
+  ? process.env.SQLITE_SYNCHRONOUS!.toUpperCase()
+  : "NORMAL";
+
 function getDb(): Database.Database {
-  const db = new Database(DATABASE_PATH, { readonly: true });
+  const db = new Database(DATABASE_PATH, { readonly: true, timeout: BUSY_TIMEOUT_MS });
   db.pragma("journal_mode = WAL");
   return db;
 }
 
 function getWritableDb(): Database.Database {
-  return new Database(DATABASE_PATH);
+  const db = new Database(DATABASE_PATH, { timeout: BUSY_TIMEOUT_MS });
+  db.pragma(`synchronous = ${SYNCHRONOUS}`);
+  return db;
+}
+
+// newsletter_emails.body_html and newsletter_digest_runs.digest_html hold
+// either plain TEXT or a BLOB of this marker plus a zlib stream, in the same
+// format as the scraper's compress_text / decompress_text.
+const COMPRESSED_MARKER = Buffer.from("\x00zlib:", "latin1");
+const COMPRESS_MIN_BYTES = 1024;
+
+function compressText(text: string): string | Buffer {
+  const raw = Buffer.from(text);
+  if (raw.length < COMPRESS_MIN_BYTES) return text;
+  const packed = Buffer.concat([COMPRESSED_MARKER, deflateSync(raw, { level: 6 })]);
+  return packed.length < raw.length ? packed : text;
+}
+
+function decompressText<T extends string | null>(value: T | Buffer): T | string {
+  if (Buffer.isBuffer(value) && value.subarray(0, COMPRESSED_MARKER.length).equals(COMPRESSED_MARKER)) {
+    return inflateSync(value.subarray(COMPRESSED_MARKER.length)).toString();
+  }
+  return value as T;
 }
 
 export interface Account {
@@ -71,6 +101,29 @@ export function getMediaForPost(userId: number, postId: string): Media[] {
     .all(userId, postId) as Media[];
 }
 
+// Media for a page of posts in one query, grouped by post id and ordered
+export function getMediaForPosts(userId: number, postIds: string[]): Map<string, Media[]> {
+  if (postIds.length === 0) return new Map();
+  const placeholders = postIds.map(() => "?").join(",");
+  const rows = getDb()
+    .prepare(
+      `SELECT m.* FROM media m JOIN posts p ON m.post_id = p.id AND p.user_id = ?
+       WHERE m.post_id IN (${placeholders}) ORDER BY m.post_id, m."order"`
+    )
+    .all(userId, ...postIds) as Media[];
+  return groupByPost(rows);
+}
+
+function groupByPost<T extends { post_id: string }>(rows: T[]): Map<string, T[]> {
+  const grouped = new Map<string, T[]>();
+  for (const row of rows) {
+    const list = grouped.get(row.post_id);
+    if (list) list.push(row);
+    else grouped.set(row.post_id, [row]);
+  }
+  return grouped;
+}
+
 export function getAccounts(userId: number): Account[] {
   return getDb().prepare("SELECT * FROM accounts WHERE user_id = ? ORDER BY username").all(userId) as Account[];
 }
@@ -86,6 +139,19 @@ export function setUserConfig(userId: number, key: string, value: string): void
   db.close();
 }
 
+// Queue a job for the scraper (no-op if an identical job is already pending).
+// The job type doubles as the user_config status key the UI polls.
+export function enqueueJob(userId: number, type: string, payload: Record<string, unknown> | null = null): void {
+  const db = getWritableDb();
+  db.prepare(
+    `INSERT INTO jobs (user_id, type, payload)
+     SELECT ?, ?, ? WHERE NOT EXISTS (
+       SELECT 1 FROM jobs WHERE status = 'pending' AND user_id = ? AND type = ?
+     )`
+  ).run(userId, type, payload ? JSON.stringify(payload) : null, userId, type);
+  db.close();
+}
+
 export function getUserIdByApiKey(apiKey: string): number | null {
   const row = getDb().prepare(
     "SELECT user_id FROM user_config WHERE key = 'api_key' AND value = ?"
@@ -119,11 +185,6 @@ export function getRecentManualRuns(userId: number, limit = 10): ManualRun[] {
     .all(userId, limit) as ManualRun[];
 }
 
-export function getManualRunLog(userId: number, runId: number): string {
-  const row = getDb().prepare("SELECT log FROM manual_runs WHERE id = ? AND user_id = ?").get(runId, userId) as { log: string } | undefined;
-  return row?.log ?? "";
-}
-
 export interface ScrapeRun {
   id: number;
   started_at: string;
@@ -141,9 +202,39 @@ export function getRecentScrapeRuns(userId: number, limit = 20): ScrapeRun[] {
     .all(userId, limit) as ScrapeRun[];
 }
 
-export function getScrapeRunLog(userId: number, runId: number): string {
-  const row = getDb().prepare("SELECT log FROM scrape_runs WHERE id = ? AND user_id = ?").get(runId, userId) as { log: string } | undefined;
-  return row?.log ?? "";
+// ── Run Logs ──────────────────────────────────────────────────
+
+export type RunKind = "scrape" | "manual";
+
+export interface RunLogTail {
+  lines: string[];
+  lastSeq: number;
+}
+
+const RUN_TABLES: Record<RunKind, string> = { scrape: "scrape_runs", manual: "manual_runs" };
+
+// Log lines written after afterSeq, for tailing a running job. From the start
+// (afterSeq 0) this also includes the run's legacy log column.
+export function getRunLogTail(userId: number, kind: RunKind, runId: number, afterSeq = 0): RunLogTail {
+  const db = getDb();
+  const run = db
+    .prepare(`SELECT log FROM ${RUN_TABLES[kind]} WHERE id = ? AND user_id = ?`)
+    .get(runId, userId) as { log: string | null } | undefined;
+  if (!run) return { lines: [], lastSeq: afterSeq };
+
+  const rows = db
+    .prepare(
+      `SELECT seq, ts, level, message FROM run_log_lines
+       WHERE run_kind = ? AND run_id = ? AND seq > ?
+       ORDER BY seq`
+    )
+    .all(kind, runId, afterSeq) as { seq: number; ts: string | null; level: string | null; message: string }[];
+
+  const lines = afterSeq === 0 && run.log ? run.log.replace(/\n$/, "").split("\n") : [];
+  for (const row of rows) {
+    lines.push(row.ts === null ? row.message : `${row.ts} [${row.level}] ${row.message}`);
+  }
+  return { lines, lastSeq: rows.length ? rows[rows.length - 1].seq : afterSeq };
 }
 
 // ── Facebook Groups ────────────────────────────────────────────
@@ -223,6 +314,16 @@ export function getCommentsForPost(postId: string): FbComment[] {
     .all(postId) as FbComment[];
 }
 
+// Comments for a page of FB posts in one query, grouped by post id and ordered
+export function getCommentsForPosts(postIds: string[]): Map<string, FbComment[]> {
+  if (postIds.length === 0) return new Map();
+  const placeholders = postIds.map(() => "?").join(",");
+  const rows = getDb()
+    .prepare(`SELECT * FROM fb_comments WHERE post_id IN (${placeholders}) ORDER BY post_id, "order"`)
+    .all(...postIds) as FbComment[];
+  return groupByPost(rows);
+}
+
 // ── Users & Sessions ──────────────────────────────────────────
 
 export function createUser(email: string, passwordHash: string): number {
@@ -267,6 +368,41 @@ export function isUserAdmin(userId: number): boolean {
   return row?.is_admin === 1;
 }
 
+export interface SchedulerStat {
+  name: string;
+  runs: number;
+  errors: number;
+  avg_seconds: number | null;
+  max_seconds: number;
+  value: number | null; // latest sample, for gauges like pending_jobs
+  last_heartbeat: string | null;
+  last_recorded: string;
+}
+
+export function getSchedulerStats(hours = 1): SchedulerStat[] {
+  // scheduler_stats is a rolling table written by the scraper once a minute
+  try {
+    return getDb()
+      .prepare(
+        `SELECT s.name,
+                SUM(s.count) AS runs,
+                SUM(s.errors) AS errors,
+                SUM(s.total_seconds) / NULLIF(SUM(s.count), 0) AS avg_seconds,
+                MAX(s.max_seconds) AS max_seconds,
+                (SELECT value FROM scheduler_stats l WHERE l.name = s.name ORDER BY l.id DESC LIMIT 1) AS value,
+                MAX(s.heartbeat_at) AS last_heartbeat,
+                MAX(s.recorded_at) AS last_recorded
+         FROM scheduler_stats s
+         WHERE s.recorded_at >= datetime('now', ?)
+         GROUP BY s.name
+         ORDER BY s.name`
+      )
+      .all(`-${hours} hours`) as SchedulerStat[];
+  } catch {
+    return []; // table not created yet (scraper hasn't started since upgrade)
+  }
+}
+
 // ── Newsletter ────────────────────────────────────────────────
 
 export function insertNewsletterEmail(
@@ -280,13 +416,11 @@ export function insertNewsletterEmail(
   fromName: string = ""
 ): number {
   const db = getWritableDb();
-  // Ensure from_name column exists (migration for existing DBs)
-  try { db.prepare("ALTER TABLE newsletter_emails ADD COLUMN from_name TEXT DEFAULT ''").run(); } catch {}
   const result = db.prepare(
     `INSERT INTO newsletter_emails
      (user_id, message_id, from_address, from_name, to_address, subject, body_text, body_html)
      VALUES (?, ?, ?, ?, ?, ?, ?, ?)`
-  ).run(userId, messageId, fromAddress, fromName, toAddress, subject, bodyText, bodyHtml);
+  ).run(userId, messageId, fromAddress, fromName, toAddress, subject, bodyText, compressText(bodyHtml));
   db.close();
   return Number(result.lastInsertRowid);
 }
@@ -330,16 +464,10 @@ export function deleteNewsletterEmail(userId: number, emailId: number): void {
 }
 
 export function getNewsletterEmailBody(userId: number, emailId: number): { body_html: string | null; body_text: string | null; summary: string | null; subject: string | null; from_address: string | null; from_name: string | null; received_at: string | null } | null {
-  // Ensure columns exist
-  const wdb = getWritableDb();
-  try { wdb.prepare("ALTER TABLE newsletter_emails ADD COLUMN summary TEXT").run(); } catch {}
-  try { wdb.prepare("ALTER TABLE newsletter_emails ADD COLUMN from_name TEXT DEFAULT ''").run(); } catch {}
-  wdb.close();
-
   const row = getDb()
     .prepare("SELECT body_html, body_text, summary, subject, from_address, COALESCE(from_name, '') as from_name, received_at FROM newsletter_emails WHERE id = ? AND user_id = ?")
     .get(emailId, userId) as { body_html: string | null; body_text: string | null; summary: string | null; subject: string | null; from_address: string | null; from_name: string | null; received_at: string | null } | undefined;
-  return row ?? null;
+  return row ? { ...row, body_html: decompressText(row.body_html) } : null;
 }
 
 export interface DigestRun {
@@ -355,13 +483,6 @@ export interface DigestRun {
 }
 
 export function getDigestRuns(userId: number, limit = 20): DigestRun[] {
-  // Ensure new columns exist (idempotent migrations)
-  const wdb = getWritableDb();
-  for (const col of ["subject TEXT", "schedule_name TEXT"]) {
-    try { wdb.prepare(`ALTER TABLE newsletter_digest_runs ADD COLUMN ${col}`).run(); } catch { /* exists */ }
-  }
-  wdb.close();
-
   return getDb()
     .prepare(
       `SELECT id, digest_date, email_count, started_at, finished_at, status, error, subject, schedule_name
@@ -378,19 +499,10 @@ export function deleteDigestRun(userId: number, runId: number): void {
 }
 
 export function getDigestRunHtml(userId: number, runId: number): string | null {
-  // Ensure column exists
-  const db = getWritableDb();
-  try {
-    db.prepare("ALTER TABLE newsletter_digest_runs ADD COLUMN digest_html TEXT").run();
-  } catch {
-    // Column already exists
-  }
-  db.close();
-
   const row = getDb()
     .prepare("SELECT digest_html FROM newsletter_digest_runs WHERE id = ? AND user_id = ?")
     .get(runId, userId) as { digest_html: string | null } | undefined;
-  return row?.digest_html ?? null;
+  return decompressText(row?.digest_html ?? null);
 }
 
 export interface NewsletterSubscription {
@@ -438,7 +550,8 @@ export function getUndigestedEmails(userId: number): { id: number; from_address:
        WHERE user_id = ? AND processed = 1 AND is_confirmation = 0 AND digest_date IS NULL
        ORDER BY received_at ASC`
     )
-    .all(userId) as any[];
+    .all(userId)
+    .map((e: any) => ({ ...e, body_html: decompressText(e.body_html) }));
 }
 
 export function getNewsletterSchedules(userId: number): { id: string; name: string; time: string; days: number[]; enabled: boolean }[] {
@@ -453,17 +566,14 @@ export function getNewsletterSchedules(userId: number): { id: string; name: stri
 }
 
 export function getRecentDigestTexts(userId: number, limit = 3): { id: number; digest_date: string; subject: string | null; digest_html: string }[] {
-  const db = getWritableDb();
-  try { db.prepare("ALTER TABLE newsletter_digest_runs ADD COLUMN digest_html TEXT").run(); } catch {}
-  db.close();
-
   return getDb()
     .prepare(
       `SELECT id, digest_date, subject, digest_html FROM newsletter_digest_runs
        WHERE user_id = ? AND status = 'success' AND digest_html IS NOT NULL
        ORDER BY digest_date DESC LIMIT ?`
     )
-    .all(userId, limit) as any[];
+    .all(userId, limit)
+    .map((d: any) => ({ ...d, digest_html: decompressText(d.digest_html) }));
 }
 
 export function getLastDigestDate(userId: number): string | null {
@@ -503,9 +613,6 @@ export function finishDigestRun(
   scheduleName: string | null = null
 ): void {
   const db = getWritableDb();
-  for (const col of ["subject TEXT", "schedule_name TEXT"]) {
-    try { db.prepare(`ALTER TABLE newsletter_digest_runs ADD COLUMN ${col}`).run(); } catch {}
-  }
   db.prepare(
     `UPDATE newsletter_digest_runs
      SET finished_at = datetime('now'), status = ?, email_count = ?, error = ?, subject = ?, schedule_name = ?
@@ -516,8 +623,7 @@ export function finishDigestRun(
 
 export function saveDigestHtml(runId: number, html: string): void {
   const db = getWritableDb();
-  try { db.prepare("ALTER TABLE newsletter_digest_runs ADD COLUMN digest_html TEXT").run(); } catch {}
-  db.prepare("UPDATE newsletter_digest_runs SET digest_html = ? WHERE id = ?").run(html, runId);
+  db.prepare("UPDATE newsletter_digest_runs SET digest_html = ? WHERE id = ?").run(compressText(html), runId);
   db.close();
 }
 
@@ -533,7 +639,6 @@ export function markEmailsDigested(emailIds: number[], digestDate: string): void
 
 export function saveEmailSummary(emailId: number, summary: string): void {
   const db = getWritableDb();
-  try { db.prepare("ALTER TABLE newsletter_emails ADD COLUMN summary TEXT").run(); } catch {}
   db.prepare("UPDATE newsletter_emails SET summary = ? WHERE id = ?").run(summary, emailId);
   db.close();
 }
@@ -582,66 +687,199 @@ export function setLastIgDigestDate(userId: number, date: string): void {
 
 // ── Unified Feed ──────────────────────────────────────────────
 
+type FeedCursor = [timestamp: string, platform: string, id: string];
+
+// Opaque keyset token for the page ending at item; same format as the
+// scraper's encode_feed_cursor (base64url of JSON [timestamp, platform, id]).
+export function encodeFeedCursor(item: Pick<UnifiedFeedItem, "timestamp" | "platform" | "id">): string {
+  return Buffer.from(JSON.stringify([item.timestamp, item.platform, item.id])).toString("base64url");
+}
+
+export function decodeFeedCursor(token: string): FeedCursor {
+  let key: unknown;
+  try {
+    key = JSON.parse(Buffer.from(token, "base64url").toString());
+  } catch {
+    throw new Error("Invalid feed cursor");
+  }
+  if (!Array.isArray(key) || key.length !== 3 || !key.every((v) => typeof v === "string")) {
+    throw new Error("Invalid feed cursor");
+  }
+  return key as FeedCursor;
+}
+
+// Rows of a single platform that sort after the cursor. Feeds are ordered by
+// (timestamp, platform, id) descending, so on a timestamp tie the platform
+// alone decides whether its rows come next. Unlike the full row-value
+// comparison this matches the (..., platform, timestamp, id) indexes.
+function feedSeek(platform: string, cursor: FeedCursor, timestampCol: string, idCol: string): [string, any[]] {
+  const [timestamp, cursorPlatform, id] = cursor;
+  if (platform === cursorPlatform) return [`(${timestampCol}, ${idCol}) < (?, ?)`, [timestamp, id]];
+  if (platform < cursorPlatform) return [`${timestampCol} <= ?`, [timestamp]];
+  return [`${timestampCol} < ?`, [timestamp]];
+}
+
 export function getUnifiedFeed(
   userId: number,
   limit = 20,
-  offset = 0,
+  cursor?: string,
   account?: string,
   type?: string,
   platform?: string,
   groupId?: string
 ): UnifiedFeedItem[] {
-  const db = getDb();
+  // feed_items is kept in sync with posts, fb_posts and fb_groups by triggers
+  // (see the scraper's migrations), so each page is one index range scan
+  const conditions: string[] = ["user_id = ?"];
+  const params: any[] = [userId];
 
-  // Build IG conditions
-  const igConditions: string[] = ["p.user_id = ?"];
-  const igParams: any[] = [userId];
-  if (account) {
-    igConditions.push("p.username = ?");
-    igParams.push(account);
+  // account narrows the IG rows (and drops FB ones), groupId narrows only
+  // the FB rows; platform drops the other platform's rows
+  const sources: [string, string | undefined][] = [];
+  if (platform !== "facebook") {
+    sources.push(["instagram", account]);
   }
-  if (type === "story") {
-    igConditions.push("p.type = 'story'");
+  if (platform !== "instagram" && !account) {
+    sources.push(["facebook", groupId]);
+  }
+  if (sources.length === 0) {
+    return [];
+  }
+  // Both platforms unfiltered need no platform clause at all
+  if (sources.length === 1 || groupId) {
+    const clauses = sources.map(([sourcePlatform, sourceId]) => {
+      params.push(sourcePlatform);
+      if (!sourceId) return "platform = ?";
+      params.push(sourceId);
+      return "(platform = ? AND source_id = ?)";
+    });
+    conditions.push(clauses.length === 1 ? clauses[0] : `(${clauses.join(" OR ")})`);
+  }
+  if (type === "story" || type === "fb_post") {
+    conditions.push("type = ?");
+    params.push(type);
   } else if (type === "post") {
-    igConditions.push("p.type IN ('post', 'reel')");
-  } else if (type === "fb_post") {
-    igConditions.push("1=0");
+    conditions.push("type IN ('post', 'reel')");
   }
-  if (platform === "facebook") {
-    igConditions.push("1=0");
+  if (cursor) {
+    const seek = decodeFeedCursor(cursor);
+    if (sources.length === 1) {
+      const [clause, seekParams] = feedSeek(sources[0][0], seek, "timestamp", "item_id");
+      conditions.push(clause);
+      params.push(...seekParams);
+    } else {
+      conditions.push("(timestamp, platform, item_id) < (?, ?, ?)");
+      params.push(...seek);
+    }
   }
 
-  // Build FB conditions
-  const fbConditions: string[] = ["fg.user_id = ?"];
-  const fbParams: any[] = [userId];
-  if (groupId) {
-    fbConditions.push("fp.group_id = ?");
-    fbParams.push(groupId);
+  const sql = `
+    SELECT item_id AS id, source_name, type, content, timestamp, permalink, platform, comment_count
+    FROM feed_items WHERE ${conditions.join(" AND ")}
+    ORDER BY timestamp DESC, platform DESC, item_id DESC
+    LIMIT ?
+  `;
+  return getDb().prepare(sql).all(...params, limit) as UnifiedFeedItem[];
+}
+
+// ── Search ────────────────────────────────────────────────────
+
+export interface SearchHit {
+  platform: "instagram" | "facebook" | "newsletter";
+  rowid: number;
+  id: string | number;
+  type: string;
+  source_name: string;
+  title: string | null;
+  snippet: string;
+  timestamp: string;
+  rank: number;
+}
+
+type SearchCursor = [rank: number, platform: string, rowid: number];
+
+// Same format as the scraper's encode_search_cursor: base64url of JSON [rank, platform, rowid]
+export function encodeSearchCursor(hit: Pick<SearchHit, "rank" | "platform" | "rowid">): string {
+  return Buffer.from(JSON.stringify([hit.rank, hit.platform, hit.rowid])).toString("base64url");
+}
+
+// Bad input to searchContent (malformed cursor, unknown platform), as opposed
+// to a database failure; the scraper's Database.search raises ValueError for these.
+export class SearchInputError extends Error {}
+
+function decodeSearchCursor(token: string): SearchCursor {
+  let key: unknown;
+  try {
+    key = JSON.parse(Buffer.from(token, "base64url").toString());
+  } catch {
+    throw new SearchInputError("Invalid search cursor");
   }
-  if (account) {
-    fbConditions.push("1=0");
+  if (
+    !Array.isArray(key) || key.length !== 3 || typeof key[0] !== "number" ||
+    typeof key[1] !== "string" || !Number.isInteger(key[2])
+  ) {
+    throw new SearchInputError("Invalid search cursor");
   }
-  if (type === "story" || type === "post") {
-    fbConditions.push("1=0");
+  return key as SearchCursor;
+}
+
+// Every word must match, the last as a prefix; quoting keeps FTS5 syntax in
+// user input literal
+function ftsQuery(text: string): string {
+  const terms = text.split(/\s+/).filter(Boolean).map((word) => `"${word.replace(/"/g, '""')}"`);
+  if (terms.length) terms[terms.length - 1] += "*";
+  return terms.join(" ");
+}
+
+const SEARCH_ARMS: Record<SearchHit["platform"], string> = {
+  instagram: `
+    SELECT 'instagram' AS platform, p.rowid AS rowid, p.id AS id, p.type AS type,
+           p.username AS source_name, NULL AS title,
+           snippet(posts_fts, -1, '<mark>', '</mark>', '…', 16) AS snippet,
+           p.timestamp AS timestamp, bm25(posts_fts) AS rank
+    FROM posts_fts CROSS JOIN posts p ON p.rowid = posts_fts.rowid
+    WHERE posts_fts MATCH @match AND p.user_id = @userId`,
+  facebook: `
+    SELECT 'facebook' AS platform, fp.rowid AS rowid, fp.id AS id, 'fb_post' AS type,
+           fg.name AS source_name, NULL AS title,
+           snippet(fb_posts_fts, -1, '<mark>', '</mark>', '…', 16) AS snippet,
+           fp.timestamp AS timestamp, bm25(fb_posts_fts) AS rank
+    FROM fb_posts_fts
+    CROSS JOIN fb_posts fp ON fp.rowid = fb_posts_fts.rowid
+    CROSS JOIN fb_groups fg ON fg.user_id = @userId AND fg.group_id = fp.group_id
+    WHERE fb_posts_fts MATCH @match`,
+  newsletter: `
+    SELECT 'newsletter' AS platform, ne.id AS rowid, ne.id AS id, 'newsletter' AS type,
+           COALESCE(NULLIF(ne.from_name, ''), ne.from_address) AS source_name,
+           ne.subject AS title,
+           snippet(newsletter_fts, -1, '<mark>', '</mark>', '…', 16) AS snippet,
+           ne.received_at AS timestamp, bm25(newsletter_fts) AS rank
+    FROM newsletter_fts CROSS JOIN newsletter_emails ne ON ne.id = newsletter_fts.rowid
+    WHERE newsletter_fts MATCH @match AND ne.user_id = @userId AND ne.is_confirmation = 0`,
+};
+
+// Ranked full-text search over the FTS5 indexes the scraper's migrations
+// maintain; mirrors Database.search(). Snippets wrap matches in <mark> and
+// are otherwise unescaped text.
+export function searchContent(userId: number, query: string, limit = 20, cursor?: string, platform?: string): SearchHit[] {
+  const match = ftsQuery(query);
+  if (!match) return [];
+  if (platform && !Object.hasOwn(SEARCH_ARMS, platform)) {
+    throw new SearchInputError(`Unknown search platform: ${platform}`);
   }
-  if (platform === "instagram") {
-    fbConditions.push("1=0");
+  const arms = platform
+    ? [SEARCH_ARMS[platform as SearchHit["platform"]]]
+    : Object.values(SEARCH_ARMS);
+  const params: Record<string, unknown> = { userId, match, limit };
+  let where = "";
+  if (cursor) {
+    [params.rank, params.platform, params.rowid] = decodeSearchCursor(cursor);
+    where = "WHERE (rank, platform, rowid) > (@rank, @platform, @rowid)";
   }
-
-  const igWhere = `WHERE ${igConditions.join(" AND ")}`;
-  const fbWhere = `WHERE ${fbConditions.join(" AND ")}`;
-
   const sql = `
-    SELECT p.id, p.username AS source_name, p.type, p.caption AS content, p.timestamp, p.permalink,
-           'instagram' AS platform, NULL AS comment_count
-    FROM posts p ${igWhere}
-    UNION ALL
-    SELECT fp.id, fg.name AS source_name, 'fb_post' AS type, fp.content, fp.timestamp, fp.permalink,
-           'facebook' AS platform, fp.comment_count
-    FROM fb_posts fp JOIN fb_groups fg ON fp.group_id = fg.group_id ${fbWhere}
-    ORDER BY timestamp DESC
-    LIMIT ? OFFSET ?
+    SELECT * FROM (${arms.join(" UNION ALL ")}) ${where}
+    ORDER BY rank, platform, rowid
+    LIMIT @limit
   `;
-  const params = [...igParams, ...fbParams, limit, offset];
-  return db.prepare(sql).all(...params) as UnifiedFeedItem[];
+  return getDb().prepare(sql).all(params) as SearchHit[];
 }